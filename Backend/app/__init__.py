@@ -1,63 +1,146 @@
 
 from dotenv import load_dotenv
 load_dotenv()
-from flask import Flask, app
+from flask import Flask
 from flask_cors import CORS
 
 
 from .extensions import db, ma
-from .blueprints.auth import auth_bp
-from .blueprints.books import books_bp
-from .blueprints.playlists import playlists_bp
-from .blueprints.songs import songs_bp
-from .blueprints.tags import tags_bp
-from .blueprints.users import users_bp
 
+# Blueprints, models and job handlers are imported inside create_app, so
+# importing the package (migrations env, CLI helpers, scripts that only
+# need app.models) doesn't pay for every route module.
+#
+# create_app never touches the database: the schema comes from
+# `flask db upgrade`, and the in-memory suggest index and job workers
+# start with the first request.
 
 
-def create_app():
+def create_app(config_name=None):
+    """config_name: development, testing or production (default: $APP_CONFIG, else production)."""
     app = Flask(__name__)
     CORS(
     app,
         resources={r"/*": {"origins": "*"}},
         supports_credentials=True,
-        allow_headers=["Content-Type", "Authorization", "Accept"],
+        allow_headers=["Content-Type", "Authorization", "Accept", "X-Profile"],
         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"]
     )
     
     # Load config
-    app.config.from_object("config.ProductionConfig") # Change to DevelopmentConfig or ProductionConfig as needed
     import os
-    
+    from config import CONFIGS
+
+    config_name = config_name or os.getenv("APP_CONFIG", "production")
+    if config_name not in CONFIGS:
+        raise ValueError(f"Unknown APP_CONFIG {config_name!r}; expected one of {', '.join(CONFIGS)}")
+    app.config.from_object(CONFIGS[config_name])
+
 
     app.config["SPOTIFY_CLIENT_ID"] = os.getenv("SPOTIFY_CLIENT_ID")
     app.config["SPOTIFY_CLIENT_SECRET"] = os.getenv("SPOTIFY_CLIENT_SECRET")
 
-    # Initialize extensions
+    # Leveled, queued logging for app.logger and every app.* module logger
+    from .utility.logs import init_logging
+    init_logging(app)
+
+    # SQL count/time, upstream calls and serialization per request (Server-Timing)
+    from .utility.instrumentation import init_instrumentation
+    init_instrumentation(app)
+
+    # On-demand cProfile / sampling profiles (signed X-Profile header, PROFILE_ROUTES)
+    from .utility.profiling import init_profiling
+    init_profiling(app)
+
+    # Statements over SLOW_QUERY_THRESHOLD_MS: logged, grouped by fingerprint, EXPLAINed
+    from .utility.slow_queries import init_slow_queries
+    init_slow_queries(app)
+
+    # Initialize extensions (engine pool sized from the DB_* settings)
+    from .utility.database import configure_engine_options, init_database, init_migrations
+    configure_engine_options(app)
     db.init_app(app)
     ma.init_app(app)
+    init_database(app)
+
+    # Prometheus metrics (routes, DB pool, upstreams, caches) at /metrics
+    from .utility.metrics import init_metrics
+    init_metrics(app)
+
+    # Flask-Migrate (and alembic) only load for the `flask` command;
+    # web workers never migrate and skip those imports
+    import click
+    if click.get_current_context(silent=True) is not None:
+        init_migrations(app)
     
 
     # Import models so SQLAlchemy knows them
     from . import models
 
-    # Create tables automatically
-    with app.app_context():
-        print("USING DB FILE:", os.path.abspath(db.engine.url.database))
-        # db.drop_all()
-        db.create_all()
-        
+    # Register background job handlers
+    from .utility.jobs import init_jobs, start_workers
+    init_jobs(app)
+
+    # Per-host upstream rate budgets (background work only uses spare capacity)
+    from .utility import http
+    http.configure_budgets(
+        app.config.get("UPSTREAM_RATE_BUDGETS"),
+        app.config.get("BACKGROUND_BUDGET_SHARE", 0.5),
+    )
+
+    # Local full-text index (FTS5 / tsvector), kept in sync on flush
+    from .utility.search import init_search
+    init_search(app)
+
+    # book_isbns lookup table, kept in step with Books.isbn_list
+    from .utility.isbn import init_isbns
+    init_isbns(app)
+
+    # Read-through payload cache, invalidated by tag on commit
+    from .utility.cache import init_cache
+    init_cache(app)
+
+    # In-memory typeahead index, warmed in the background
+    from .utility.suggest import init_suggest, start_warmup
+    init_suggest(app)
+
 
     @app.get("/")
     def home():
         return {"message": "SoundBound API running"}
     
     #register blueprints
+    from .blueprints.auth import auth_bp
+    from .blueprints.books import books_bp
+    from .blueprints.playlists import playlists_bp
+    from .blueprints.songs import songs_bp
+    from .blueprints.tags import tags_bp
+    from .blueprints.users import users_bp
+    from .blueprints.jobs import jobs_bp
+    from .blueprints.search import search_bp
+    from .blueprints.admin import admin_bp
+    from .cli import books_cli, jobs_cli, search_cli
+
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(books_bp, url_prefix='/books')
     app.register_blueprint(playlists_bp, url_prefix='/playlists')
     app.register_blueprint(songs_bp, url_prefix='/songs')
     app.register_blueprint(tags_bp, url_prefix='/tags')
     app.register_blueprint(users_bp, url_prefix='/users')
+    app.register_blueprint(jobs_bp, url_prefix='/jobs')
+    app.register_blueprint(search_bp, url_prefix='/search')
+    app.register_blueprint(admin_bp, url_prefix='/admin')
+
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(books_cli)
+
+    # In-process job workers and the suggest warm-up start with the first
+    # request, so CLI commands (flask db ..., flask jobs work) don't spawn
+    # them and booting a worker doesn't query the database.
+    @app.before_request
+    def ensure_job_workers():
+        start_workers(app)
+        start_warmup(app)
 
     return app
\ No newline at end of file
@@ -0,0 +1,109 @@
+import os
+
+from flask import current_app, jsonify, request, send_file
+
+# Auth
+from app.utility.auth import token_required, require_role
+
+# Profiling
+from app.utility import profiling
+from app.utility.slow_queries import slow_queries
+
+# Blueprint
+from . import admin_bp
+
+
+#___________________ISSUE A PROFILING HEADER (ADMIN)___________________#
+@admin_bp.route("/profiles/token", methods=["POST"])
+@token_required
+@require_role("admin")
+def create_profile_token(current_user):
+    """Signed X-Profile header value; requests sending it are profiled until it expires."""
+    data = request.get_json(silent=True) or {}
+    mode = data.get("mode", "cprofile")
+    if mode not in profiling.MODES:
+        return jsonify({"error": f"mode must be one of {', '.join(profiling.MODES)}"}), 400
+
+    max_ttl = current_app.config.get("PROFILE_TOKEN_MAX_TTL", 3600)
+    ttl = data.get("ttl", 300)
+    if not isinstance(ttl, int) or not 0 < ttl <= max_ttl:
+        return jsonify({"error": f"ttl must be between 1 and {max_ttl} seconds"}), 400
+
+    return jsonify({
+        "header": profiling.HEADER,
+        "token": profiling.encode_token(current_user.id, mode, ttl),
+        "mode": mode,
+        "expires_in": ttl,
+    }), 201
+
+
+#___________________LIST PROFILES (ADMIN)___________________#
+@admin_bp.route("/profiles", methods=["GET"])
+@token_required
+@require_role("admin")
+def list_profiles(current_user):
+    return jsonify(profiling.list_profiles()), 200
+
+
+#___________________PROFILE SUMMARY (ADMIN)___________________#
+@admin_bp.route("/profiles/<profile_id>", methods=["GET"])
+@token_required
+@require_role("admin")
+def get_profile(current_user, profile_id):
+    meta = profiling.get_profile(profile_id)
+    if meta is None:
+        return jsonify({"error": "Profile not found"}), 404
+
+    limit = min(request.args.get("limit", 30, type=int), 200)
+    return jsonify(dict(meta, top=profiling.top_functions(meta, limit))), 200
+
+
+#___________________DOWNLOAD PROFILE (ADMIN)___________________#
+@admin_bp.route("/profiles/<profile_id>/download", methods=["GET"])
+@token_required
+@require_role("admin")
+def download_profile(current_user, profile_id):
+    """The raw artifact: .prof (pstats / snakeviz) or .folded (flamegraph.pl / speedscope)."""
+    meta = profiling.get_profile(profile_id)
+    if meta is None:
+        return jsonify({"error": "Profile not found"}), 404
+
+    path = profiling.artifact_path(meta)
+    return send_file(path, as_attachment=True, download_name=os.path.basename(path))
+
+
+#___________________DELETE PROFILE (ADMIN)___________________#
+@admin_bp.route("/profiles/<profile_id>", methods=["DELETE"])
+@token_required
+@require_role("admin")
+def delete_profile(current_user, profile_id):
+    if not profiling.delete_profile(profile_id):
+        return jsonify({"error": "Profile not found"}), 404
+    return jsonify({"message": "Profile deleted."}), 200
+
+
+#___________________SLOW QUERIES (ADMIN)___________________#
+@admin_bp.route("/slow-queries", methods=["GET"])
+@token_required
+@require_role("admin")
+def list_slow_queries(current_user):
+    """Slow statements seen by this worker, grouped by fingerprint, with their plans."""
+    sort = request.args.get("sort", "total")
+    if sort not in ("total", "max", "count"):
+        return jsonify({"error": "sort must be total, max or count"}), 400
+    limit = min(request.args.get("limit", 50, type=int), 500)
+
+    return jsonify({
+        "pid": os.getpid(),
+        "threshold_ms": current_app.config.get("SLOW_QUERY_THRESHOLD_MS"),
+        "queries": slow_queries.snapshot(sort, limit),
+    }), 200
+
+
+#___________________RESET SLOW QUERIES (ADMIN)___________________#
+@admin_bp.route("/slow-queries", methods=["DELETE"])
+@token_required
+@require_role("admin")
+def reset_slow_queries(current_user):
+    slow_queries.reset()
+    return jsonify({"message": "Slow-query log cleared."}), 200
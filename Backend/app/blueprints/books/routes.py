@@ -1,16 +1,97 @@
-from flask import Blueprint, request, jsonify
-import requests
-from app.blueprints.books.schemas import BookDumpSchema, book_dump_schema
-from app.utility.auth import token_required
+import contextvars
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, current_app, g, request, jsonify, Response, stream_with_context
+from app.blueprints.books.schemas import book_detail_schema, book_dump_schema
+from app.utility.auth import require_role, token_required
 from . import books_bp
-from app.models import Books, Playlist_Books, Playlists, Users
+from app.models import Book_Isbns, Books, Playlist_Books, Playlists, Users
 from app.extensions import db
-from sqlalchemy import func
-from app.utility.openlibrary import fetch_openlibrary_work
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import undefer
+from app.utility.openlibrary import fetch_openlibrary_work_concurrently, search_openlibrary
+from app.utility.catalog import placeholder_book
+from app.utility.jobs import enqueue
+from app.utility.reconcile import RECONCILE_JOB, reconcile_custom_books
+from app.utility import http, isbn as isbn_index, search as search_index
+from app.utility.http_cache import cache_response, fetch_version, playlist_version, row_version
+from app.utility.cache import read_through, versioned_key
+from app.utility.projection import project
+from app.utility.serializers import dump, fast_jsonify
 from flask_cors import cross_origin
 
 
 # _____________________ BOOKS SEARCH (RESTORED SIMPLE VERSION) _____________________ #
+# mode=hybrid streams NDJSON: a "local" line with matches from our own
+# Books table as soon as the index answers, then an "upstream" line with
+# the Open Library results that weren't already in it. The upstream call
+# is started first and runs concurrently on _search_pool.
+
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="books-search")
+
+
+def _ndjson(obj):
+    return json.dumps(obj, separators=(",", ":"), default=str) + "\n"
+
+
+def _local_book_hits(title, author, year, library_ids, limit=20):
+    text = " ".join(part for part in (title, author) if part)
+    ids = search_index.search(text, ["books"], limit)["books"] if text else []
+    if not ids:
+        return []
+
+    rows = {book.id: book for book in Books.query.filter(Books.id.in_(ids)).all()}
+    year_match = re.search(r"\d{4}", year or "")
+
+    hits = []
+    for book_id in ids:
+        book = rows.get(book_id)
+        if book is None:
+            continue
+        if year_match and book.first_publish_year != int(year_match.group()):
+            continue
+        hits.append({
+            "book_id": book.id,
+            "title": book.title,
+            "authors": book.author_names or [],
+            "publish_year": book.first_publish_year,
+            "cover_id": book.cover_id,
+            "cover_url": book.cover_url,
+            "openlib_id": book.openlib_id,
+            "source": book.source,
+            "in_user_library": book.id in library_ids,
+        })
+    return hits
+
+
+def _hybrid_stream(local_hits, upstream, library_ids):
+    yield _ndjson({"source": "local", "results": local_hits})
+
+    try:
+        docs = upstream.result(timeout=http.DEFAULT_TIMEOUT * 2)
+    except Exception:
+        docs = None
+    if docs is None:
+        yield _ndjson({"source": "upstream", "error": "Failed to fetch from Open Library", "results": []})
+        return
+
+    # dedupe against local hits, then flag books we already imported (one query)
+    seen = {hit["openlib_id"] for hit in local_hits if hit["openlib_id"]}
+    docs = [doc for doc in docs if doc["openlib_id"] not in seen]
+
+    imported = dict(db.session.execute(
+        select(Books.openlib_id, Books.id)
+        .where(Books.openlib_id.in_([doc["openlib_id"] for doc in docs]))
+    ).all()) if docs else {}
+
+    for doc in docs:
+        doc["book_id"] = imported.get(doc["openlib_id"])
+        doc["in_user_library"] = doc["book_id"] in library_ids
+
+    yield _ndjson({"source": "upstream", "results": docs})
+
 
 @books_bp.route("/search", methods=["GET"])
 @token_required
@@ -37,34 +118,20 @@ def search_books(current_user):
 
     q = " ".join(query_parts)
 
-    url = "https://openlibrary.org/search.json"
-    params = {
-        "q": q,
-        "limit": 20,  # small, clean result set like before
-    }
-
-    resp = requests.get(url, params=params)
-    if resp.status_code != 200:
-        return jsonify({"error": "Failed to fetch from Open Library"}), 500
-
-    data = resp.json()
-    docs = data.get("docs", [])
+    if request.args.get("mode") == "hybrid":
+        # in this request's context, so the call shows up in its Server-Timing
+        upstream = _search_pool.submit(contextvars.copy_context().run, search_openlibrary, q, 20)
+        library_ids = set(current_user.library or [])
+        local_hits = _local_book_hits(title, author, year, library_ids)
 
-    results = []
-    for doc in docs:
-        cover_id = doc.get("cover_i")
-
-        # Only keep docs that actually have a real cover
-        if not cover_id:
-            continue
+        return Response(
+            stream_with_context(_hybrid_stream(local_hits, upstream, library_ids)),
+            mimetype="application/x-ndjson",
+        )
 
-        results.append({
-            "title": doc.get("title", "Unknown Title"),
-            "authors": doc.get("author_name", []) or [],
-            "publish_year": doc.get("first_publish_year"),
-            "cover_id": cover_id,
-            "openlib_id": doc.get("key", "").split("/")[-1],
-        })
+    results = search_openlibrary(q, limit=20)  # small, clean result set like before
+    if results is None:
+        return jsonify({"error": "Failed to fetch from Open Library"}), 500
 
     return jsonify(results), 200
 
@@ -72,8 +139,13 @@ def search_books(current_user):
 @books_bp.route('/author-reco', methods=['GET'])
 @token_required
 def get_author_reco_books(current_user):
-    books = Books.query.filter(Books.author_reco_playlist_id.isnot(None)).all()
-    return jsonify(BookDumpSchema(many=True).dump(books)), 200
+    books = (
+        Books.query
+        .options(*project(Books, book_dump_schema))
+        .filter(Books.author_reco_playlist_id.isnot(None))
+        .all()
+    )
+    return fast_jsonify(dump(book_dump_schema, books, many=True)), 200
 
 
 #_____________________BOOK DETAILS_____________________#
@@ -85,10 +157,10 @@ def get_book_details(current_user, openlib_id):
     openlib_id = openlib_id.split("/")[-1]
 
     # 1. Try to fetch from DB first
-    book = Books.query.filter_by(openlib_id=openlib_id).first()
+    book = Books.query.options(*project(Books, book_detail_schema)).filter_by(openlib_id=openlib_id).first()
 
     if book:
-        response = book_dump_schema.dump(book)
+        response = dump(book_detail_schema, book)
 
 
         playlist = (
@@ -108,7 +180,11 @@ def get_book_details(current_user, openlib_id):
         return jsonify(response), 200
 
     # 2. If not in DB, fetch full metadata from Open Library
-    ol_data = fetch_openlibrary_work(openlib_id)
+    # the request is waiting, so read fewer edition pages than enrichment does
+    ol_data = http.fan_out(fetch_openlibrary_work_concurrently(
+        openlib_id,
+        max_edition_pages=current_app.config.get("OPENLIBRARY_PREVIEW_EDITION_PAGES", 2),
+    ))
     if not ol_data:
         return jsonify({"error": "Failed to fetch book from Open Library"}), 400
 
@@ -125,22 +201,48 @@ def get_book_details(current_user, openlib_id):
 
 
 #_____________________GET BOOK BY ID (AFTER IMPORT AND AFTER THE BOOK EXISTS IN USER LIBRARY)_____________________#
+def _book_detail_version(current_user, book_id):
+    author_reco = and_(
+        Playlists.user_id == current_user.id,
+        Playlists.is_author_reco == True,
+        Playlists.id.in_(select(Playlist_Books.playlist_id).where(Playlist_Books.book_id == book_id)),
+    )
+    book_columns = row_version(Books, Books.id == book_id)
+    version = fetch_version(*book_columns, *playlist_version(author_reco))
+    if not version[0]:
+        return None  # not found
+
+    # the shared payload depends on the book row alone
+    g.book_version = version[:len(book_columns)]
+
+    # the per-user flags come from the already loaded user row
+    library = {int(x) for x in current_user.library or []}
+    return version + (book_id in library, tuple(sorted(current_user.author_keys or [])))
+
+
 @books_bp.route("/id/<int:book_id>", methods=["GET"])
 @token_required
+@cache_response(version=_book_detail_version)
 def get_book_by_id(current_user, book_id):
-    book = Books.query.get(book_id)
-    if not book:
+    def load():
+        book = db.session.get(Books, book_id, options=project(Books, book_detail_schema))
+        return (dump(book_detail_schema, book), {f"book:{book_id}"}) if book else None
+
+    # Shared book payload comes from the cache, keyed by the book's row version
+    # (another worker's writes don't evict this process's entries); per-user
+    # fields are added below
+    version = g.get("book_version") or fetch_version(*row_version(Books, Books.id == book_id))
+    response = read_through(versioned_key(f"book:{book_id}:detail", version), load)
+    if not response:
         return jsonify({"error": "Book not found"}), 404
 
-    response = book_dump_schema.dump(book)
-
     # Safe library check
     library = current_user.library or []
-    response["in_user_library"] = int(book.id) in [int(x) for x in library]
+    response["in_user_library"] = int(book_id) in [int(x) for x in library]
 
     # Safe author ownership check
     user_keys = set(current_user.author_keys or [])
-    book_keys = set(book.author_keys or [])
+    book_keys = set(response.get("author_keys") or [])
     response["is_owned_by_author"] = bool(user_keys.intersection(book_keys))
     
     # ⭐ ADD THIS — this is what CreatePlaylist needs ⭐
@@ -151,14 +253,44 @@ def get_book_by_id(current_user, book_id):
             Playlists.is_author_reco == True
         )
         .join(Playlist_Books, Playlist_Books.playlist_id == Playlists.id)
-        .filter(Playlist_Books.book_id == book.id)
+        .filter(Playlist_Books.book_id == book_id)
         .first()
     )
 
     response["author_reco_playlist"] = author_reco.to_dict() if author_reco else None
     # ⭐ END ADDITION ⭐
 
-    return jsonify(response), 200
+    return fast_jsonify(response), 200
+
+#_____________________GET BOOK BY ISBN (LOCAL ONLY)_____________________#
+# Accepts ISBN-10 or ISBN-13, with or without hyphens. Answers from the
+# book_isbns table; books that were never imported are a 404 (use
+# /books/search?isbn=... to look them up on Open Library).
+
+def _book_isbn_version(current_user, isbn):
+    isbn13 = isbn_index.to_isbn13(isbn)
+    if not isbn13:
+        return None
+    book_ids = select(Book_Isbns.book_id).where(Book_Isbns.isbn13 == isbn13)
+    version = fetch_version(*row_version(Books, Books.id.in_(book_ids)))
+    return version + (tuple(sorted(int(x) for x in current_user.library or [])),)
+
+
+@books_bp.route("/isbn/<isbn>", methods=["GET"])
+@token_required
+@cache_response(version=_book_isbn_version)
+def get_book_by_isbn(current_user, isbn):
+    if not isbn_index.to_isbn13(isbn):
+        return jsonify({"error": "Invalid ISBN"}), 400
+
+    book = isbn_index.find_book(isbn, options=project(Books, book_detail_schema))
+    if not book:
+        return jsonify({"error": "No book with that ISBN"}), 404
+
+    response = dump(book_detail_schema, book)
+    response["in_user_library"] = book.id in [int(x) for x in current_user.library or []]
+    return fast_jsonify(response), 200
+
 
 #_____________________IMPORT BOOK FROM OPEN LIBRARY_____________________#
 
@@ -195,73 +327,52 @@ def import_book(current_user):
 
 
     # ---------------------------------------------------------
-    # 2. FETCH FULL METADATA FROM OPEN LIBRARY
+    # 2. INSERT PLACEHOLDER + ADD TO USER LIBRARY
+    #    (metadata is fetched from Open Library by a background job)
     # ---------------------------------------------------------
-    ol_data = fetch_openlibrary_work(openlib_id)
-    if not ol_data:
-        return jsonify({"error": "Failed to fetch book from Open Library"}), 400
+    book = placeholder_book(openlib_id)
+    db.session.add(book)
+    db.session.flush()
+
+    user_library = current_user.library or []
+    current_user.library = user_library + [book.id]
 
     # ---------------------------------------------------------
-    # 3. EXTRACT JUST THE YEAR (4 digits)
+    # 3. QUEUE ENRICHMENT
     # ---------------------------------------------------------
-    import re
+    job = enqueue(
+        "enrich_book",
+        {"book_id": book.id, "openlib_id": openlib_id},
+        user_id=current_user.id
+    )
+    db.session.commit()
 
-    raw_year = ol_data.get("first_publish_year")
-    year = None
+    return jsonify({"book_id": book.id, "job_id": job.id, "status": job.status}), 202
 
-    if raw_year:
-        # Convert to string and search for a 4-digit year
-        match = re.search(r"\b(\d{4})\b", str(raw_year))
-        if match:
-            year = int(match.group(1))
 
-    # ---------------------------------------------------------
-    # 4. CLEAN JSON FIELDS
-    # ---------------------------------------------------------
-    subjects = ol_data.get("subjects") or []
-    author_names = ol_data.get("author_names") or []
-    author_keys = ol_data.get("author_keys") or []
-    isbn_list = ol_data.get("isbn_list") or []
-    
+#_____________________RECONCILE CUSTOM BOOKS (ADMIN)_____________________#
+# Merges custom books into matching verified Open Library books.
+# {"dry_run": true} returns the proposed matches without writing anything;
+# otherwise the merge runs as a background job.
 
-    # ---------------------------------------------------------
-    # 5. CREATE NEW BOOK INSTANCE
-    # ---------------------------------------------------------
-    desc = ol_data.get("description")
-    if isinstance(desc, dict):
-        desc = desc.get("value")
-    elif not isinstance(desc, str):
-        desc = None
-
-    book = Books(
-        title=ol_data.get("title"),
-        description=desc,   # ⭐ FIXED
-        subjects=subjects,
-        author_names=author_names,
-        author_keys=author_keys,
-        cover_url=ol_data.get("cover_url"),
-        cover_id=ol_data.get("cover_id"),
-        isbn_list=isbn_list,
-        first_publish_year=year,
-        openlib_id=openlib_id,
-        api_source="openlibrary",
-        api_id=openlib_id,
-        source="verified"
-        
-    )
+@books_bp.route("/reconcile", methods=["POST"])
+@token_required
+@require_role("admin")
+def reconcile_books(current_user):
+    data = request.get_json(silent=True) or {}
 
+    min_score = data.get("min_score")
+    if min_score is not None and not (isinstance(min_score, (int, float)) and 0 < min_score <= 1):
+        return jsonify({"error": "min_score must be a number between 0 and 1"}), 400
 
-    db.session.add(book)
-    db.session.commit()
+    if data.get("dry_run"):
+        return jsonify(reconcile_custom_books(dry_run=True, min_score=min_score)), 200
 
-    # ---------------------------------------------------------
-    # 6. ADD BOOK TO USER LIBRARY
-    # ---------------------------------------------------------
-    user_library = current_user.library or []
-    current_user.library = user_library + [book.id]
+    payload = {"min_score": min_score} if min_score is not None else {}
+    job = enqueue(RECONCILE_JOB, payload, user_id=current_user.id)
     db.session.commit()
 
-    return jsonify({"book_id": book.id}), 201
+    return jsonify(job.to_dict()), 202
 
 
 #_____________________SIMILAR BOOKS_____________________#
@@ -269,7 +380,7 @@ def import_book(current_user):
 @books_bp.route("/<openlib_id>/similar", methods=["GET"])
 @token_required
 def get_similar_books(current_user, openlib_id):
-    book = Books.query.filter_by(openlib_id=openlib_id).first()
+    book = Books.query.options(undefer(Books.subjects)).filter_by(openlib_id=openlib_id).first()
 
     if not book:
         return jsonify({"message": "Book not found"}), 404
@@ -277,18 +388,19 @@ def get_similar_books(current_user, openlib_id):
     if not book.subjects:
         return jsonify([]), 200
 
-    similar = Books.query.filter(
+    similar = Books.query.options(*project(Books, book_dump_schema)).filter(
         Books.id != book.id,
         Books.subjects.overlap(book.subjects)
     ).limit(20).all()
 
-    return jsonify(book_dump_schema.dump(similar, many=True)), 200
+    return fast_jsonify(dump(book_dump_schema, similar, many=True)), 200
 
 
 #_____________________POPULAR BOOKS_____________________#
 
 @books_bp.route("/popular", methods=["GET"])
 @token_required
+@cache_response(max_age=60)
 def get_popular_books(current_user):
     popularity = (
         db.session.query(
@@ -302,6 +414,6 @@ def get_popular_books(current_user):
     )
 
     book_ids = [row.book_id for row in popularity]
-    books = Books.query.filter(Books.id.in_(book_ids)).all()
+    books = Books.query.options(*project(Books, book_dump_schema)).filter(Books.id.in_(book_ids)).all()
 
-    return jsonify(book_dump_schema.dump(books, many=True)), 200
\ No newline at end of file
+    return fast_jsonify(dump(book_dump_schema, books, many=True)), 200
\ No newline at end of file
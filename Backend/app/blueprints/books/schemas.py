@@ -11,7 +11,6 @@ class BookDumpSchema(Schema):
     first_publish_year = fields.Str()
     subjects = fields.List(fields.Str())
     description = fields.Str()  # ⭐ ADD THIS
-    isbn_list = fields.List(fields.Str())
     api_source = fields.Str()        # optional but recommended
     api_id = fields.Str()            # optional but recommended
     source = fields.Str()            # optional but recommended
@@ -23,6 +22,12 @@ class BookDumpSchema(Schema):
 
 book_dump_schema = BookDumpSchema()
 
+# detail views also get every ISBN (normalized ISBN-13s); lists leave them out
+class BookDetailSchema(BookDumpSchema):
+    isbn_list = fields.List(fields.Str())
+
+book_detail_schema = BookDetailSchema()
+
 class BookLiteSchema(Schema):
     id = fields.Int()
     title = fields.Str()
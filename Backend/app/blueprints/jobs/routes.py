@@ -0,0 +1,58 @@
+from flask import request, jsonify
+from app.extensions import db
+
+# Models
+from app.models import Jobs
+
+# Auth
+from app.utility.auth import token_required, require_role
+
+# Metadata refresh
+from app.utility.jobs import enqueue
+from app.utility.refresh import REFRESH_JOB, freshness_report
+
+# Blueprint
+from . import jobs_bp
+
+
+#___________________GET JOB STATUS___________________#
+@jobs_bp.route("/<int:job_id>", methods=["GET"])
+@token_required
+def get_job_status(current_user, job_id):
+    job = db.session.get(Jobs, job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    # Users only see their own jobs; admins see everything
+    if job.user_id != current_user.id and current_user.role != "admin":
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify(job.to_dict()), 200
+
+
+
+#___________________METADATA REFRESH STATUS (ADMIN)___________________#
+@jobs_bp.route("/metadata-refresh", methods=["GET"])
+@token_required
+@require_role("admin")
+def get_metadata_refresh_status(current_user):
+    """Freshness of Books/Songs plus throughput of the last refresh run."""
+    return jsonify(freshness_report(request.args.get("max_age_days", type=int))), 200
+
+
+#___________________TRIGGER METADATA REFRESH (ADMIN)___________________#
+@jobs_bp.route("/metadata-refresh", methods=["POST"])
+@token_required
+@require_role("admin")
+def trigger_metadata_refresh(current_user):
+    data = request.get_json(silent=True) or {}
+    payload = {
+        key: data[key]
+        for key in ("max_age_days", "batch_size", "max_batches")
+        if isinstance(data.get(key), int) and data[key] > 0
+    }
+
+    job = enqueue(REFRESH_JOB, payload, user_id=current_user.id)
+    db.session.commit()
+
+    return jsonify(job.to_dict()), 202
@@ -1,4 +1,5 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, request, jsonify
+from marshmallow import ValidationError
 from flask_jwt_extended import current_user
 from app.blueprints.playlists import playlists_bp
 from app.models import Books, Playlist_Books, Playlist_Songs, Playlist_Tags, Playlists, Songs, Tags
@@ -10,16 +11,19 @@ from app.blueprints.playlists.schemas import (
     playlist_dump_schema,
     playlists_dump_schema,
     playlist_detail_schema,
+    playlist_detail_head_schema,
     playlist_song_schema,
     playlist_song_dump_schema
 )
 from app.utility.auth import require_role, token_required
+from app.utility.http_cache import cache_response, fetch_version, playlist_version
+from app.utility.cache import read_through, versioned_key
+from app.utility.projection import project
+from app.utility.serializers import dump, fast_jsonify
 
-from app.utility.spotify import (
-    fetch_spotify_track,
-    fetch_audio_features,
-    fetch_genres_for_artists
-)
+from app.utility.catalog import placeholder_song
+from app.utility.jobs import enqueue
+from app.utility.reconcile import find_custom_book
 
 
 
@@ -28,7 +32,10 @@ from app.utility.spotify import (
 @playlists_bp.route("", methods=["POST"])
 @token_required
 def create_playlist(current_user):
-    data = playlist_schema.load(request.get_json())
+    try:
+        data = playlist_schema.load(request.get_json())
+    except ValidationError as err:
+        return jsonify(err.messages), 400
 
     book_id = data.get("book_id")
     custom_title = data.get("custom_book_title")
@@ -117,26 +124,30 @@ def create_playlist(current_user):
     # CUSTOM PLAYLIST LOGIC
     # ---------------------------------------------------------
     if playlist_type == "custom":
-        custom_book = Books(
-            title=custom_title,
-            author_names=[custom_author],
-            api_source=None,
-            api_id=None,
-            cover_url=None,
-            description=None,
-            author_keys=[],
-            openlib_id=None,
-            cover_id=None,
-            isbn_list=[],
-            first_publish_year=custom_year,
-            subjects=[],
-            source="custom"
-        )
+        # Reuse an identical custom book instead of creating a duplicate row
+        custom_book = find_custom_book(custom_title, custom_author, custom_year)
+        if custom_book is None:
+            custom_book = Books(
+                title=custom_title,
+                author_names=[custom_author],
+                api_source=None,
+                api_id=None,
+                cover_url=None,
+                description=None,
+                author_keys=[],
+                openlib_id=None,
+                cover_id=None,
+                isbn_list=[],
+                first_publish_year=custom_year,
+                subjects=[],
+                source="custom"
+            )
 
-        db.session.add(custom_book)
-        db.session.flush()
+            db.session.add(custom_book)
+            db.session.flush()
 
-        current_user.library = (current_user.library or []) + [custom_book.id]
+        if custom_book.id not in (current_user.library or []):
+            current_user.library = (current_user.library or []) + [custom_book.id]
 
         new_playlist = Playlists(
             title=data["title"],
@@ -178,28 +189,18 @@ def add_song_to_playlist(current_user, playlist_id):
     # 1. Check if song exists
     song = Songs.query.filter_by(spotify_id=spotify_id).first()
 
-    # 2. If not, import it
+    # 2. If not, insert a placeholder and let a background job fetch the metadata
+    job = None
     if not song:
-        track = fetch_spotify_track(spotify_id)
-        if not track:
-            return jsonify({"error": "Failed to fetch track from Spotify"}), 400
-
-        features = fetch_audio_features(spotify_id)
-        genres = fetch_genres_for_artists(track["artist_ids"])
-
-        song = Songs(
-            title=track["title"],
-            artists=track["artists"],
-            album=track["album"],
-            preview_url=track["preview_url"],
-            spotify_id=spotify_id,
-            audio_features=features,
-            genres=genres,
-            source="spotify"
-        )
-
+        song = placeholder_song(spotify_id)
         db.session.add(song)
-        db.session.commit()
+        db.session.flush()
+
+        job = enqueue(
+            "enrich_song",
+            {"song_id": song.id, "spotify_id": spotify_id},
+            user_id=current_user.id
+        )
 
     # 3. Prevent duplicates
     existing = Playlist_Songs.query.filter_by(
@@ -220,40 +221,93 @@ def add_song_to_playlist(current_user, playlist_id):
     db.session.commit()
     db.session.refresh(playlist)
 
-    return jsonify(playlist_detail_schema.dump(playlist)), 201
+    response = playlist_detail_schema.dump(playlist)
+    if job:
+        response["job_id"] = job.id
+        return jsonify(response), 202
+
+    return jsonify(response), 201
 
 #_____________________GET ALL MY PLAYLISTS_____________________#
 
 @playlists_bp.route("/me", methods=["GET"])
 @token_required
 def get_my_playlists(current_user):
-    playlists = Playlists.query.filter_by(user_id=current_user.id).all()
-    return jsonify(playlist_dump_schema.dump(playlists, many=True)), 200
+    playlists = (
+        Playlists.query
+        .options(*project(Playlists, playlist_dump_schema))
+        .filter_by(user_id=current_user.id)
+        .all()
+    )
+    return fast_jsonify(dump(playlist_dump_schema, playlists, many=True)), 200
 
 
 #_____________________GET SPECIFIC PLAYLIST_____________________#
 
+def _playlist_detail_version(current_user, playlist_id):
+    # None lets the view answer 404/403 itself
+    playlist = db.session.get(Playlists, playlist_id)
+    if not playlist or (not playlist.is_public and playlist.user_id != current_user.id):
+        return None
+    g.playlist_version = fetch_version(*playlist_version(Playlists.id == playlist_id))
+    return g.playlist_version
+
+
+def _load_playlist_detail(playlist_id):
+    # Cached payload + the tags of every row it embeds
+    playlist = db.session.get(Playlists, playlist_id)
+    if not playlist:
+        return None
+
+    # the entries, then their songs (with the deferred columns the dump
+    # reads) in one selectin query, instead of one song lookup per entry
+    entries = playlist.playlist_songs.options(*project(Playlist_Songs, playlist_song_dump_schema)).all()
+    payload = dump(playlist_detail_head_schema, playlist)
+    payload["playlist_songs"] = dump(playlist_song_dump_schema, entries, many=True)
+
+    tags = {f"playlist:{playlist.id}", f"user:{playlist.user_id}"}
+    tags.update(f"song:{ps['song']['id']}" for ps in payload.get("playlist_songs", []) if ps.get("song"))
+    tags.update(f"book:{book['id']}" for book in payload.get("books", []))
+    tags.update(f"tag:{tag['id']}" for tag in payload.get("tags", []))
+
+    entry = {"is_public": playlist.is_public, "user_id": playlist.user_id, "playlist": payload}
+    return entry, tags
+
+
 @playlists_bp.route("/<int:playlist_id>", methods=["GET"])
 @token_required
+@cache_response(version=_playlist_detail_version)
 def get_playlist_detail(current_user, playlist_id):
-    playlist = Playlists.query.get(playlist_id)
+    # keyed by the version of every row the payload embeds, so writes made by
+    # another worker (or a job process) never leave this one serving old data
+    version = g.get("playlist_version") or fetch_version(*playlist_version(Playlists.id == playlist_id))
+    entry = read_through(versioned_key(f"playlist:{playlist_id}:detail", version), lambda: _load_playlist_detail(playlist_id))
 
-    if not playlist:
+    if not entry:
         return jsonify({"error": "Playlist not found"}), 404
 
     # If playlist is private, only the owner can view it
-    if not playlist.is_public and playlist.user_id != current_user.id:
+    if not entry["is_public"] and entry["user_id"] != current_user.id:
         return jsonify({"error": "You do not have permission to view this playlist."}), 403
 
-    return jsonify(playlist_detail_schema.dump(playlist)), 200
+    return fast_jsonify(entry["playlist"]), 200
 
 
 #_____________________GET AUTHOR RECOMMENDATION PLAYLISTS_____________________#
 
 @playlists_bp.route("/author-reco", methods=["GET"])
+@cache_response(
+    version=lambda: fetch_version(*playlist_version(Playlists.is_author_reco == True)),
+    scope="public", max_age=60, shared=True,
+)
 def get_author_reco_playlists():
-    playlists = Playlists.query.filter_by(is_author_reco=True).all()
-    return jsonify(playlist_dump_schema.dump(playlists, many=True)), 200
+    playlists = (
+        Playlists.query
+        .options(*project(Playlists, playlist_dump_schema))
+        .filter_by(is_author_reco=True)
+        .all()
+    )
+    return fast_jsonify(dump(playlist_dump_schema, playlists, many=True)), 200
 
 
 #_____________________UPDATE PLAYLIST_____________________#
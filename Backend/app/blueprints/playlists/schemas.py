@@ -90,4 +90,15 @@ class PlaylistDetailSchema(PlaylistDumpSchema):
     tags = fields.List(fields.Nested("TagDumpSchema"), dump_default=[])
 
 playlist_detail_schema = PlaylistDetailSchema()
+# the rest of a detail payload, for callers that dump playlist_songs from rows they loaded
+playlist_detail_head_schema = PlaylistDetailSchema(exclude=("playlist_songs",))
 playlists_detail_schema = PlaylistDetailSchema(many=True)
+
+
+# Nested("SongDumpSchema") / Nested("TagDumpSchema") resolve through marshmallow's
+# class registry at dump time, so their modules must be imported by then however
+# this module was reached (create_app imports blueprints lazily; scripts import
+# this module alone). At the bottom: tags/__init__ imports tags.routes, which
+# imports the schemas above.
+from app.blueprints.songs import schemas as _song_schemas  # noqa: E402,F401
+from app.blueprints.tags import schemas as _tag_schemas  # noqa: E402,F401
@@ -0,0 +1,176 @@
+import asyncio
+
+from flask import current_app, jsonify, request
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.extensions import db
+
+# Models
+from app.models import Playlists
+
+# Auth
+from app.utility.auth import token_required
+
+# Search
+from app.utility import http
+from app.utility import search as search_index
+from app.utility import suggest as suggest_index
+from app.utility.openlibrary import search_openlibrary_concurrently
+from app.utility.spotify import search_spotify_tracks_concurrently
+
+# Serialization
+from app.utility.projection import project
+from app.utility.serializers import dump, fast_jsonify
+
+# Schemas
+from .schemas import search_books_schema, search_playlists_schema, search_songs_schema
+
+# Blueprint
+from . import search_bp
+
+
+_DUMPERS = {
+    "books": search_books_schema,
+    "songs": search_songs_schema,
+    "playlists": search_playlists_schema,
+}
+
+
+def _load_ranked(kind, ids):
+    """Rows for ids in one query, returned in ranking order."""
+    if not ids:
+        return []
+    model = search_index.KINDS[kind][0]
+    stmt = select(model).options(*project(model, _DUMPERS[kind])).where(model.id.in_(ids))
+    if kind == "playlists":
+        stmt = stmt.where(Playlists.is_public.is_(True)).options(selectinload(Playlists.user))
+    rows = {row.id: row for row in db.session.execute(stmt).scalars()}
+    return [rows[i] for i in ids if i in rows]
+
+
+async def _upstream(kind, query):
+    """Open Library / Spotify results for a kind with no local hits."""
+    try:
+        if kind == "books":
+            return await search_openlibrary_concurrently(query, limit=20) or []
+        if kind == "songs":
+            return await search_spotify_tracks_concurrently(query)
+    except Exception:
+        current_app.logger.warning("Upstream %s search failed", kind, exc_info=True)
+    return []
+
+
+def _upstream_all(kinds, query):
+    """{kind: upstream results}, with Open Library and Spotify asked at the same time."""
+    async def gather():
+        return await asyncio.gather(*(_upstream(kind, query) for kind in kinds))
+    return dict(zip(kinds, http.fan_out(gather()))) if kinds else {}
+
+
+#___________________SEARCH (LOCAL CATALOG)___________________#
+@search_bp.route("", methods=["GET"])
+@token_required
+def search(current_user):
+    """
+    Full-text search over imported books, songs and public playlists.
+
+    Query params:
+      q         search text (every word is a prefix match)
+      types     comma list of books,songs,playlists (default: all)
+      limit     results per type (default SEARCH_RESULT_LIMIT, max 50)
+      fallback  0 to never call Open Library / Spotify
+
+    Behavior:
+      - Answers from the local index.
+      - Books/songs with fewer than SEARCH_FALLBACK_MIN_RESULTS local hits
+        are also searched upstream; those results go under "upstream"
+        (they are not imported yet, so they carry openlib_id / Spotify id).
+    """
+    query = request.args.get("q", "").strip()
+    if not search_index.query_terms(query):
+        return jsonify({"error": "Missing query"}), 400
+
+    types = request.args.get("types")
+    kinds = [k.strip() for k in types.split(",")] if types else list(search_index.KINDS)
+    unknown = [k for k in kinds if k not in search_index.KINDS]
+    if unknown:
+        return jsonify({"error": f"Unknown types: {', '.join(unknown)}"}), 400
+
+    config = current_app.config
+    limit = request.args.get("limit", config.get("SEARCH_RESULT_LIMIT", 20), type=int)
+    limit = max(1, min(limit, 50))
+    use_fallback = config.get("SEARCH_UPSTREAM_FALLBACK", True) and request.args.get("fallback") != "0"
+    min_local = config.get("SEARCH_FALLBACK_MIN_RESULTS", 1)
+
+    ranked = search_index.search(query, kinds, limit)
+
+    results, fallback_kinds = {}, []
+    for kind in kinds:
+        rows = _load_ranked(kind, ranked[kind])
+        results[kind] = dump(_DUMPERS[kind], rows)
+
+        if use_fallback and kind != "playlists" and len(rows) < min_local:
+            fallback_kinds.append(kind)
+
+    upstream = _upstream_all(fallback_kinds, query)
+
+    return fast_jsonify({"query": query, "results": results, "upstream": upstream}), 200
+
+
+def _upstream_suggestions(kinds, prefix, limit):
+    """Typeahead entries from Open Library / Spotify titles."""
+    upstream_kinds = [kind for suggest_kind, kind in (("book", "books"), ("song", "songs")) if suggest_kind in kinds]
+    upstream = _upstream_all(upstream_kinds, prefix)
+    suggestions = [
+        {"type": "book", "id": None, "label": doc["title"], "openlib_id": doc["openlib_id"]}
+        for doc in upstream.get("books", [])
+    ]
+    suggestions += [
+        {"type": "song", "id": None, "label": track["title"], "spotify_id": track["id"]}
+        for track in upstream.get("songs", [])
+    ]
+    return suggestions[:limit]
+
+
+#___________________TYPEAHEAD SUGGESTIONS___________________#
+@search_bp.route("/suggest", methods=["GET"])
+@token_required
+def suggest(current_user):
+    """
+    Prefix suggestions for the book/song pickers.
+
+    Query params:
+      q         what the user has typed so far
+      types     comma list of book,author,song,artist,tag (default: all)
+      limit     max suggestions (default SUGGEST_RESULT_LIMIT, max 25)
+      fallback  0 to never call Open Library / Spotify
+
+    Behavior:
+      - Served from the in-memory prefix index (no database query).
+      - Only when it has no match are book/song titles fetched upstream
+        ("source": "upstream").
+    """
+    config = current_app.config
+    prefix = request.args.get("q", "").strip()
+    if len(prefix) < config.get("SUGGEST_MIN_PREFIX", 2):
+        return jsonify({"query": prefix, "source": "local", "suggestions": []}), 200
+
+    types = request.args.get("types")
+    kinds = [k.strip() for k in types.split(",")] if types else list(suggest_index.KINDS)
+    unknown = [k for k in kinds if k not in suggest_index.KINDS]
+    if unknown:
+        return jsonify({"error": f"Unknown types: {', '.join(unknown)}"}), 400
+
+    limit = request.args.get("limit", config.get("SUGGEST_RESULT_LIMIT", 10), type=int)
+    limit = max(1, min(limit, 25))
+
+    suggestions = suggest_index.get_index().lookup(prefix, kinds, limit)
+    if suggestions or request.args.get("fallback") == "0":
+        return jsonify({"query": prefix, "source": "local", "suggestions": suggestions}), 200
+
+    return jsonify({
+        "query": prefix,
+        "source": "upstream",
+        "suggestions": _upstream_suggestions(kinds, prefix, limit),
+    }), 200
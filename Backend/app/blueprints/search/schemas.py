@@ -0,0 +1,28 @@
+from marshmallow import Schema, fields
+
+from app.blueprints.books.schemas import BookDumpSchema
+from app.blueprints.songs.schemas import SongDumpSchema
+from app.blueprints.users.schemas import UserPublicSchema
+
+
+# Compact result rows for /search (full details come from the detail routes)
+search_books_schema = BookDumpSchema(
+    only=("id", "openlib_id", "title", "author_names", "cover_url", "cover_id", "first_publish_year", "source"),
+    many=True,
+)
+
+search_songs_schema = SongDumpSchema(
+    only=("id", "spotify_id", "title", "artists", "album", "preview_url", "source"),
+    many=True,
+)
+
+
+class SearchPlaylistSchema(Schema):
+    id = fields.Int()
+    title = fields.String()
+    description = fields.String()
+    is_author_reco = fields.Boolean()
+    user = fields.Nested(UserPublicSchema, only=("id", "username"))
+
+
+search_playlists_schema = SearchPlaylistSchema(many=True)
@@ -15,12 +15,9 @@ from app.models import Playlists, Playlist_Songs, Songs
 from app.utility.auth import token_required
 
 # Spotify helpers
-from app.utility.spotify import (
-    fetch_spotify_track,
-    fetch_audio_features,
-    fetch_genres_for_artists,
-    search_spotify_tracks,
-)
+from app.utility.catalog import placeholder_song
+from app.utility.jobs import enqueue
+from app.utility.spotify import search_spotify_tracks
 
 # Blueprint
 from . import songs_bp
@@ -58,33 +55,21 @@ def import_song(current_user):
     if existing:
         return jsonify({"song_id": existing.id}), 200
 
-    # 2. Fetch track metadata
-    track = fetch_spotify_track(spotify_id)
-    if not track:
-        return jsonify({"error": "Failed to fetch track from Spotify"}), 400
-
-    # 3. Fetch audio features
-    features = fetch_audio_features(spotify_id)
-
-    # 4. Fetch genres for ALL artists
-    genres = fetch_genres_for_artists(track["artist_ids"])
-
-    # 5. Create Song instance
-    song = Songs(
-        title=track["title"],
-        artists=track["artists"],
-        album=track["album"],
-        preview_url=track["preview_url"],
-        spotify_id=spotify_id,
-        audio_features=features,
-        genres=genres,
-        source="spotify"
-    )
+    # 2. Insert placeholder; a background job fetches track metadata,
+    #    audio features and genres
+    song = placeholder_song(spotify_id)
 
     db.session.add(song)
+    db.session.flush()
+
+    job = enqueue(
+        "enrich_song",
+        {"song_id": song.id, "spotify_id": spotify_id},
+        user_id=current_user.id
+    )
     db.session.commit()
 
-    return jsonify({"song_id": song.id}), 201
+    return jsonify({"song_id": song.id, "job_id": job.id, "status": job.status}), 202
 
 
 # ---------------------------------------------------------
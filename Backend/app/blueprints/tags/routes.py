@@ -16,6 +16,9 @@ from app.models import Tags, Playlists, Playlist_Tags
 # Auth
 from app.utility.auth import token_required, require_role
 
+# HTTP caching
+from app.utility.http_cache import cache_response, fetch_version, row_version
+
 # Blueprint
 from . import tags_bp
 
@@ -45,6 +48,10 @@ def create_tag(current_user):
 
 #___________________GET ALL TAGS___________________#
 @tags_bp.route("", methods=["GET"])
+@cache_response(
+    version=lambda: fetch_version(*row_version(Tags)),
+    scope="public", max_age=300, shared=True,
+)
 def get_all_tags():
     tags = Tags.query.all()
     return jsonify(tag_dump_schema.dump(tags, many=True)), 200
@@ -1,15 +1,27 @@
 
 from app.blueprints.users import users_bp
-from app.blueprints.users.schemas import UserUpdateSchema, UserSchema, AuthorApplicationSchema, author_app_schema
+from app.blueprints.users.schemas import UserUpdateSchema, UserSchema, AuthorApplicationSchema, author_app_schema, users_public_schema
 from app.blueprints.auth.schemas import signup_schema
 from app.utility.auth import token_required, require_role
-from flask import request, jsonify
-from app.models import Books, Playlist_Books, Playlists, Users, Author_verification_requests as VerificationRequest
+from app.utility.http_cache import cache_response, fetch_version, row_version
+from app.utility.projection import project
+from app.utility.serializers import dump, fast_jsonify
+from flask import request, jsonify, Response, current_app, stream_with_context
+from datetime import datetime, timezone
+from app.models import Books, Playlist_Books, Playlist_Songs, Playlists, Users, Author_verification_requests as VerificationRequest
 from app.extensions import db
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, undefer
 from marshmallow import ValidationError
 from app.extensions import limiter
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.blueprints.books.schemas import book_dump_schema
+from app.utility.export import iter_export_records, parse_cursor, stream_ndjson, stream_zip
+from app.utility.importer import BundleError, bundle_size, parse_bundle, run_import
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 #________________USER PROFILE ROUTES________________#
@@ -151,16 +163,48 @@ def get_user_library(current_user):
         current_user.library = []
         db.session.commit()
 
-    print("USER LIBRARY:", current_user.library)
+    logger.debug("user %s library: %s", current_user.id, current_user.library)
 
     # Fetch full book objects
-    books = Books.query.filter(Books.id.in_(current_user.library)).all()
-    print("BOOKS FROM DB:", [b.id for b in books])
+    books = (
+        Books.query
+        .options(*project(Books, book_dump_schema))
+        .filter(Books.id.in_(current_user.library))
+        .all()
+    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("library books found: %s", [b.id for b in books])
+
+    # This user's playlists for these books, in two queries whatever the
+    # library size: personal / author-reco playlist per book (lowest id
+    # wins), then the author-reco playlists' songs
+    personal, author_reco = {}, {}
+    rows = db.session.execute(
+        select(Playlist_Books.book_id, Playlists)
+        .join(Playlists, Playlists.id == Playlist_Books.playlist_id)
+        .options(undefer(Playlists.song_count))
+        .where(Playlists.user_id == current_user.id, Playlist_Books.book_id.in_(current_user.library))
+        .order_by(Playlists.id)
+    ).all()
+    for book_id, playlist in rows:
+        target = author_reco if playlist.is_author_reco else personal
+        target.setdefault(book_id, playlist)
+
+    reco_songs = {playlist.id: [] for playlist in author_reco.values()}
+    if reco_songs:
+        entries = db.session.execute(
+            select(Playlist_Songs)
+            .options(joinedload(Playlist_Songs.song))
+            .where(Playlist_Songs.playlist_id.in_(reco_songs))
+            .order_by(Playlist_Songs.id)
+        ).scalars().all()
+        for entry in entries:
+            reco_songs[entry.playlist_id].append(entry)
 
     serialized = []
 
     for book in books:
-        print("CHECKING BOOK:", book.id)
+        logger.debug("checking library book %s", book.id)
 
         # Base book data
         book_dict = book_dump_schema.dump(book)
@@ -176,34 +220,16 @@ def get_user_library(current_user):
         )
 
         # ⭐ PERSONAL PLAYLIST
-        user_playlist = (
-            Playlists.query
-            .filter(
-                Playlists.user_id == current_user.id,
-                (Playlists.is_author_reco == False) | (Playlists.is_author_reco.is_(None))
-            )
-            .join(Playlist_Books, Playlist_Books.playlist_id == Playlists.id)
-            .filter(Playlist_Books.book_id == book.id)
-            .first()
-        )
+        user_playlist = personal.get(book.id)
 
-        print("FOUND PERSONAL PLAYLIST:", user_playlist.id if user_playlist else None)
+        logger.debug("book %s personal playlist: %s", book.id, user_playlist.id if user_playlist else None)
         book_dict["user_playlist_id"] = user_playlist.id if user_playlist else None
 
         # ⭐ AUTHOR RECO PLAYLIST
-        author_reco = (
-            Playlists.query
-            .filter(
-                Playlists.user_id == current_user.id,
-                Playlists.is_author_reco == True
-            )
-            .join(Playlist_Books, Playlist_Books.playlist_id == Playlists.id)
-            .filter(Playlist_Books.book_id == book.id)
-            .first()
-        )
+        reco = author_reco.get(book.id)
 
         book_dict["author_reco_playlist"] = (
-            author_reco.to_dict() if author_reco else None
+            reco.to_dict(reco_songs[reco.id]) if reco else None
         )
 
         serialized.append(book_dict)
@@ -213,6 +239,150 @@ def get_user_library(current_user):
 
 
 
+#________________EXPORT ROUTES________________#
+
+        # - Streams library, playlists, songs and tags as NDJSON or a zip bundle
+        # - Every record carries a cursor so interrupted downloads can resume
+
+def _export_response(user_ids, filename):
+    """
+    Build a streamed export response for the given users (None = everyone).
+
+    Query params:
+        format: "ndjson" (default) or "zip"
+        cursor: last cursor received, to resume after it
+    """
+    export_format = request.args.get("format", "ndjson").lower()
+    if export_format not in ("ndjson", "zip"):
+        return jsonify({'message': 'format must be "ndjson" or "zip"'}), 400
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            parse_cursor(cursor)
+        except ValueError:
+            return jsonify({'error': 'invalid cursor'}), 400
+
+    records = iter_export_records(
+        user_ids=user_ids,
+        cursor=cursor,
+        batch_size=current_app.config.get("EXPORT_BATCH_SIZE", 500),
+    )
+
+    if export_format == "zip":
+        manifest = {
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+            "user_ids": user_ids,
+            "resumed_from": cursor,
+        }
+        return Response(
+            stream_with_context(stream_zip(records, manifest=manifest)),
+            mimetype="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.zip"'},
+        )
+
+    return Response(
+        stream_with_context(stream_ndjson(records)),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.ndjson"'},
+    )
+
+
+#✅------------------1. Export current user's data------------------#
+@users_bp.route('/me/export', methods=['GET'])
+@token_required
+def export_my_data(current_user):
+    """
+    Stream the authenticated user's profile, library, playlists, songs and tags.
+
+    Query params:
+        format: "ndjson" (default) or "zip"
+        cursor: resume after this record
+
+    Returns:
+        200 OK: Streamed export.
+        400 Bad Request: Unknown format or malformed cursor.
+    """
+    return _export_response([current_user.id], f"soundbound-export-{current_user.id}")
+
+
+#✅------------------2. Bulk export (admin)------------------#
+@users_bp.route('/export', methods=['GET'])
+@token_required
+@require_role('admin')
+def export_users_data(current_user):
+    """
+    Stream an export for every user, or only for ?user_id=<id> (repeatable).
+
+    Returns:
+        200 OK: Streamed export.
+        400 Bad Request: Invalid user_id, format or cursor.
+    """
+    user_ids = None
+    raw_ids = request.args.getlist("user_id")
+    if raw_ids:
+        try:
+            user_ids = [int(user_id) for user_id in raw_ids]
+        except ValueError:
+            return jsonify({'message': 'user_id must be an integer'}), 400
+
+    return _export_response(user_ids, "soundbound-export")
+
+
+
+
+#________________IMPORT ROUTES________________#
+
+#✅------------------1. Bulk import library and playlists------------------#
+@users_bp.route('/me/import', methods=['POST'])
+@token_required
+def import_my_data(current_user):
+    """
+    Import books, songs and playlists in bulk for the authenticated user.
+
+    Request body:
+        JSON bundle {"books": [...], "songs": [...], "playlists": [...]}
+        or NDJSON (Content-Type: application/x-ndjson), one typed item per line.
+        See app/utility/importer.py for the full shape.
+
+    Behavior:
+        - Dedupes against existing Books/Songs in bulk.
+        - Fetches missing metadata concurrently / in Spotify batches.
+        - Commits in chunks.
+        - With "Accept: application/x-ndjson", streams progress events.
+
+    Returns:
+        200 OK: Import summary (or streamed progress ending in the summary).
+        400 Bad Request: Malformed bundle.
+        413 Payload Too Large: Bundle exceeds IMPORT_MAX_ITEMS.
+    """
+    is_ndjson = (request.mimetype or "").endswith("ndjson")
+
+    try:
+        bundle = parse_bundle(request.get_data(as_text=True), is_ndjson)
+    except BundleError as err:
+        return jsonify({'message': str(err)}), 400
+
+    max_items = current_app.config.get("IMPORT_MAX_ITEMS", 5000)
+    if bundle_size(bundle) > max_items:
+        return jsonify({'message': f'Bundles are limited to {max_items} items'}), 413
+
+    events = run_import(current_user, bundle)
+
+    if request.accept_mimetypes.best == "application/x-ndjson":
+        return Response(
+            stream_with_context(json.dumps(event) + "\n" for event in events),
+            mimetype="application/x-ndjson",
+        )
+
+    for event in events:
+        if event["event"] == "done":
+            return jsonify(event["summary"]), 200
+    return jsonify({'message': 'Import did not complete'}), 500
+
+
+
+
 #________________AUTHOR APPLICATION ROUTES________________#
 
 #✅------------------1. Apply to be an author------------------#
@@ -308,7 +478,8 @@ def view_all_author_applications(current_user):
         200 OK: List of all verification requests with user info.
     """
 
-    applications = VerificationRequest.query.all()
+    # the applicant rides along in the same SELECT instead of one query per row
+    applications = VerificationRequest.query.options(joinedload(VerificationRequest.user)).all()
     result = [] #empty list to hold application requests with user info
 
     for app in applications: #looping through each app request
@@ -352,7 +523,12 @@ def get_pending_author_applications(current_user):
         200 OK: List of pending applications.
     """
 
-    pending_apps = VerificationRequest.query.filter_by(status='pending').all()
+    pending_apps = (
+        VerificationRequest.query
+        .options(joinedload(VerificationRequest.user))
+        .filter_by(status='pending')
+        .all()
+    )
     
     if not pending_apps:
         return jsonify({"message": "There are no pending author applications."}), 200
@@ -490,18 +666,22 @@ def reject_author_application(current_user, user_id):
 
 #✅------------------1. Get list of all authors (admin)------------------#
 @users_bp.route('/authors', methods=['GET'])
+@cache_response(
+    version=lambda: fetch_version(*row_version(Users, Users.role == 'author')),
+    scope="public", max_age=300, shared=True,
+)
 def get_all_authors():
     """
     Retrieve all verified authors.
 
     Behavior:
         - Filters users by role='author'.
-        - Serializes authors using UserSchema.
+        - Serializes authors using UserPublicSchema (id, username): the response
+          is cached publicly, so no email or password hash.
 
     Returns:
         200 OK: List of verified authors.
     """
 
-    authors = Users.query.filter_by(role='author').all()
-    user_schema = UserSchema(many=True)
-    return jsonify(user_schema.dump(authors)), 200
+    authors = Users.query.options(*project(Users, users_public_schema)).filter_by(role='author').all()
+    return fast_jsonify(dump(users_public_schema, authors, many=True)), 200
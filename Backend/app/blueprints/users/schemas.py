@@ -59,3 +59,4 @@ class UserPublicSchema(ma.SQLAlchemyAutoSchema):
         fields = ("id", "username")  # minimal, safe
 
 user_public_schema = UserPublicSchema()
+users_public_schema = UserPublicSchema(many=True)
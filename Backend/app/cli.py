@@ -0,0 +1,94 @@
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app.extensions import db
+
+# ------------------ CLI COMMANDS ------------------ #
+#   flask jobs work    -> run a standalone worker (no in-process threads needed)
+#   flask jobs run     -> drain the queue once and exit
+#   flask jobs refresh-metadata -> refresh stale Books/Songs now
+#   flask jobs reconcile-books  -> merge custom books into verified matches
+#   flask search rebuild        -> rebuild the local full-text index
+#   flask books backfill-isbns  -> refill book_isbns from Books.isbn_list
+#
+# Schema changes go through Flask-Migrate: flask db upgrade / flask db migrate.
+
+jobs_cli = AppGroup("jobs", help="Background job queue.")
+search_cli = AppGroup("search", help="Local full-text search index.")
+books_cli = AppGroup("books", help="Book catalog maintenance.")
+
+
+@jobs_cli.command("work")
+@click.option("--poll-interval", type=float, default=None, help="Seconds between polls when idle.")
+def work(poll_interval):
+    """Process jobs forever."""
+    from app.utility.jobs import run_pending, schedule_periodic_jobs
+
+    schedule_periodic_jobs()
+    interval = poll_interval or current_app.config.get("JOB_POLL_INTERVAL", 1.0)
+    click.echo("Job worker started. Ctrl+C to stop.")
+    while True:
+        try:
+            processed = run_pending(limit=50)
+        finally:
+            db.session.remove()
+        if not processed:
+            time.sleep(interval)
+
+
+@jobs_cli.command("run")
+def run():
+    """Process every runnable job, then exit."""
+    from app.utility.jobs import run_pending
+
+    click.echo(f"Processed {run_pending()} job(s).")
+
+
+@jobs_cli.command("refresh-metadata")
+@click.option("--max-age-days", type=int, default=None)
+@click.option("--batch-size", type=int, default=None)
+@click.option("--max-batches", type=int, default=None)
+def refresh_metadata(max_age_days, batch_size, max_batches):
+    """Refresh stale Books/Songs metadata in the foreground."""
+    import json
+
+    from app.utility.refresh import freshness_report, refresh_stale_metadata
+
+    stats = refresh_stale_metadata(max_age_days, batch_size, max_batches)
+    click.echo(json.dumps(stats, indent=2))
+    click.echo(json.dumps(freshness_report(max_age_days), indent=2, default=str))
+
+
+@jobs_cli.command("reconcile-books")
+@click.option("--dry-run", is_flag=True, help="Report matches without merging.")
+@click.option("--min-score", type=float, default=None)
+def reconcile_books(dry_run, min_score):
+    """Match custom books to verified books and merge confident matches."""
+    import json
+
+    from app.utility.reconcile import reconcile_custom_books
+
+    report = reconcile_custom_books(dry_run=dry_run, min_score=min_score)
+    click.echo(json.dumps(report, indent=2))
+
+
+@search_cli.command("rebuild")
+@click.option("--batch-size", type=int, default=500)
+def rebuild_search_index(batch_size):
+    """Rebuild the search index from the Books/Songs/Playlists tables."""
+    from app.utility.search import get_backend, rebuild_index
+
+    counts = rebuild_index(batch_size)
+    click.echo(f"Rebuilt {get_backend().name} index: {counts}")
+
+
+@books_cli.command("backfill-isbns")
+@click.option("--batch-size", type=int, default=1000)
+def backfill_isbns(batch_size):
+    """Rebuild the book_isbns lookup table from Books.isbn_list."""
+    from app.utility.isbn import backfill
+
+    click.echo(f"Wrote {backfill(batch_size)} ISBN row(s).")
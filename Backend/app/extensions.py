@@ -4,7 +4,9 @@ from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
-db = SQLAlchemy()
+from app.utility.replicas import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})  # reads can go to replicas
 ma = Marshmallow()
 cors = CORS()
 limiter = Limiter(
@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
 from .extensions import db
-from sqlalchemy.orm import relationship
+from sqlalchemy import select
+from sqlalchemy.orm import column_property, deferred, relationship
 from sqlalchemy.sql import func
 from sqlalchemy.ext.mutable import MutableList
 
@@ -10,6 +11,11 @@ from sqlalchemy.ext.mutable import MutableList
 
 # no need for junction tables as relationships are defined in the models directly
 
+# updated_at is stamped app-side: CURRENT_TIMESTAMP only has second resolution
+# on SQLite, and response ETags are derived from these values.
+def utcnow():
+    return datetime.now(timezone.utc)
+
 #_____________USERS_____________________
 class Users(db.Model):
     __tablename__ = 'users'
@@ -25,7 +31,7 @@ class Users(db.Model):
         default='reader', 
         nullable=False)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
-    updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), onupdate=utcnow)
     author_keys = db.Column(db.JSON, nullable=True)
     author_bio = db.Column(db.String(1000), nullable=True)
     library = db.Column(MutableList.as_mutable(db.JSON), default=list)
@@ -83,7 +89,8 @@ class Author_verification_requests(db.Model):
 
 
 #_____________BOOKS_____________________
-#this table is for verified books only from the API. 
+#this table is for verified books only from the API.
+#description/subjects/isbn_list are deferred: list views don't need them, routes that do ask for them (app/utility/projection.py).
 class Books(db.Model):
     __tablename__ = 'books'
     
@@ -93,15 +100,15 @@ class Books(db.Model):
     api_source = db.Column(db.String(250), nullable=True)
     api_id = db.Column(db.String(250), nullable=True)
     cover_url = db.Column(db.String(500), nullable=True)
-    description = db.Column(db.String(2000), nullable=True)
+    description = deferred(db.Column(db.String(2000), nullable=True))
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
-    updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), onupdate=utcnow, index=True)
     author_keys = db.Column(db.JSON, nullable=True)
     openlib_id = db.Column(db.String(250), nullable=True)
     cover_id = db.Column(db.Integer, nullable=True)
-    isbn_list = db.Column(db.JSON, nullable=True)
+    isbn_list = deferred(db.Column(db.JSON, nullable=True))
     first_publish_year = db.Column(db.Integer, nullable=True)
-    subjects = db.Column(db.JSON, nullable=True)
+    subjects = deferred(db.Column(db.JSON, nullable=True))
     source = db.Column(db.String, default="verified")
     author_reco_playlist_id = db.Column(db.Integer, db.ForeignKey("playlists.id"), nullable=True)
 
@@ -136,7 +143,7 @@ class Books(db.Model):
     
 
 #_____________PLAYLISTS_____________________
-#playlists is where users can create custom book titles if they cannot find the verified book in the Books table. eventually, the API can try to match the titles from playlists to add verified books to the Books table using the title and author name.
+#playlists is where users can create custom book titles if they cannot find the verified book in the Books table. custom books are later matched to verified books by title and author name and merged into them (see app/utility/reconcile.py).
 class Playlists(db.Model):
     __tablename__ = 'playlists'
     
@@ -147,16 +154,16 @@ class Playlists(db.Model):
     is_public = db.Column(db.Boolean, default=True, nullable=False)
     is_author_reco = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
-    updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), onupdate=utcnow)
     
     
 #------------RELATIONSHIPS-----------------
-    # Books included in this playlist
+    # Books included in this playlist (a plain list, so list routes can
+    # selectin-load it for every playlist at once)
     books = relationship(
         "Books",
         secondary="playlist_books",
         back_populates="playlists",
-        lazy="dynamic"
     )
 
     # Tags applied to this playlist
@@ -180,11 +187,12 @@ class Playlists(db.Model):
         back_populates="playlists", 
         lazy=True)
     
-    @property
-    def song_count(self):
-        return self.playlist_songs.count()
+    # song_count is a column_property defined below Playlist_Songs
     
-    def to_dict(self):
+    def to_dict(self, playlist_songs=None):
+        """playlist_songs: this playlist's entries when the caller already loaded them"""
+        if playlist_songs is None:
+            playlist_songs = self.playlist_songs.all()
         return {
             "id": self.id,
             "title": self.title,
@@ -192,12 +200,13 @@ class Playlists(db.Model):
             "is_public": self.is_public,
             "is_author_reco": self.is_author_reco,
             "song_count": self.song_count,
-            "songs": [ps.to_dict() for ps in self.playlist_songs.all()],
+            "songs": [ps.to_dict() for ps in playlist_songs],
         }
 
 
     
 #_____________SONGS_____________________
+#audio_features is deferred (large JSON blob); SongDumpSchema routes load it via app/utility/projection.py.
 class Songs(db.Model):
     __tablename__ = 'songs'
     
@@ -208,9 +217,11 @@ class Songs(db.Model):
     album = db.Column(db.String(250), nullable=True)
     album_art = db.Column(db.String(500), nullable=True)
     preview_url = db.Column(db.String(500), nullable=True)
-    audio_features = db.Column(db.JSON, nullable=True)
+    audio_features = deferred(db.Column(db.JSON, nullable=True))
     genres = db.Column(db.JSON, nullable=True)
     source = db.Column(db.String(250), nullable=False, default="Spotify")
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), onupdate=utcnow, index=True)
     
     def to_dict(self):
         return {
@@ -241,7 +252,7 @@ class Tags(db.Model):
     mood_name = db.Column(db.String(100), unique=True, nullable=False)
     category = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
-    updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), onupdate=utcnow)
 
 
 #------------RELATIONSHIPS-----------------
@@ -254,6 +265,43 @@ class Tags(db.Model):
         lazy="dynamic"
     )
 
+#_____________JOBS_____________________
+#background work queue (metadata enrichment, refreshes). lives in the main database so it runs on a single box without an external broker.
+class Jobs(db.Model):
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON, nullable=True)
+    status = db.Column(
+        db.Enum('queued', 'running', 'succeeded', 'failed', name='job_statuses'),
+        default='queued',
+        nullable=False,
+        index=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    last_error = db.Column(db.String(1000), nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    run_after = db.Column(db.DateTime(timezone=True), server_default=func.now(), index=True)
+    locked_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), onupdate=utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "last_error": self.last_error,
+            "result": self.result,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
 #_____________ASSOCIATION TABLES_____________________
     
 class Playlist_Songs(db.Model):
@@ -275,6 +323,17 @@ class Playlist_Songs(db.Model):
         }
 
 
+# one correlated COUNT in the playlist's own SELECT; project() undefers it
+# for schemas that dump song_count, so lists don't count per playlist
+Playlists.song_count = column_property(
+    select(func.count(Playlist_Songs.id))
+    .where(Playlist_Songs.playlist_id == Playlists.id)
+    .correlate_except(Playlist_Songs)
+    .scalar_subquery(),
+    deferred=True,
+)
+
+
     
 #_____________JUNCTION TABLES_____________________
 #all tables use composite primary keys to prevent duplicate entries
@@ -302,4 +361,11 @@ class Book_Authors(db.Model):
     book_id = db.Column(db.Integer, db.ForeignKey('books.id'), primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
 
+#normalized ISBN-13s of each book (mirrors Books.isbn_list, see app/utility/isbn.py); isbn13 is indexed for /books/isbn/<isbn>
+class Book_Isbns(db.Model):
+    __tablename__ = 'book_isbns'
+
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id', ondelete='CASCADE'), primary_key=True)
+    isbn13 = db.Column(db.String(13), primary_key=True, index=True)
+
     
\ No newline at end of file
@@ -0,0 +1,461 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Books,
+    Playlist_Books,
+    Playlist_Songs,
+    Playlist_Tags,
+    Playlists,
+    Songs,
+    Tags,
+    Users,
+)
+from app.utility.metrics import record_cache
+from app.utility.replicas import PRIMARY, read_from
+
+# ------------------ READ-THROUGH CACHE ------------------ #
+# Serialized payloads keyed per entity, each stored with the tags of every
+# row it was built from:
+#
+#   entry = read_through(
+#       versioned_key(f"playlist:{playlist_id}:detail", version),
+#       lambda: (payload, {"playlist:1", "song:3", "user:2"}),
+#   )
+#
+# Writes invalidate by tag: an after_flush listener collects the tags of
+# every flushed row (a playlist, its songs/books/tags junction rows, the
+# rows they point to) and after_commit evicts exactly those entries. Bulk
+# UPDATE/DELETE statements are caught in do_orm_execute; when they don't
+# name their rows, the whole kind ("book:*") is evicted.
+#
+# Every invalidation advances a global epoch and stamps its tags with it.
+# read_through notes the epoch before loading and drops its write if any
+# of the entry's tags was invalidated since, so a load that raced a commit
+# can't cache pre-commit data.
+#
+# Tag invalidation only reaches the processes sharing the backend: with
+# "memory" that is the process that committed. Keys of entries built from
+# rows other processes write (enrichment jobs, edits served by another
+# worker) therefore carry the row version the payload was built from
+# (versioned_key; the same version the route's ETag uses), so a changed
+# row is a different key everywhere and the stale entry just ages out.
+#
+# Backends: "memory" (per-process LRU) or "sqlite" (a file shared by every
+# process on the host; stand-in for a networked cache).
+
+
+def versioned_key(key, version):
+    """key plus a digest of the row version its payload is built from."""
+    return f"{key}@{hashlib.sha1(repr(version).encode()).hexdigest()[:16]}"
+
+
+def _encode(value):
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+# --------------------------------------------------------
+# BACKENDS
+# --------------------------------------------------------
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, max_entries=10_000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (encoded value, expires_at, tags)
+        self._by_tag = {}               # tag -> set(keys)
+        self._invalidated = {}          # tag -> epoch of its last invalidation
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] and entry[1] < time.time():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def epoch(self):
+        return self._epoch
+
+    def set(self, key, encoded, tags, ttl, since_epoch):
+        with self._lock:
+            if any(self._invalidated.get(tag, 0) > since_epoch for tag in tags):
+                return False
+            self._drop(key)
+            self._entries[key] = (encoded, time.time() + ttl if ttl else None, tags)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+            return True
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def invalidate(self, tags):
+        with self._lock:
+            self._epoch += 1
+            evicted = 0
+            for tag in tags:
+                self._invalidated[tag] = self._epoch
+                for key in list(self._by_tag.get(tag, ())):
+                    self._drop(key)
+                    evicted += 1
+
+            # only loads still in flight care about old invalidations
+            if len(self._invalidated) > self.max_entries * 4:
+                horizon = self._epoch - 1000
+                self._invalidated = {t: e for t, e in self._invalidated.items() if e > horizon}
+            return evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_tag.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class SqliteBackend:
+    """Cache in a local SQLite file, shared by every worker process on the host."""
+
+    name = "sqlite"
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS cache_entries ("
+        " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)",
+        "CREATE TABLE IF NOT EXISTS cache_tags ("
+        " tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key))",
+        "CREATE INDEX IF NOT EXISTS ix_cache_tags_key ON cache_tags (key)",
+        "CREATE TABLE IF NOT EXISTS cache_invalidations ("
+        " tag TEXT PRIMARY KEY, epoch INTEGER NOT NULL)",
+    )
+    _EPOCH = "__epoch__"  # cache_invalidations row holding the global epoch
+
+    def __init__(self, path, max_entries=100_000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._connect()
+        for statement in self._SCHEMA:
+            conn.execute(statement)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] and row[1] < time.time():
+            return None
+        return row[0]
+
+    def epoch(self):
+        row = self._connect().execute(
+            "SELECT epoch FROM cache_invalidations WHERE tag = ?", (self._EPOCH,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def set(self, key, encoded, tags, ttl, since_epoch):
+        tags = list(tags)
+        marks = ",".join("?" * len(tags))
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            newer = tags and conn.execute(
+                f"SELECT 1 FROM cache_invalidations WHERE tag IN ({marks}) AND epoch > ? LIMIT 1",
+                [*tags, since_epoch],
+            ).fetchone()
+            if newer:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute("DELETE FROM cache_tags WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, encoded, time.time() + ttl if ttl else None),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)",
+                [(tag, key) for tag in tags],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._writes += 1
+        if self._writes % 500 == 0:
+            self.prune()
+        return True
+
+    def invalidate(self, tags):
+        tags = list(tags)
+        if not tags:
+            return 0
+        marks = ",".join("?" * len(tags))
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO cache_invalidations (tag, epoch) VALUES (?, 1) "
+                "ON CONFLICT (tag) DO UPDATE SET epoch = epoch + 1",
+                (self._EPOCH,),
+            )
+            epoch = self.epoch()
+            conn.executemany(
+                "INSERT INTO cache_invalidations (tag, epoch) VALUES (?, ?) "
+                "ON CONFLICT (tag) DO UPDATE SET epoch = excluded.epoch",
+                [(tag, epoch) for tag in tags],
+            )
+            keys = f"SELECT key FROM cache_tags WHERE tag IN ({marks})"
+            evicted = conn.execute(f"DELETE FROM cache_entries WHERE key IN ({keys})", tags).rowcount
+            conn.execute(f"DELETE FROM cache_tags WHERE key IN ({keys})", tags)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return evicted
+
+    def prune(self):
+        """Drop expired entries and trim to max_entries (oldest expiry first)."""
+        conn = self._connect()
+        conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM cache_entries WHERE key IN ("
+            " SELECT key FROM cache_entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        conn.execute("DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache_entries)")
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM cache_entries")
+        conn.execute("DELETE FROM cache_tags")
+
+    def size(self):
+        return self._connect().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+
+# --------------------------------------------------------
+# CACHE
+# --------------------------------------------------------
+
+class Cache:
+    def __init__(self, backend, default_ttl=3600):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        encoded = self.backend.get(key)
+        if encoded is None:
+            self.misses += 1
+            record_cache("read", False)
+            return None
+        self.hits += 1
+        record_cache("read", True)
+        return json.loads(encoded)
+
+    def read_through(self, key, loader, ttl=None):
+        """
+        Cached value for key, or loader() -> (value, tags) on a miss.
+        A loader returning None (e.g. row not found) is not cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        since_epoch = self.backend.epoch()
+        # a lagging replica could refill an entry a commit just evicted
+        with read_from(PRIMARY):
+            loaded = loader()
+        if loaded is None:
+            return None
+        value, tags = loaded
+        tags = set(tags)
+        tags |= {tag.split(":", 1)[0] + ":*" for tag in tags}  # bulk writes evict by kind
+
+        encoded = _encode(value)
+        if not _pending_tags_touch(tags):  # don't cache our own uncommitted writes
+            self.backend.set(key, encoded, tags, ttl or self.default_ttl, since_epoch)
+        return json.loads(encoded)
+
+    def invalidate(self, tags):
+        if tags:
+            self.evictions += self.backend.invalidate(set(tags))
+
+    def stats(self):
+        return {
+            "backend": self.backend.name,
+            "entries": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def get_cache():
+    return current_app.extensions.get("read_cache") if has_app_context() else None
+
+
+def read_through(key, loader, ttl=None):
+    cache = get_cache()
+    if cache is None:
+        loaded = loader()
+        return None if loaded is None else json.loads(_encode(loaded[0]))
+    return cache.read_through(key, loader, ttl)
+
+
+def invalidate(*tags):
+    cache = get_cache()
+    if cache is not None:
+        cache.invalidate(tags)
+
+
+# --------------------------------------------------------
+# TAGS FROM WRITES
+# --------------------------------------------------------
+
+def _tags_for(obj):
+    cls = type(obj)
+    if cls is Books:
+        return {f"book:{obj.id}"}
+    if cls is Songs:
+        return {f"song:{obj.id}"}
+    if cls is Tags:
+        return {f"tag:{obj.id}"}
+    if cls is Playlists:
+        return {f"playlist:{obj.id}"}
+    if cls is Users:
+        return {f"user:{obj.id}"}
+    if cls is Playlist_Songs:
+        return {f"playlist:{obj.playlist_id}"}
+    if cls is Playlist_Books:
+        # book detail embeds the owner's author-reco playlist
+        return {f"playlist:{obj.playlist_id}", f"book:{obj.book_id}"}
+    if cls is Playlist_Tags:
+        return {f"playlist:{obj.playlist_id}"}
+    return set()
+
+
+_KIND_TAGS = {
+    Books: ("book", "book:*"),
+    Songs: ("song", "song:*"),
+    Tags: ("tag", "tag:*"),
+    Playlists: ("playlist", "playlist:*"),
+    Users: ("user", "user:*"),
+    Playlist_Songs: (None, "playlist:*"),
+    Playlist_Books: (None, "playlist:*"),
+    Playlist_Tags: (None, "playlist:*"),
+}
+
+
+def _pending(session):
+    return session.info.setdefault("cache_tags", set())
+
+
+def _pending_tags_touch(tags):
+    # a read inside a transaction that already wrote these rows
+    from app.extensions import db
+
+    pending = db.session().info.get("cache_tags")
+    return bool(pending and pending & tags)
+
+
+def _after_flush(session, flush_context):
+    pending = _pending(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        pending |= _tags_for(obj)
+
+
+def _do_orm_execute(state):
+    if not (state.is_update or state.is_delete):
+        return
+    mapper = state.bind_mapper
+    model = mapper.class_ if mapper is not None else None
+    if model not in _KIND_TAGS:
+        return
+
+    prefix, wide = _KIND_TAGS[model]
+    params = state.parameters
+    if prefix and isinstance(params, list) and params and all("id" in p for p in params):
+        # bulk UPDATE by primary key (e.g. metadata refresh)
+        _pending(state.session).update(f"{prefix}:{p['id']}" for p in params)
+    else:
+        _pending(state.session).add(wide)
+
+
+def _after_commit(session):
+    tags = session.info.pop("cache_tags", None)
+    if tags:
+        invalidate(*tags)
+
+
+def _after_rollback(session):
+    session.info.pop("cache_tags", None)
+
+
+# --------------------------------------------------------
+# SETUP
+# --------------------------------------------------------
+
+def init_cache(app):
+    config = app.config
+    kind = config.get("CACHE_BACKEND", "memory")
+    max_entries = config.get("CACHE_MAX_ENTRIES", 10_000)
+
+    if kind == "sqlite":
+        path = config.get("CACHE_SQLITE_PATH") or os.path.join(app.instance_path, "cache.sqlite3")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        backend = SqliteBackend(path, max_entries)
+    elif kind == "memory":
+        backend = MemoryBackend(max_entries)
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND '{kind}'")
+
+    app.extensions["read_cache"] = Cache(backend, config.get("CACHE_DEFAULT_TTL", 3600))
+
+    for name, listener in (
+        ("after_flush", _after_flush),
+        ("do_orm_execute", _do_orm_execute),
+        ("after_commit", _after_commit),
+        ("after_rollback", _after_rollback),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
@@ -0,0 +1,113 @@
+import re
+
+from app.models import Books, Songs
+from app.utility.isbn import normalize_isbns
+
+# ------------------ CATALOG ROW BUILDERS ------------------ #
+# Turn normalized upstream metadata (openlibrary.py / spotify.py) into
+# Books and Songs rows. Shared by the single-item routes, bulk import and
+# the background enrichment jobs.
+
+
+def extract_year(raw_year):
+    """Pull a 4-digit year out of whatever Open Library returned."""
+    if not raw_year:
+        return None
+
+    match = re.search(r"\b(\d{4})\b", str(raw_year))
+    return int(match.group(1)) if match else None
+
+
+# --------------------------------------------------------
+# BOOKS
+# --------------------------------------------------------
+
+def placeholder_book(openlib_id):
+    """
+    Verified book row inserted before its metadata arrives.
+    The title falls back to the Open Library id until enrichment runs.
+    """
+    return Books(
+        title=openlib_id,
+        author_names=[],
+        author_keys=[],
+        subjects=[],
+        isbn_list=[],
+        openlib_id=openlib_id,
+        api_source="openlibrary",
+        api_id=openlib_id,
+        source="verified"
+    )
+
+
+def openlibrary_columns(ol_data):
+    """Books column values derived from fetch_openlibrary_work output."""
+    desc = ol_data.get("description")
+    if isinstance(desc, dict):
+        desc = desc.get("value")
+    elif not isinstance(desc, str):
+        desc = None
+
+    columns = {
+        "description": desc,
+        "subjects": ol_data.get("subjects") or [],
+        "author_names": ol_data.get("author_names") or [],
+        "author_keys": ol_data.get("author_keys") or [],
+        "cover_url": ol_data.get("cover_url"),
+        "cover_id": ol_data.get("cover_id"),
+        "isbn_list": normalize_isbns(ol_data.get("isbn_list")),
+        "first_publish_year": extract_year(ol_data.get("first_publish_year")),
+    }
+    if ol_data.get("title"):
+        columns["title"] = ol_data["title"]
+    return columns
+
+
+def apply_openlibrary(book, ol_data):
+    """Copy fetch_openlibrary_work output onto an existing Books row."""
+    for column, value in openlibrary_columns(ol_data).items():
+        setattr(book, column, value)
+    return book
+
+
+def book_from_openlibrary(openlib_id, ol_data):
+    """Build (but do not add) a verified Books row from fetch_openlibrary_work output."""
+    return apply_openlibrary(placeholder_book(openlib_id), ol_data)
+
+
+# --------------------------------------------------------
+# SONGS
+# --------------------------------------------------------
+
+def placeholder_song(spotify_id):
+    """Song row inserted before its Spotify metadata arrives."""
+    return Songs(
+        title=spotify_id,
+        artists=[],
+        spotify_id=spotify_id,
+        source="spotify"
+    )
+
+
+def spotify_columns(track, features, genres):
+    """Songs column values derived from fetch_spotify_track output (plus features/genres)."""
+    return {
+        "title": track["title"],
+        "artists": track["artists"],
+        "album": track["album"],
+        "preview_url": track["preview_url"],
+        "audio_features": features,
+        "genres": genres,
+    }
+
+
+def apply_spotify(song, track, features, genres):
+    """Copy fetch_spotify_track output (plus features/genres) onto a Songs row."""
+    for column, value in spotify_columns(track, features, genres).items():
+        setattr(song, column, value)
+    return song
+
+
+def song_from_spotify(spotify_id, track, features, genres):
+    """Build (but do not add) a Songs row from fetch_spotify_track output."""
+    return apply_spotify(placeholder_song(spotify_id), track, features, genres)
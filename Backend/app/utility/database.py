@@ -0,0 +1,108 @@
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+from app.extensions import db
+
+# ------------------ ENGINE OPTIONS + SQLITE TUNING ------------------ #
+# The DB_* settings in config.py become SQLALCHEMY_ENGINE_OPTIONS for the
+# configured backend (a config that sets SQLALCHEMY_ENGINE_OPTIONS itself
+# wins):
+#
+#   Postgres       pool_size / max_overflow / pool_timeout / pool_recycle /
+#                  pool_pre_ping, plus a per-connection statement_timeout
+#   SQLite file    pool_size / max_overflow / pool_timeout (a local file
+#                  never goes stale, so no pre-ping or recycle)
+#   SQLite memory  left to SQLAlchemy's single-connection pool
+#
+# SQLite connections also get SQLITE_PRAGMAS (WAL, synchronous=NORMAL,
+# busy_timeout, mmap_size) from a connect event, so concurrent workers
+# wait for the write lock instead of failing with "database is locked".
+#
+# The schema is managed by Flask-Migrate (migrations/, `flask db upgrade`);
+# init_migrations() wires it up for the flask command and scripts.
+#
+# Each SQLALCHEMY_REPLICA_URIS entry gets an engine built the same way;
+# they are kept in app.extensions["db_replicas"] for RoutingSession.
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(config, uri=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for uri (default: config's database URI) and DB_* settings."""
+    url = make_url(uri or config["SQLALCHEMY_DATABASE_URI"])
+    backend = url.get_backend_name()
+    if _is_memory_sqlite(url):
+        return {}
+
+    options = {
+        "pool_size": config.get("DB_POOL_SIZE", 5),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 30),
+    }
+    if backend == "sqlite":
+        return options
+
+    options["pool_pre_ping"] = config.get("DB_POOL_PRE_PING", True)
+    options["pool_recycle"] = config.get("DB_POOL_RECYCLE", 1800)
+
+    timeout_ms = config.get("DB_STATEMENT_TIMEOUT_MS", 0)
+    if backend == "postgresql" and timeout_ms:
+        options["connect_args"] = {"options": f"-c statement_timeout={int(timeout_ms)}"}
+    return options
+
+
+def _pragma_listener(pragmas):
+    statements = [f"PRAGMA {name}={value}" for name, value in pragmas.items()]
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return set_pragmas
+
+
+def configure_engine_options(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS before db.init_app creates the engine."""
+    if not app.config.get("SQLALCHEMY_ENGINE_OPTIONS"):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+
+
+def _tune_sqlite(engine, pragmas):
+    if not pragmas or engine.dialect.name != "sqlite" or _is_memory_sqlite(engine.url):
+        return
+    engine.dispose()   # connections opened before this point miss the pragmas
+    event.listen(engine, "connect", _pragma_listener(pragmas))
+
+
+def init_database(app):
+    """Tune the app's SQLite engines and create its read-replica engines."""
+    pragmas = app.config.get("SQLITE_PRAGMAS")
+    with app.app_context():
+        for engine in db.engines.values():
+            _tune_sqlite(engine, pragmas)
+
+    replicas = []
+    for uri in app.config.get("SQLALCHEMY_REPLICA_URIS") or []:
+        engine = create_engine(uri, **engine_options(app.config, uri))
+        _tune_sqlite(engine, pragmas)
+        replicas.append(engine)
+    app.extensions["db_replicas"] = replicas
+
+
+def init_migrations(app):
+    """Register Flask-Migrate (flask db ...) with the repo's migrations/ directory."""
+    from flask_migrate import Migrate
+
+    Migrate(
+        app, db,
+        directory=os.path.join(os.path.dirname(app.root_path), "migrations"),
+        render_as_batch=True,   # batch mode for SQLite ALTER TABLE
+    )
@@ -0,0 +1,76 @@
+from sqlalchemy import select, update
+
+from app.extensions import db
+from app.models import Books, Playlist_Books, Songs, Users
+from app.utility.catalog import apply_openlibrary, apply_spotify
+from app.utility import http
+from app.utility.jobs import RetryJob, failure_handler, job_handler
+from app.utility.openlibrary import fetch_openlibrary_work_concurrently
+from app.utility.spotify import fetch_track_with_details_concurrently
+
+# ------------------ ENRICHMENT JOBS ------------------ #
+# Routes insert a placeholder Books/Songs row and enqueue one of these, so
+# the request never waits on Open Library or Spotify. Independent upstream
+# calls inside a job (edition pages, author and artist lookups, features vs.
+# genres) are awaited together, so each job holds its worker for less time.
+#
+# A book whose enrichment fails for good (unknown id, retries used up) is
+# taken out of every library and deleted, so nobody is left with a row
+# titled after its Open Library id.
+
+
+@job_handler("enrich_book")
+def enrich_book(payload):
+    """payload: {"book_id": int, "openlib_id": str}"""
+    book = db.session.get(Books, payload["book_id"])
+    if not book:
+        return {"skipped": "book deleted"}
+
+    ol_data = http.fan_out(fetch_openlibrary_work_concurrently(payload.get("openlib_id") or book.openlib_id))
+    if not ol_data:
+        raise RetryJob("Failed to fetch book from Open Library")
+
+    apply_openlibrary(book, ol_data)
+    return {"book_id": book.id}
+
+
+@failure_handler("enrich_book")
+def drop_book_placeholder(payload):
+    """Delete a never-enriched placeholder and take it out of every library."""
+    book = db.session.get(Books, payload["book_id"])
+    if not book or book.title != book.openlib_id:
+        return  # deleted, or enriched meanwhile (by a later import)
+
+    in_playlist = db.session.execute(
+        select(Playlist_Books.playlist_id).where(Playlist_Books.book_id == book.id).limit(1)
+    ).first()
+    if in_playlist is not None:
+        return  # a playlist needs its book; leave it for the next import to enrich
+
+    rows = db.session.execute(
+        select(Users.id, Users.library).where(Users.library.isnot(None))
+    ).all()
+    for user_id, library in rows:
+        kept = [b for b in library or [] if str(b) != str(book.id)]
+        if len(kept) != len(library or []):
+            db.session.execute(
+                update(Users).where(Users.id == user_id).values(library=kept)
+                .execution_options(synchronize_session=False)
+            )
+    db.session.delete(book)
+
+
+@job_handler("enrich_song")
+def enrich_song(payload):
+    """payload: {"song_id": int, "spotify_id": str}"""
+    song = db.session.get(Songs, payload["song_id"])
+    if not song:
+        return {"skipped": "song deleted"}
+
+    spotify_id = payload.get("spotify_id") or song.spotify_id
+    track, features, genres = http.fan_out(fetch_track_with_details_concurrently(spotify_id))
+    if not track:
+        raise RetryJob("Failed to fetch track from Spotify")
+
+    apply_spotify(song, track, features, genres)
+    return {"song_id": song.id}
@@ -0,0 +1,306 @@
+import io
+import json
+import zipfile
+from datetime import date, datetime, timezone
+
+from sqlalchemy import or_, select, true, tuple_
+
+from app.extensions import db
+from app.models import (
+    Books,
+    Playlist_Books,
+    Playlist_Songs,
+    Playlist_Tags,
+    Playlists,
+    Songs,
+    Tags,
+    Users,
+)
+
+# ------------------ EXPORT SECTIONS ------------------ #
+# Sections are always streamed in this order. Each record carries a cursor
+# ("<section>:<key>") so an interrupted download can resume right after the
+# last record the client received.
+
+EXPORT_SECTIONS = (
+    "users",
+    "playlists",
+    "books",
+    "playlist_books",
+    "songs",
+    "playlist_songs",
+    "tags",
+    "playlist_tags",
+)
+
+# never leave the database, even for admins
+USER_EXPORT_COLUMNS = [c for c in Users.__table__.columns if c.name != "password"]
+
+# keyset order of each section, used for batching and resuming (all integers)
+SECTION_KEYS = {
+    "users": (Users.id,),
+    "playlists": (Playlists.id,),
+    "books": (Books.id,),
+    "playlist_books": (Playlist_Books.playlist_id, Playlist_Books.book_id),
+    "songs": (Songs.id,),
+    "playlist_songs": (Playlist_Songs.id,),
+    "tags": (Tags.id,),
+    "playlist_tags": (Playlist_Tags.playlist_id, Playlist_Tags.tag_id),
+}
+
+
+# --------------------------------------------------------
+# SET-BASED QUERIES
+# --------------------------------------------------------
+
+def _in_scope(column, user_ids):
+    """user_ids=None means every user (admin bulk export)."""
+    if user_ids is None:
+        return true()
+    return column.in_(user_ids)
+
+
+def _scoped_playlist_ids(user_ids):
+    return select(Playlists.id).where(_in_scope(Playlists.user_id, user_ids))
+
+
+def _library_book_ids(user_ids):
+    """
+    Libraries are JSON lists on Users, so they are collected in Python.
+    Only used for scoped exports, where the set is small.
+    """
+    ids = set()
+    rows = db.session.execute(
+        select(Users.library).where(Users.id.in_(user_ids))
+    )
+    for (library,) in rows:
+        for book_id in library or []:
+            try:
+                ids.add(int(book_id))
+            except (TypeError, ValueError):
+                continue
+    return ids
+
+
+def _section_query(section, user_ids):
+    """Returns (select statement, key columns) for one section."""
+    if section == "users":
+        stmt = select(*USER_EXPORT_COLUMNS).where(_in_scope(Users.id, user_ids))
+        return stmt, SECTION_KEYS[section]
+
+    if section == "playlists":
+        stmt = select(Playlists.__table__).where(_in_scope(Playlists.user_id, user_ids))
+        return stmt, SECTION_KEYS[section]
+
+    if section == "books":
+        stmt = select(Books.__table__)
+        if user_ids is not None:
+            in_playlists = select(Playlist_Books.book_id).where(
+                Playlist_Books.playlist_id.in_(_scoped_playlist_ids(user_ids))
+            )
+            library_ids = _library_book_ids(user_ids)
+            stmt = stmt.where(or_(Books.id.in_(in_playlists), Books.id.in_(library_ids)))
+        return stmt, SECTION_KEYS[section]
+
+    if section == "playlist_books":
+        stmt = select(Playlist_Books.__table__).where(
+            Playlist_Books.playlist_id.in_(_scoped_playlist_ids(user_ids))
+        )
+        return stmt, SECTION_KEYS[section]
+
+    if section == "songs":
+        stmt = select(Songs.__table__)
+        if user_ids is not None:
+            stmt = stmt.where(Songs.id.in_(
+                select(Playlist_Songs.song_id).where(
+                    Playlist_Songs.playlist_id.in_(_scoped_playlist_ids(user_ids))
+                )
+            ))
+        return stmt, SECTION_KEYS[section]
+
+    if section == "playlist_songs":
+        stmt = select(Playlist_Songs.__table__).where(
+            Playlist_Songs.playlist_id.in_(_scoped_playlist_ids(user_ids))
+        )
+        return stmt, SECTION_KEYS[section]
+
+    if section == "tags":
+        stmt = select(Tags.__table__)
+        if user_ids is not None:
+            stmt = stmt.where(Tags.id.in_(
+                select(Playlist_Tags.tag_id).where(
+                    Playlist_Tags.playlist_id.in_(_scoped_playlist_ids(user_ids))
+                )
+            ))
+        return stmt, SECTION_KEYS[section]
+
+    if section == "playlist_tags":
+        stmt = select(Playlist_Tags.__table__).where(
+            Playlist_Tags.playlist_id.in_(_scoped_playlist_ids(user_ids))
+        )
+        return stmt, SECTION_KEYS[section]
+
+    raise ValueError(f"Unknown export section: {section}")
+
+
+def _after_key(key_columns, key_values):
+    if len(key_columns) == 1:
+        return key_columns[0] > key_values[0]
+    return tuple_(*key_columns) > tuple_(*key_values)
+
+
+# --------------------------------------------------------
+# CURSORS
+# --------------------------------------------------------
+
+def format_cursor(section, key_values):
+    return f"{section}:{'.'.join(str(v) for v in key_values)}"
+
+
+def parse_cursor(cursor):
+    """
+    Parse "<section>:<key>" into (section, key tuple).
+    Raises ValueError for anything malformed, including a key with the
+    wrong number of parts for its section (it would fail in the database,
+    after a streamed response has started).
+    """
+    section, sep, raw_key = (cursor or "").partition(":")
+    if not sep or section not in EXPORT_SECTIONS:
+        raise ValueError("Invalid export cursor")
+
+    parts = raw_key.split(".")
+    if len(parts) != len(SECTION_KEYS[section]) or not all(part.isdigit() for part in parts):
+        raise ValueError("Invalid export cursor")
+    return section, tuple(int(part) for part in parts)
+
+
+# --------------------------------------------------------
+# RECORD STREAM
+# --------------------------------------------------------
+
+def _jsonable(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def iter_export_records(user_ids=None, cursor=None, batch_size=500):
+    """
+    Yield (section, cursor, row dict) for every exported row.
+
+    Each section is read with keyset pagination in batches of batch_size,
+    so memory stays flat no matter how large the export is.
+    """
+    start_section, start_key = (None, None)
+    if cursor:
+        start_section, start_key = parse_cursor(cursor)
+
+    sections = EXPORT_SECTIONS
+    if start_section:
+        sections = EXPORT_SECTIONS[EXPORT_SECTIONS.index(start_section):]
+
+    for section in sections:
+        stmt, key_columns = _section_query(section, user_ids)
+        last_key = start_key if section == start_section else None
+
+        while True:
+            batch = stmt
+            if last_key is not None:
+                batch = batch.where(_after_key(key_columns, last_key))
+            batch = batch.order_by(*key_columns).limit(batch_size)
+
+            rows = db.session.execute(batch).mappings().all()
+            if not rows:
+                break
+
+            for row in rows:
+                last_key = tuple(row[col.name] for col in key_columns)
+                data = {name: _jsonable(value) for name, value in row.items()}
+                yield section, format_cursor(section, last_key), data
+
+            if len(rows) < batch_size:
+                break
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":"), default=str)
+
+
+def stream_ndjson(records):
+    """One JSON object per line: {"section", "cursor", "data"}."""
+    for section, cursor, data in records:
+        yield _dumps({"section": section, "cursor": cursor, "data": data}) + "\n"
+
+
+# --------------------------------------------------------
+# ZIP BUNDLE
+# --------------------------------------------------------
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable sink that hands written bytes back out."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(records, manifest=None):
+    """
+    Stream a zip holding one JSON array per section plus manifest.json.
+    Entries are written with data descriptors, so nothing is buffered
+    beyond the current record.
+    """
+    sink = _ChunkSink()
+    counts = {}
+    last_cursor = None
+
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        entry = None
+        current = None
+
+        for section, cursor, data in records:
+            if section != current:
+                if entry:
+                    entry.write(b"]")
+                    entry.close()
+                current = section
+                counts[section] = 0
+                entry = bundle.open(f"{section}.json", mode="w", force_zip64=True)
+                entry.write(b"[")
+
+            if counts[section]:
+                entry.write(b",")
+            entry.write(_dumps(data).encode())
+            counts[section] += 1
+            last_cursor = cursor
+
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+        if entry:
+            entry.write(b"]")
+            entry.close()
+
+        bundle.writestr("manifest.json", _dumps({
+            **(manifest or {}),
+            "sections": counts,
+            "last_cursor": last_cursor,
+        }))
+
+    yield sink.drain()
@@ -0,0 +1,172 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.utility import metrics
+from app.utility.instrumentation import record_upstream
+
+# ------------------ SHARED HTTP SESSION ------------------ #
+# One pooled session for every upstream call (Open Library, Spotify), so
+# repeated and concurrent requests reuse keep-alive connections instead of
+# opening a new TLS connection each time.
+
+POOL_MAXSIZE = 32
+DEFAULT_TIMEOUT = 15  # seconds
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+
+# ------------------ PER-HOST RATE BUDGETS ------------------ #
+# Each configured host gets a token bucket refilled at `rate` requests per
+# second. Interactive calls (route handlers) always go through and just
+# spend tokens. Background calls (made inside `with background():`) wait
+# until the bucket holds more than the share reserved for interactive
+# traffic, so batch work only ever uses spare capacity.
+
+class _HostBudget:
+    def __init__(self, rate, background_share):
+        self.rate = float(rate)
+        self.reserve = self.rate * (1 - background_share)
+        self.capacity = self.rate + 1
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def spend(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+
+    def wait_for_spare(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                needed = self.reserve + 1 - self.tokens
+                if needed <= 0:
+                    self.tokens -= 1
+                    return
+            time.sleep(needed / self.rate)
+
+
+_budgets = {}
+_budgets_lock = threading.Lock()
+_background = ContextVar("upstream_background", default=False)
+
+
+def configure_budgets(rates, background_share=0.5):
+    """rates: {"openlibrary.org": 5, "api.spotify.com": 10} requests/second."""
+    with _budgets_lock:
+        _budgets.clear()
+        for host, rate in (rates or {}).items():
+            if rate and rate > 0:
+                _budgets[host] = _HostBudget(rate, background_share)
+
+
+def _budget_for(url):
+    host = urlsplit(url).hostname or ""
+    budget = _budgets.get(host)
+    if budget is None and host.count(".") > 1:
+        # api.spotify.com -> spotify.com style fallback
+        budget = _budgets.get(host.split(".", 1)[1])
+    return budget
+
+
+@contextmanager
+def background():
+    """Mark upstream calls made in this block (this thread/task) as background work."""
+    token = _background.set(True)
+    try:
+        yield
+    finally:
+        _background.reset(token)
+
+
+def _throttle(url):
+    budget = _budget_for(url)
+    if budget is None:
+        return
+    if _background.get():
+        budget.wait_for_spare()
+    else:
+        budget.spend()
+
+
+def _send(method, url, kwargs):
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    _throttle(url)
+    started = time.perf_counter()
+    status = None
+    try:
+        response = _session.request(method, url, **kwargs)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        record_upstream(url, elapsed)
+        metrics.record_upstream(url, elapsed, status)
+
+
+def get(url, **kwargs):
+    return _send("GET", url, kwargs)
+
+
+def post(url, **kwargs):
+    return _send("POST", url, kwargs)
+
+
+# ------------------ THREAD-POOL FAN-OUT ------------------ #
+# Concurrent, not async I/O: pooled_get / pooled_post run the blocking
+# get/post above on a bounded thread pool, wrapped as awaitables only so a
+# caller can start several at once and collect them with asyncio.gather
+# instead of one after another. They share the session's keep-alive
+# connections, rate budgets and timeouts, and the caller's context (Flask
+# app context, background() priority) goes along to the pool thread.
+#
+#   def handler():
+#       async def both():
+#           return await asyncio.gather(http.pooled_get(work_url), http.pooled_get(editions_url))
+#       work, page = http.fan_out(both())
+#
+# fan_out() blocks the calling thread (a Flask worker, a job worker) until
+# every call is done, with a short-lived event loop per fan-out; what the
+# pool saves is the sum of the upstream latencies, not the worker. The
+# request stack is sync and requests has no async transport, so there is
+# no shared async client here.
+
+_executor = ThreadPoolExecutor(max_workers=POOL_MAXSIZE, thread_name_prefix="upstream")
+
+
+async def in_pool(func, *args, **kwargs):
+    """Await func(*args, **kwargs) run on the upstream thread pool, in the caller's context."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(_executor, call)
+
+
+async def pooled_get(url, **kwargs):
+    return await in_pool(get, url, **kwargs)
+
+
+async def pooled_post(url, **kwargs):
+    return await in_pool(post, url, **kwargs)
+
+
+def fan_out(coro):
+    """Run a fan-out coroutine to completion, blocking the calling thread; returns its result."""
+    return asyncio.run(coro)
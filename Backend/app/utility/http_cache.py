@@ -0,0 +1,216 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, make_response, request
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models import (
+    Books,
+    Playlist_Books,
+    Playlist_Songs,
+    Playlist_Tags,
+    Playlists,
+    Songs,
+    Tags,
+    Users,
+)
+from app.utility.metrics import record_cache
+
+# ------------------ HTTP RESPONSE CACHING ------------------ #
+# @cache_response adds ETag / Cache-Control to GET routes.
+#
+#   @cache_response(version=lambda: fetch_version(*row_version(Tags)),
+#                   scope="public", max_age=300, shared=True)
+#
+# With a `version` function (called with the view's arguments) the ETag is
+# derived from row versions, so a matching If-None-Match gets a 304 before
+# the view queries or serializes anything, and public responses can be
+# served from a shared in-process cache. Without one, the ETag is a hash of
+# the response body (saves bandwidth, not work).
+#
+# Private responses carry the user id in their ETag and `Vary: Authorization`.
+
+_SHARED_MAX_BODY = 1024 * 1024  # bytes; larger responses aren't kept in memory
+
+
+class _SharedCache:
+    """Small LRU of serialized public responses, keyed by ETag."""
+
+    def __init__(self):
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                record_cache("http_shared", False)
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+        record_cache("http_shared", True)
+        return item
+
+    def set(self, key, value, max_entries):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+shared_cache = _SharedCache()
+
+
+# --------------------------------------------------------
+# ROW VERSIONS
+# --------------------------------------------------------
+
+def row_version(model, *criteria):
+    """
+    Scalar subqueries (count, sum of keys, newest change) for the rows of
+    model matching criteria. Together they change on insert, delete,
+    re-pointing a junction row, and any ORM update that bumps updated_at.
+    """
+    key = model.__table__.primary_key.columns.values()[-1]
+    columns = [
+        select(func.count()).select_from(model).where(*criteria).scalar_subquery(),
+        select(func.coalesce(func.sum(key), 0)).where(*criteria).scalar_subquery(),
+    ]
+    if hasattr(model, "updated_at"):
+        changed = func.coalesce(model.updated_at, model.created_at)
+        columns.append(select(func.max(changed)).where(*criteria).scalar_subquery())
+    return columns
+
+
+def fetch_version(*columns):
+    """Evaluate row_version() columns in a single round trip."""
+    return tuple(db.session.execute(select(*columns)).one())
+
+
+def playlist_version(*criteria):
+    """Version columns for playlists matching criteria plus everything they embed."""
+    ids = select(Playlists.id).where(*criteria)
+    song_ids = select(Playlist_Songs.song_id).where(Playlist_Songs.playlist_id.in_(ids))
+    book_ids = select(Playlist_Books.book_id).where(Playlist_Books.playlist_id.in_(ids))
+    tag_ids = select(Playlist_Tags.tag_id).where(Playlist_Tags.playlist_id.in_(ids))
+    user_ids = select(Playlists.user_id).where(*criteria)
+
+    return [
+        *row_version(Playlists, *criteria),
+        *row_version(Playlist_Songs, Playlist_Songs.playlist_id.in_(ids)),
+        *row_version(Songs, Songs.id.in_(song_ids)),
+        *row_version(Playlist_Books, Playlist_Books.playlist_id.in_(ids)),
+        *row_version(Books, Books.id.in_(book_ids)),
+        *row_version(Playlist_Tags, Playlist_Tags.playlist_id.in_(ids)),
+        *row_version(Tags, Tags.id.in_(tag_ids)),
+        *row_version(Users, Users.id.in_(user_ids)),
+    ]
+
+
+# --------------------------------------------------------
+# DECORATOR
+# --------------------------------------------------------
+
+def _cache_control(scope, max_age):
+    value = f"{scope}, max-age={max_age}"
+    return value + ", must-revalidate" if max_age else value + ", no-cache"
+
+
+def _version_etag(version, user_id):
+    key = repr((request.path, sorted(request.args.items(multi=True)), version, user_id))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _not_modified(etag, cache_control, vary):
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = cache_control
+    if vary:
+        response.headers["Vary"] = "Authorization"
+    return response
+
+
+def cache_response(version=None, scope="private", max_age=0, shared=False):
+    """
+    version:  f(*view_args, **view_kwargs) -> hashable, or None when the
+              request can't be versioned (e.g. not found / forbidden)
+    scope:    "private" (per user) or "public"
+    max_age:  seconds clients may reuse the response without revalidating
+    shared:   keep public responses in the in-process cache
+    """
+    if shared and scope != "public":
+        raise ValueError("Only public responses can use the shared cache")
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET" or not current_app.config.get("HTTP_CACHE_ENABLED", True):
+                return f(*args, **kwargs)
+
+            private = scope == "private"
+            user = args[0] if private and args else None
+            cache_control = _cache_control(scope, max_age)
+
+            etag = None
+            if version is not None:
+                current = version(*args, **kwargs)
+                if current is not None:
+                    etag = _version_etag(current, getattr(user, "id", None))
+
+                    if request.if_none_match:
+                        revalidated = request.if_none_match.contains_weak(etag)
+                        record_cache("http_etag", revalidated)
+                        if revalidated:
+                            return _not_modified(etag, cache_control, private)
+
+                    if shared:
+                        cached = shared_cache.get(etag)
+                        if cached is not None:
+                            body, mimetype = cached
+                            response = Response(body, status=200, mimetype=mimetype)
+                            response.set_etag(etag, weak=True)
+                            response.headers["Cache-Control"] = cache_control
+                            return response
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+
+            response.headers["Cache-Control"] = cache_control
+            if private:
+                response.vary.add("Authorization")
+
+            if etag is None:
+                # unversioned: strong ETag from the body
+                response.add_etag()
+                response = response.make_conditional(request)
+                if request.if_none_match:
+                    record_cache("http_etag", response.status_code == 304)
+                return response
+
+            response.set_etag(etag, weak=True)
+            if shared and response.content_length and response.content_length <= _SHARED_MAX_BODY:
+                shared_cache.set(
+                    etag,
+                    (response.get_data(), response.mimetype),
+                    current_app.config.get("HTTP_SHARED_CACHE_SIZE", 128),
+                )
+            return response
+
+        return wrapper
+    return decorator
@@ -0,0 +1,398 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from flask import current_app
+
+from app.extensions import db
+from app.models import Books, Playlist_Books, Playlist_Songs, Playlists, Songs
+from app.utility.catalog import book_from_openlibrary, song_from_spotify
+from app.utility.openlibrary import fetch_openlibrary_work
+from app.utility.reconcile import find_custom_book
+from app.utility.spotify import fetch_track_details_batch, TRACKS_BATCH_SIZE
+
+# ------------------ BULK IMPORT ------------------ #
+# Bundle shape (JSON), or the same items as NDJSON lines tagged with "type":
+#
+#   {
+#     "books": ["OL82563W", ...],
+#     "songs": ["4uLU6hMCjMI75M1A2tKUQC", ...],
+#     "playlists": [
+#       {"title": "...", "description": "...", "openlib_id": "OL82563W",
+#        "songs": ["<spotify id>", ...]},
+#       {"title": "...", "custom_book_title": "...", "custom_author_name": "...",
+#        "custom_publish_year": 1999, "songs": [...]}
+#     ]
+#   }
+#
+# NDJSON: {"type": "book", "openlib_id": ...}
+#         {"type": "song", "spotify_id": ...}
+#         {"type": "playlist", ...playlist fields...}
+
+IN_CLAUSE_CHUNK = 500  # ids per IN (...) lookup
+
+
+class BundleError(ValueError):
+    """Raised for malformed bundles; the message is safe to show the client."""
+
+
+# --------------------------------------------------------
+# PARSING
+# --------------------------------------------------------
+
+def _normalize_openlib_id(raw):
+    if isinstance(raw, dict):
+        raw = raw.get("openlib_id")
+    if not raw or not isinstance(raw, str):
+        raise BundleError("Every book needs an openlib_id string")
+    return raw.split("/")[-1]
+
+
+def _normalize_spotify_id(raw):
+    if isinstance(raw, dict):
+        raw = raw.get("spotify_id")
+    if not raw or not isinstance(raw, str):
+        raise BundleError("Every song needs a spotify_id string")
+    return raw
+
+
+def _normalize_year(raw):
+    if raw is None or raw == "":
+        return None
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        raise BundleError("custom_publish_year must be a whole number") from None
+
+
+def _normalize_playlist(raw):
+    if not isinstance(raw, dict):
+        raise BundleError("Every playlist must be an object")
+
+    title = raw.get("title")
+    if not title or not isinstance(title, str):
+        raise BundleError("Every playlist needs a title")
+
+    openlib_id = raw.get("openlib_id")
+    custom_title = raw.get("custom_book_title")
+    custom_author = raw.get("custom_author_name")
+
+    if openlib_id and (custom_title or custom_author):
+        raise BundleError("Cannot provide custom book fields when openlib_id is present.")
+    if not openlib_id and (not custom_title or not custom_author):
+        raise BundleError(
+            "custom_book_title and custom_author_name are required when openlib_id is not provided."
+        )
+
+    return {
+        "title": title,
+        "description": raw.get("description"),
+        "openlib_id": _normalize_openlib_id(openlib_id) if openlib_id else None,
+        "custom_book_title": custom_title,
+        "custom_author_name": custom_author,
+        "custom_publish_year": _normalize_year(raw.get("custom_publish_year")),
+        "songs": [_normalize_spotify_id(s) for s in raw.get("songs") or []],
+    }
+
+
+def parse_bundle(raw_body, is_ndjson):
+    """
+    Parse a JSON or NDJSON import bundle into
+    {"books": [...], "songs": [...], "playlists": [...]}.
+    """
+    bundle = {"books": [], "songs": [], "playlists": []}
+
+    if is_ndjson:
+        for line_no, line in enumerate(raw_body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                raise BundleError(f"Line {line_no} is not valid JSON")
+            if not isinstance(item, dict):
+                raise BundleError(f"Line {line_no} must be an object")
+
+            item_type = item.get("type")
+            if item_type == "book":
+                bundle["books"].append(_normalize_openlib_id(item))
+            elif item_type == "song":
+                bundle["songs"].append(_normalize_spotify_id(item))
+            elif item_type == "playlist":
+                bundle["playlists"].append(_normalize_playlist(item))
+            else:
+                raise BundleError(f'Line {line_no} has unknown type "{item_type}"')
+        return bundle
+
+    try:
+        data = json.loads(raw_body or "null")
+    except ValueError:
+        raise BundleError("Body is not valid JSON")
+    if not isinstance(data, dict):
+        raise BundleError("Bundle must be a JSON object")
+
+    bundle["books"] = [_normalize_openlib_id(b) for b in data.get("books") or []]
+    bundle["songs"] = [_normalize_spotify_id(s) for s in data.get("songs") or []]
+    bundle["playlists"] = [_normalize_playlist(p) for p in data.get("playlists") or []]
+    return bundle
+
+
+def bundle_size(bundle):
+    return (
+        len(bundle["books"])
+        + len(bundle["songs"])
+        + len(bundle["playlists"])
+        + sum(len(p["songs"]) for p in bundle["playlists"])
+    )
+
+
+# --------------------------------------------------------
+# HELPERS
+# --------------------------------------------------------
+
+def _unique(items):
+    return list(dict.fromkeys(items))
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _existing_by(column, values):
+    """Map column value -> row id for rows that already exist, in chunked IN lookups."""
+    found = {}
+    for batch in _chunks(values, IN_CLAUSE_CHUNK):
+        rows = db.session.query(column, column.class_.id).filter(column.in_(batch))
+        for value, row_id in rows:
+            found.setdefault(value, row_id)
+    return found
+
+
+def _in_app_context(app, fn, *args):
+    with app.app_context():
+        return fn(*args)
+
+
+def _progress(stage, done, total):
+    return {"event": "progress", "stage": stage, "done": done, "total": total}
+
+
+# --------------------------------------------------------
+# IMPORT
+# --------------------------------------------------------
+
+def run_import(user, bundle):
+    """
+    Import a parsed bundle for user. Generator: yields progress events and
+    finishes with {"event": "done", "summary": {...}}.
+
+    - Books and songs are deduped against the catalog in bulk.
+    - Missing metadata is fetched concurrently (Open Library) or through
+      Spotify's multi-id endpoints.
+    - Rows are committed in chunks so a failure late in a large import
+      keeps everything already written.
+    """
+    app = current_app._get_current_object()
+    chunk_size = app.config.get("IMPORT_COMMIT_CHUNK", 100)
+    max_workers = app.config.get("IMPORT_MAX_WORKERS", 8)
+
+    summary = {
+        "books": {"existing": 0, "imported": 0, "failed": []},
+        "songs": {"existing": 0, "imported": 0, "failed": []},
+        "playlists": {"created": 0, "skipped": []},
+        "library_added": 0,
+    }
+
+    # ---------------------------------------------------------
+    # 1. BOOKS
+    # ---------------------------------------------------------
+    openlib_ids = _unique(
+        bundle["books"] + [p["openlib_id"] for p in bundle["playlists"] if p["openlib_id"]]
+    )
+    book_ids = _existing_by(Books.openlib_id, openlib_ids)
+    summary["books"]["existing"] = len(book_ids)
+
+    missing_books = [oid for oid in openlib_ids if oid not in book_ids]
+    yield _progress("books", 0, len(missing_books))
+
+    if missing_books:
+        pending = []
+        done = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(_in_app_context, app, fetch_openlibrary_work, oid): oid
+                for oid in missing_books
+            }
+            for future in as_completed(futures):
+                oid = futures[future]
+                try:
+                    ol_data = future.result()
+                except Exception:
+                    ol_data = None
+
+                if not ol_data:
+                    summary["books"]["failed"].append(oid)
+                else:
+                    book = book_from_openlibrary(oid, ol_data)
+                    db.session.add(book)
+                    pending.append((oid, book))
+
+                done += 1
+                if len(pending) >= chunk_size:
+                    # ids before the commit: reading them after it reloads each expired row
+                    db.session.flush()
+                    book_ids.update((oid, book.id) for oid, book in pending)
+                    db.session.commit()
+                    pending = []
+                    yield _progress("books", done, len(missing_books))
+
+        db.session.flush()
+        book_ids.update((oid, book.id) for oid, book in pending)
+        db.session.commit()
+        summary["books"]["imported"] = len(missing_books) - len(summary["books"]["failed"])
+        yield _progress("books", done, len(missing_books))
+
+    # ---------------------------------------------------------
+    # 2. LIBRARY (one assignment for every imported book)
+    # ---------------------------------------------------------
+    library = list(user.library or [])
+    in_library = set(library)
+    for oid in _unique(bundle["books"]):
+        book_id = book_ids.get(oid)
+        if book_id and book_id not in in_library:
+            library.append(book_id)
+            in_library.add(book_id)
+            summary["library_added"] += 1
+
+    # ---------------------------------------------------------
+    # 3. SONGS
+    # ---------------------------------------------------------
+    spotify_ids = _unique(
+        bundle["songs"] + [sid for p in bundle["playlists"] for sid in p["songs"]]
+    )
+    song_ids = _existing_by(Songs.spotify_id, spotify_ids)
+    summary["songs"]["existing"] = len(song_ids)
+
+    missing_songs = [sid for sid in spotify_ids if sid not in song_ids]
+    yield _progress("songs", 0, len(missing_songs))
+
+    if missing_songs:
+        done = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            batches = list(_chunks(missing_songs, max(chunk_size, TRACKS_BATCH_SIZE)))
+            futures = [
+                pool.submit(_in_app_context, app, fetch_track_details_batch, batch)
+                for batch in batches
+            ]
+            for batch, future in zip(batches, futures):
+                try:
+                    tracks, features, genres = future.result()
+                except Exception:
+                    tracks, features, genres = {}, {}, {}
+
+                new_rows = []
+                for sid in batch:
+                    track = tracks.get(sid)
+                    if not track:
+                        summary["songs"]["failed"].append(sid)
+                        continue
+                    song = song_from_spotify(sid, track, features.get(sid), genres.get(sid, []))
+                    db.session.add(song)
+                    new_rows.append((sid, song))
+
+                db.session.flush()
+                song_ids.update((sid, song.id) for sid, song in new_rows)
+                db.session.commit()
+                done += len(batch)
+                yield _progress("songs", done, len(missing_songs))
+
+        summary["songs"]["imported"] = len(missing_songs) - len(summary["songs"]["failed"])
+
+    # ---------------------------------------------------------
+    # 4. PLAYLISTS
+    # ---------------------------------------------------------
+    total = len(bundle["playlists"])
+    yield _progress("playlists", 0, total)
+
+    books_with_playlist = set(
+        book_id for (book_id,) in
+        db.session.query(Playlist_Books.book_id)
+        .join(Playlists, Playlists.id == Playlist_Books.playlist_id)
+        .filter(Playlists.user_id == user.id, Playlists.is_author_reco == False)
+    )
+
+    for index, item in enumerate(bundle["playlists"], start=1):
+        if item["openlib_id"]:
+            book_id = book_ids.get(item["openlib_id"])
+            if not book_id:
+                summary["playlists"]["skipped"].append(
+                    {"title": item["title"], "reason": "Book could not be imported"})
+                continue
+        else:
+            # Reuse an identical custom book (like create_playlist) instead of a duplicate row
+            custom_book = find_custom_book(
+                item["custom_book_title"], item["custom_author_name"], item["custom_publish_year"]
+            )
+            if custom_book is None:
+                custom_book = Books(
+                    title=item["custom_book_title"],
+                    author_names=[item["custom_author_name"]],
+                    author_keys=[],
+                    isbn_list=[],
+                    first_publish_year=item["custom_publish_year"],
+                    subjects=[],
+                    source="custom"
+                )
+                db.session.add(custom_book)
+                db.session.flush()
+            book_id = custom_book.id
+
+        if book_id in books_with_playlist:
+            summary["playlists"]["skipped"].append(
+                {"title": item["title"], "reason": "You already have a playlist for this book"})
+            continue
+
+        # a playlist's book always ends up in the library, like create_playlist
+        if book_id not in in_library:
+            library.append(book_id)
+            in_library.add(book_id)
+            summary["library_added"] += 1
+
+        playlist = Playlists(
+            title=item["title"],
+            description=item["description"],
+            is_public=False,
+            is_author_reco=False,
+            user_id=user.id
+        )
+        db.session.add(playlist)
+        db.session.flush()
+
+        db.session.add(Playlist_Books(playlist_id=playlist.id, book_id=book_id))
+        books_with_playlist.add(book_id)
+
+        order_index = 0
+        for sid in _unique(item["songs"]):
+            song_id = song_ids.get(sid)
+            if not song_id:
+                continue
+            db.session.add(Playlist_Songs(
+                playlist_id=playlist.id,
+                song_id=song_id,
+                order_index=order_index
+            ))
+            order_index += 1
+
+        summary["playlists"]["created"] += 1
+
+        if index % chunk_size == 0:
+            user.library = list(library)
+            db.session.commit()
+            yield _progress("playlists", index, total)
+
+    user.library = library
+    db.session.commit()
+    yield _progress("playlists", total, total)
+
+    yield {"event": "done", "summary": summary}
+
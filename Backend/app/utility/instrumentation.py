@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlsplit
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ------------------ PER-REQUEST INSTRUMENTATION ------------------ #
+# While a request is served, a RequestStats collects:
+#
+#   - SQL statements and their total time (cursor execute events on every
+#     engine, primary and replicas)
+#   - upstream HTTP calls and their time per host (app/utility/http.py)
+#   - serialization time (app/utility/serializers.py dump/fast_jsonify)
+#
+# and the response gets a Server-Timing header plus one log line:
+#
+#   Server-Timing: db;dur=4.1;desc="6 queries", upstream-openlibrary.org;dur=310.2;desc="2 calls",
+#                  serialize;dur=1.3, total;dur=322.0
+#
+# The stats live in a ContextVar, so calls made on http's executor threads
+# (which copy the caller's context) are counted too; job workers and CLI
+# commands have none and record nothing. Streamed responses are measured up
+# to the point the body starts streaming.
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.upstream = {}          # host -> [calls, seconds]
+        self.serialize_time = 0.0
+        self._lock = threading.Lock()
+
+    def add_sql(self, seconds):
+        with self._lock:
+            self.sql_count += 1
+            self.sql_time += seconds
+
+    def add_upstream(self, host, seconds):
+        with self._lock:
+            entry = self.upstream.setdefault(host, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def add_serialize(self, seconds):
+        with self._lock:
+            self.serialize_time += seconds
+
+    def server_timing(self, total):
+        metrics = [f'db;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"']
+        for host, (calls, seconds) in self.upstream.items():
+            metrics.append(f'upstream-{host};dur={seconds * 1000:.1f};desc="{calls} calls"')
+        metrics.append(f"serialize;dur={self.serialize_time * 1000:.1f}")
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def as_fields(self, total):
+        return {
+            "duration_ms": round(total * 1000, 1),
+            "sql_count": self.sql_count,
+            "db_ms": round(self.sql_time * 1000, 1),
+            "upstream": {
+                host: {"calls": calls, "ms": round(seconds * 1000, 1)}
+                for host, (calls, seconds) in self.upstream.items()
+            },
+            "serialize_ms": round(self.serialize_time * 1000, 1),
+        }
+
+
+def current():
+    """The RequestStats of the request being served, or None."""
+    return _current.get()
+
+
+def record_upstream(url, seconds):
+    stats = _current.get()
+    if stats is not None:
+        stats.add_upstream(urlsplit(url).hostname or "", seconds)
+
+
+@contextmanager
+def serializing():
+    """Count the time spent in this block as serialization."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.add_serialize(time.perf_counter() - started)
+
+
+# --------------------------------------------------------
+# SQL
+# --------------------------------------------------------
+
+# the start time rides on the execution context, so a statement that fails
+# (no after event) leaves nothing behind
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._instrument_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_instrument_started", None)
+    if stats is not None and started is not None:
+        stats.add_sql(time.perf_counter() - started)
+
+
+# --------------------------------------------------------
+# REQUEST HOOKS
+# --------------------------------------------------------
+
+def _start_request():
+    g._request_stats_token = _current.set(RequestStats())
+
+
+def _finish_request(response):
+    stats = _current.get()
+    if stats is None:
+        return response
+    total = time.perf_counter() - stats.started
+    config = current_app.config
+
+    if config.get("SERVER_TIMING_HEADER", True):
+        response.headers["Server-Timing"] = stats.server_timing(total)
+
+    fields = {"method": request.method, "path": request.path, "status": response.status_code}
+    fields.update(stats.as_fields(total))
+    logger.info(
+        "%s %s %s %.1fms sql=%d/%.1fms",
+        request.method, request.path, response.status_code,
+        fields["duration_ms"], stats.sql_count, fields["db_ms"],
+        extra=fields,
+    )
+
+    threshold = config.get("REQUEST_QUERY_WARN_THRESHOLD")
+    if threshold and stats.sql_count > threshold:
+        logger.warning(
+            "%s %s ran %d SQL statements (threshold %d)",
+            request.method, request.path, stats.sql_count, threshold,
+            extra=fields,
+        )
+    return response
+
+
+def _end_request(exc):
+    token = g.pop("_request_stats_token", None)
+    if token is not None:
+        _current.reset(token)
+
+
+def init_instrumentation(app):
+    """Measure every request (REQUEST_INSTRUMENTATION, default on)."""
+    if not app.config.get("REQUEST_INSTRUMENTATION", True):
+        return
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_end_request)
@@ -0,0 +1,141 @@
+import re
+
+from sqlalchemy import delete, event, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Book_Isbns, Books
+
+# ------------------ ISBN NORMALIZATION + LOOKUP TABLE ------------------ #
+# Open Library returns ISBN-10s and ISBN-13s, hyphenated or not, repeated
+# across editions. Everything is stored as ISBN-13 (digits only, deduped,
+# first-seen order) in Books.isbn_list, and mirrored into book_isbns
+# (book_id, isbn13) so GET /books/isbn/<isbn> is an index lookup:
+#
+#   to_isbn13("0-306-40615-2")  -> "9780306406157"
+#   normalize_isbns(["0306406152", "978-0-306-40615-7"]) -> ["9780306406157"]
+#
+# book_isbns follows Books.isbn_list on flush; bulk UPDATEs (metadata
+# refresh) call sync() themselves, like the search index. backfill()
+# rebuilds the table from Books.isbn_list.
+
+_SEPARATORS = re.compile(r"[\s\-]")
+
+
+def _isbn13_check_digit(first12):
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def _isbn10_is_valid(isbn):
+    total = sum((10 - i) * (10 if ch == "X" else int(ch)) for i, ch in enumerate(isbn))
+    return total % 11 == 0
+
+
+def to_isbn13(value):
+    """Normalized ISBN-13 for an ISBN-10/13 string, or None if it isn't valid."""
+    if value is None:
+        return None
+    isbn = _SEPARATORS.sub("", str(value)).upper()
+
+    if len(isbn) == 10 and isbn[:9].isdigit() and (isbn[9].isdigit() or isbn[9] == "X"):
+        if not _isbn10_is_valid(isbn):
+            return None
+        first12 = "978" + isbn[:9]
+        return first12 + _isbn13_check_digit(first12)
+
+    if len(isbn) == 13 and isbn.isdigit() and isbn[:3] in ("978", "979"):
+        return isbn if _isbn13_check_digit(isbn[:12]) == isbn[12] else None
+
+    return None
+
+
+def normalize_isbns(values):
+    """ISBN-13s for values, invalid entries dropped, duplicates removed (order kept)."""
+    seen = {}
+    for value in values or []:
+        isbn = to_isbn13(value)
+        if isbn:
+            seen.setdefault(isbn, None)
+    return list(seen)
+
+
+# --------------------------------------------------------
+# LOOKUP TABLE
+# --------------------------------------------------------
+
+def sync(connection, isbns_by_book):
+    """Replace the book_isbns rows of each book id with its normalized list."""
+    if not isbns_by_book:
+        return
+    connection.execute(delete(Book_Isbns).where(Book_Isbns.book_id.in_(list(isbns_by_book))))
+    rows = [
+        {"book_id": book_id, "isbn13": isbn}
+        for book_id, isbns in isbns_by_book.items()
+        for isbn in normalize_isbns(isbns)
+    ]
+    if rows:
+        connection.execute(insert(Book_Isbns), rows)
+
+
+def find_book(isbn, options=()):
+    """The local book for an ISBN (verified preferred), or None. isbn may be ISBN-10/13."""
+    isbn13 = to_isbn13(isbn)
+    if not isbn13:
+        return None
+    return db.session.execute(
+        select(Books)
+        .options(*options)
+        .join(Book_Isbns, Book_Isbns.book_id == Books.id)
+        .where(Book_Isbns.isbn13 == isbn13)
+        .order_by((Books.source == "verified").desc(), Books.id)
+        .limit(1)
+    ).scalar()
+
+
+def backfill(batch_size=1000):
+    """Fill book_isbns from Books.isbn_list for every book. Returns rows written."""
+    connection = db.session.connection()
+    written = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Books.id, Books.isbn_list)
+            .where(Books.id > last_id)
+            .order_by(Books.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        batch = {book_id: isbns for book_id, isbns in rows if isbns}
+        sync(connection, batch)
+        written += sum(len(normalize_isbns(isbns)) for isbns in batch.values())
+        last_id = rows[-1].id
+    db.session.commit()
+    return written
+
+
+# --------------------------------------------------------
+# SYNC ON FLUSH
+# --------------------------------------------------------
+
+def _after_flush(session, flush_context):
+    changed = {}
+    for obj in session.new:
+        if type(obj) is Books and obj.isbn_list:
+            changed[obj.id] = obj.isbn_list
+    for obj in session.dirty:
+        if type(obj) is Books and inspect(obj).attrs.isbn_list.history.has_changes():
+            changed[obj.id] = obj.isbn_list or []
+
+    deleted = [obj.id for obj in session.deleted if type(obj) is Books]
+    if deleted:
+        session.connection().execute(delete(Book_Isbns).where(Book_Isbns.book_id.in_(deleted)))
+    if changed:
+        sync(session.connection(), changed)
+
+
+def init_isbns(app):
+    """Keep book_isbns in sync (fill an existing database with `flask books backfill-isbns`)."""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
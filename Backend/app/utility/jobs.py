@@ -0,0 +1,320 @@
+import importlib
+import logging
+import os
+import threading
+import traceback
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, or_, select, update
+
+from app.extensions import db
+from app.models import Jobs
+
+# ------------------ JOB QUEUE ------------------ #
+# A small database-backed queue. Jobs live in the `jobs` table, so the
+# queue works on SQLite or Postgres with no broker. Any number of worker
+# threads/processes can poll it: a job is claimed with a conditional
+# UPDATE, so only one worker ever runs it.
+#
+#   @job_handler("enrich_book")
+#   def enrich_book(payload): ...
+#
+#   job = enqueue("enrich_book", {"book_id": 1}, user_id=current_user.id)
+#   db.session.commit()
+#
+#   @failure_handler("enrich_book")
+#   def drop_placeholder(payload): ...   # once retries are used up
+
+_handlers = {}
+_failure_handlers = {}
+
+# modules whose @job_handler functions make up the queue's job kinds
+HANDLER_MODULES = (
+    "app.utility.enrichment",
+    "app.utility.reconcile",
+    "app.utility.refresh",
+)
+_periodic = {}  # kind -> (config key, default interval in seconds)
+
+logger = logging.getLogger(__name__)
+
+
+class RetryJob(Exception):
+    """Raise from a handler to retry later (counts as an attempt)."""
+
+
+def job_handler(kind):
+    """Register the function that runs jobs of this kind."""
+    def wrapper(f):
+        _handlers[kind] = f
+        return f
+    return wrapper
+
+
+def failure_handler(kind):
+    """Register cleanup that runs (in its own transaction) when a job of this kind fails for good."""
+    def wrapper(f):
+        _failure_handlers[kind] = f
+        return f
+    return wrapper
+
+
+def periodic_job(kind, interval_key, default_interval):
+    """
+    Register a handler that reschedules itself every
+    app.config[interval_key] seconds (see schedule_periodic_jobs).
+    """
+    def wrapper(f):
+        _periodic[kind] = (interval_key, default_interval)
+        return job_handler(kind)(f)
+    return wrapper
+
+
+def register_handlers():
+    """Import HANDLER_MODULES; their decorators fill the handler registry."""
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+
+def init_jobs(app):
+    """Register every job handler, so workers and enqueue callers agree on the kinds."""
+    register_handlers()
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+# --------------------------------------------------------
+# ENQUEUE
+# --------------------------------------------------------
+
+def enqueue(kind, payload=None, user_id=None, run_after=None, max_attempts=None):
+    """
+    Add a job to the current session. The caller commits, so the job is
+    written in the same transaction as the rows it refers to.
+    """
+    if kind not in _handlers:
+        raise ValueError(f"No handler registered for job kind '{kind}'")
+
+    job = Jobs(
+        kind=kind,
+        payload=payload or {},
+        user_id=user_id,
+        status="queued",
+        attempts=0,
+        max_attempts=max_attempts or current_app.config.get("JOB_MAX_ATTEMPTS", 5),
+        run_after=run_after or _now(),
+    )
+    db.session.add(job)
+    db.session.flush()
+    return job
+
+
+def _has_pending(kind):
+    return db.session.execute(
+        select(Jobs.id)
+        .where(Jobs.kind == kind, Jobs.status.in_(("queued", "running")))
+        .limit(1)
+    ).first() is not None
+
+
+def _schedule_next(kind, delay=0):
+    if _has_pending(kind):
+        return None
+    return enqueue(kind, run_after=_now() + timedelta(seconds=delay))
+
+
+def schedule_periodic_jobs():
+    """Make sure every periodic job has a queued run. Safe to call repeatedly."""
+    for kind in _periodic:
+        _schedule_next(kind)
+    db.session.commit()
+
+
+# --------------------------------------------------------
+# CLAIM + RUN
+# --------------------------------------------------------
+
+def _claim_next():
+    """
+    Atomically move one runnable job to 'running' and return it.
+    Jobs stuck in 'running' past JOB_LOCK_TIMEOUT (crashed worker) are
+    picked up again.
+    """
+    now = _now()
+    stale = now - timedelta(seconds=current_app.config.get("JOB_LOCK_TIMEOUT", 300))
+
+    runnable = or_(
+        and_(Jobs.status == "queued", Jobs.run_after <= now),
+        and_(Jobs.status == "running", Jobs.locked_at < stale),
+    )
+
+    for _ in range(5):
+        job_id = db.session.execute(
+            select(Jobs.id).where(runnable).order_by(Jobs.run_after, Jobs.id).limit(1)
+        ).scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+
+        claimed = db.session.execute(
+            update(Jobs)
+            .where(Jobs.id == job_id, runnable)
+            .values(status="running", locked_at=now, attempts=Jobs.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        if claimed.rowcount == 1:
+            return db.session.get(Jobs, job_id, populate_existing=True)
+
+    # lost the race repeatedly; let the caller poll again
+    return None
+
+
+def _backoff(attempts):
+    base = current_app.config.get("JOB_RETRY_BASE_DELAY", 5)
+    return timedelta(seconds=base * (2 ** max(attempts - 1, 0)))
+
+
+def run_job(job):
+    """Run one claimed job and record the outcome."""
+    handler = _handlers.get(job.kind)
+
+    try:
+        if handler is None:
+            raise RuntimeError(f"No handler registered for job kind '{job.kind}'")
+        result = handler(dict(job.payload or {}))
+    except Exception as exc:
+        db.session.rollback()
+        job = db.session.get(Jobs, job.id)
+
+        job.last_error = (str(exc) or exc.__class__.__name__)[:1000]
+        job.locked_at = None
+        if job.attempts >= job.max_attempts or handler is None:
+            job.status = "failed"
+        else:
+            job.status = "queued"
+            job.run_after = _now() + _backoff(job.attempts)
+
+        if not isinstance(exc, RetryJob):
+            logger.warning("Job %s (%s) failed: %s", job.id, job.kind, traceback.format_exc())
+        db.session.commit()
+
+        if job.status == "failed":
+            _run_failure_handler(job)
+            _reschedule_periodic(job.kind)
+        return False
+
+    job.status = "succeeded"
+    job.result = result
+    job.last_error = None
+    job.locked_at = None
+    db.session.commit()
+
+    _reschedule_periodic(job.kind)
+    return True
+
+
+def _run_failure_handler(job):
+    handler = _failure_handlers.get(job.kind)
+    if handler is None:
+        return
+    try:
+        handler(dict(job.payload or {}))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception("Cleanup after failed job %s (%s) failed", job.id, job.kind)
+
+
+def _reschedule_periodic(kind):
+    if kind not in _periodic:
+        return
+    interval_key, default_interval = _periodic[kind]
+    _schedule_next(kind, current_app.config.get(interval_key, default_interval))
+    db.session.commit()
+
+
+def run_pending(limit=None):
+    """
+    Run runnable jobs until the queue is empty (or limit is reached).
+    Returns the number of jobs processed.
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        job = _claim_next()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
+
+
+# --------------------------------------------------------
+# IN-PROCESS WORKER
+# --------------------------------------------------------
+
+class JobWorker(threading.Thread):
+    """Daemon thread that polls the queue inside its own app context."""
+
+    def __init__(self, app, poll_interval=1.0, name=None):
+        super().__init__(name=name or "job-worker", daemon=True)
+        self.app = app
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        with self.app.app_context():
+            try:
+                schedule_periodic_jobs()
+            except Exception:
+                logger.exception("Could not schedule periodic jobs")
+            finally:
+                db.session.remove()
+
+        while not self._stop_event.is_set():
+            processed = 0
+            with self.app.app_context():
+                try:
+                    processed = run_pending(limit=50)
+                except Exception:
+                    logger.exception("Job worker loop failed")
+                finally:
+                    db.session.remove()
+
+            if not processed:
+                self._stop_event.wait(self.poll_interval)
+
+
+_workers = []
+
+
+def start_workers(app):
+    """
+    Start JOB_WORKER_THREADS in-process workers (0 disables them, e.g. when
+    a dedicated `flask jobs work` process is used instead).
+    """
+    count = app.config.get("JOB_WORKER_THREADS", 1)
+    if count <= 0 or _workers:
+        return _workers
+
+    # With the dev reloader, only the child process serves requests
+    if app.debug and os.environ.get("WERKZEUG_RUN_MAIN") != "true":
+        return _workers
+
+    for i in range(count):
+        worker = JobWorker(
+            app,
+            poll_interval=app.config.get("JOB_POLL_INTERVAL", 1.0),
+            name=f"job-worker-{i}",
+        )
+        worker.start()
+        _workers.append(worker)
+
+    return _workers
@@ -0,0 +1,88 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from flask.logging import default_handler
+
+# ------------------ LOGGING ------------------ #
+# Every module logs through its own logger under the "app" package
+# (logging.getLogger(__name__) -> "app.blueprints.users.routes"); Flask's
+# app.logger is the "app" logger itself, so both end up in one place.
+#
+# Records are put on an in-memory queue by a QueueHandler and written to
+# stderr by a QueueListener thread, so a request never blocks on the
+# stream. Disabled levels cost one cached isEnabledFor() check; guard
+# messages whose arguments are expensive to build:
+#
+#   logger = logging.getLogger(__name__)
+#   if logger.isEnabledFor(logging.DEBUG):
+#       logger.debug("library book ids: %s", [b.id for b in books])
+#
+# LOG_LEVEL sets the level ("DEBUG", "INFO", ...), LOG_FORMAT picks
+# "text" or "json" (one object per line, plus any extra={...} fields).
+
+ROOT_LOGGER = "app"
+
+# attributes every LogRecord has; anything else came from extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _formatter(kind):
+    if kind == "json":
+        return JsonFormatter()
+    if kind == "text":
+        return logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    raise ValueError(f"Unknown LOG_FORMAT '{kind}'")
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def init_logging(app, stream=None):
+    """Route the "app" logger hierarchy through a queue to stream (default stderr)."""
+    global _listener
+    config = app.config
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(_formatter(config.get("LOG_FORMAT", "text")))
+
+    stop_logging()   # a second create_app (tests, CLI) replaces the first listener
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    for old in [h for h in logger.handlers if isinstance(h, QueueHandler) or h is default_handler]:
+        logger.removeHandler(old)
+    logger.addHandler(QueueHandler(records))
+    logger.setLevel(config.get("LOG_LEVEL", "INFO"))
+    logger.propagate = False
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,185 @@
+import os
+import time
+from urllib.parse import urlsplit
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+from app.extensions import db
+
+# ------------------ PROMETHEUS METRICS ------------------ #
+# GET /metrics serves, in the Prometheus text format:
+#
+#   soundbound_http_request_duration_seconds   histogram  blueprint, route, method
+#   soundbound_http_requests_total             counter    blueprint, route, method, status
+#   soundbound_rate_limit_rejections_total     counter    blueprint, route (429s from the limiter)
+#   soundbound_db_pool_checkouts_total         counter    engine
+#   soundbound_db_pool_connections_total       counter    engine (new DBAPI connections)
+#   soundbound_db_pool_checked_out             gauge      engine
+#   soundbound_db_pool_capacity                gauge      engine (pool_size + max_overflow)
+#   soundbound_db_pool_timeouts_total          counter    requests that gave up waiting for a connection
+#   soundbound_upstream_request_duration_seconds histogram host
+#   soundbound_upstream_requests_total         counter    host, status ("error" = no response)
+#   soundbound_cache_requests_total            counter    cache, result (hit / miss)
+#
+# route is the URL rule ("/books/<openlib_id>"), never the raw path, so the
+# label set stays small. SQLAlchemy has no event before a pool checkout, so
+# waiting shows up as checked_out reaching capacity, and as timeouts.
+#
+# Every update is a per-series counter increment (prometheus_client). Under
+# gunicorn, set PROMETHEUS_MULTIPROC_DIR to an empty directory before the
+# workers start: each worker then writes its series to mmap'd files there and
+# /metrics, answered by any worker, sums them all (gunicorn.conf.py removes
+# a dead worker's live gauges).
+
+_MULTIPROC = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_DURATION = Histogram(
+    "soundbound_http_request_duration_seconds", "Request latency by route",
+    ["blueprint", "route", "method"],
+)
+REQUESTS = Counter(
+    "soundbound_http_requests_total", "Responses by route and status",
+    ["blueprint", "route", "method", "status"],
+)
+RATE_LIMITED = Counter(
+    "soundbound_rate_limit_rejections_total", "Requests rejected by the rate limiter",
+    ["blueprint", "route"],
+)
+
+POOL_CHECKOUTS = Counter(
+    "soundbound_db_pool_checkouts_total", "Connections checked out of the pool", ["engine"],
+)
+POOL_CONNECTIONS = Counter(
+    "soundbound_db_pool_connections_total", "New database connections opened", ["engine"],
+)
+POOL_CHECKED_OUT = Gauge(
+    "soundbound_db_pool_checked_out", "Connections currently checked out", ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_CAPACITY = Gauge(
+    "soundbound_db_pool_capacity", "pool_size + max_overflow", ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_TIMEOUTS = Counter(
+    "soundbound_db_pool_timeouts_total", "Requests that timed out waiting for a pooled connection",
+)
+
+UPSTREAM_DURATION = Histogram(
+    "soundbound_upstream_request_duration_seconds", "Outbound HTTP latency by host", ["host"],
+)
+UPSTREAM_REQUESTS = Counter(
+    "soundbound_upstream_requests_total", "Outbound HTTP requests by host and status",
+    ["host", "status"],
+)
+
+CACHE_REQUESTS = Counter(
+    "soundbound_cache_requests_total", "Cache lookups by cache and result", ["cache", "result"],
+)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_upstream(url, seconds, status):
+    """status: the response's status code, or None when no response came back."""
+    host = urlsplit(url).hostname or ""
+    UPSTREAM_DURATION.labels(host).observe(seconds)
+    UPSTREAM_REQUESTS.labels(host, "error" if status is None else str(status)).inc()
+
+
+# --------------------------------------------------------
+# DB POOL
+# --------------------------------------------------------
+
+def _watch_pool(engine, name):
+    pool = engine.pool
+    if hasattr(pool, "size") and hasattr(pool, "_max_overflow"):
+        POOL_CAPACITY.labels(name).set(pool.size() + max(pool._max_overflow, 0))
+
+    checked_out = POOL_CHECKED_OUT.labels(name)
+    checkouts = POOL_CHECKOUTS.labels(name)
+    connections = POOL_CONNECTIONS.labels(name)
+
+    # registered on the engine, so they survive engine.dispose()
+    event.listen(engine, "connect", lambda *args: connections.inc())
+
+    def on_checkout(*args):
+        checkouts.inc()
+        checked_out.inc()
+
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", lambda *args: checked_out.dec())
+
+
+# --------------------------------------------------------
+# REQUEST HOOKS
+# --------------------------------------------------------
+
+def _route_labels():
+    rule = request.url_rule
+    return request.blueprint or "", rule.rule if rule is not None else "<unmatched>"
+
+
+def _start_request():
+    g._metrics_started = time.perf_counter()
+
+
+def _finish_request(response):
+    started = g.pop("_metrics_started", None)
+    if started is None:
+        return response
+    blueprint, route = _route_labels()
+    REQUEST_DURATION.labels(blueprint, route, request.method).observe(time.perf_counter() - started)
+    REQUESTS.labels(blueprint, route, request.method, str(response.status_code)).inc()
+    if response.status_code == 429:
+        RATE_LIMITED.labels(blueprint, route).inc()
+    return response
+
+
+def _end_request(exc):
+    if isinstance(exc, PoolTimeout):
+        POOL_TIMEOUTS.inc()
+
+
+def _registry():
+    if not _MULTIPROC:
+        return REGISTRY
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view():
+    return Response(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    """Collect request / pool / upstream / cache metrics and serve GET /metrics (METRICS_ENABLED)."""
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+
+    with app.app_context():
+        engines = {"primary": db.engine}
+    for i, engine in enumerate(app.extensions.get("db_replicas", [])):
+        engines[f"replica{i}"] = engine
+    for name, engine in engines.items():
+        _watch_pool(engine, name)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_end_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view, methods=["GET"])
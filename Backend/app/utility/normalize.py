@@ -0,0 +1,17 @@
+import re
+import unicodedata
+
+# ------------------ TEXT NORMALIZATION ------------------ #
+# Shared by reconciliation and typeahead, so "Café", "cafe" and "CAFE!"
+# compare and sort the same everywhere.
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_text(value):
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", str(value))
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    return " ".join(_NON_ALNUM.sub(" ", value.casefold()).split())
@@ -1,12 +1,26 @@
-import requests
+import asyncio
+import os
 import re
 
-BASE_WORK_URL = "https://openlibrary.org/works/{work_key}.json"
-BASE_EDITIONS_URL = "https://openlibrary.org/works/{work_key}/editions.json?limit=50"
-BASE_AUTHOR_URL = "https://openlibrary.org/authors/{author_key}.json"
+from flask import current_app, has_app_context
 
+from app.utility import http
+from app.utility.isbn import to_isbn13
 
-def fetch_openlibrary_work(openlib_work_key: str):
+# OPENLIBRARY_BASE_URL points the client somewhere else (benchmarks/fake_upstreams.py)
+OPENLIBRARY_BASE_URL = os.getenv("OPENLIBRARY_BASE_URL", "https://openlibrary.org").rstrip("/")
+
+BASE_WORK_URL = OPENLIBRARY_BASE_URL + "/works/{work_key}.json"
+BASE_EDITIONS_URL = OPENLIBRARY_BASE_URL + "/works/{work_key}/editions.json"
+BASE_AUTHOR_URL = OPENLIBRARY_BASE_URL + "/authors/{author_key}.json"
+SEARCH_URL = OPENLIBRARY_BASE_URL + "/search.json"
+
+EDITIONS_PAGE_SIZE = 50
+DEFAULT_EDITION_PAGES = 20   # pages read when neither the caller nor config says
+MAX_WORK_ISBNS = 200         # ISBNs kept per work (popular works have thousands)
+
+
+def fetch_openlibrary_work(openlib_work_key: str, max_edition_pages=None):
     """
     Fetch full metadata for a book from Open Library by merging:
     - Work API (subjects, description, covers, author keys)
@@ -16,6 +30,9 @@ def fetch_openlibrary_work(openlib_work_key: str):
     Always normalizes the work key so it accepts:
     - "OL82563W"
     - "/works/OL82563W"
+
+    max_edition_pages caps how many pages of editions are read
+    (default: OPENLIBRARY_EDITION_PAGES).
     """
 
     # -------------------------
@@ -27,117 +44,92 @@ def fetch_openlibrary_work(openlib_work_key: str):
     # 1. Fetch Work metadata
     # -------------------------
     work_url = BASE_WORK_URL.format(work_key=openlib_work_key)
-    resp = requests.get(work_url, headers={"User-Agent": "YourApp/1.0"})
+    resp = http.get(work_url, headers={"User-Agent": "YourApp/1.0"})
 
     if resp.status_code != 200:
         return None
 
     work = resp.json()
 
-    # Normalize description
-    description = extract_description(work)
+    # -------------------------
+    # 2. Walk Edition pages (earliest year + ALL ISBNs + latest ISBN)
+    # -------------------------
+    max_edition_pages = _edition_page_budget(max_edition_pages)
+    summary = summarize_editions(iter_editions(openlib_work_key, max_edition_pages))
 
-    # Extract subjects
-    subjects = work.get("subjects", [])
+    # -------------------------
+    # 3. Author names from the edition, else from the Author API
+    # -------------------------
+    author_names = _edition_author_names(summary) or fetch_author_names(_author_keys(work))
+
+    return _work_metadata(openlib_work_key, work, summary, author_names)
+
+
+def _edition_page_budget(max_edition_pages):
+    if max_edition_pages is not None:
+        return max_edition_pages
+    if has_app_context():
+        return current_app.config.get("OPENLIBRARY_EDITION_PAGES", DEFAULT_EDITION_PAGES)
+    return DEFAULT_EDITION_PAGES
 
-    # Extract cover ID (WORK covers)
-    covers = work.get("covers") or []
-    cover_id = covers[0] if covers else None
 
-    # Extract author keys
-    author_keys = [
+def _author_keys(work):
+    return [
         a["author"]["key"].split("/")[-1]
         for a in work.get("authors", [])
         if "author" in a and "key" in a["author"]
     ]
 
-    # -------------------------
-    # 2. Fetch Edition metadata
-    # -------------------------
-    edition_url = BASE_EDITIONS_URL.format(work_key=openlib_work_key)
-    ed_resp = requests.get(edition_url, headers={"User-Agent": "YourApp/1.0"})
 
-    editions = []
-    if ed_resp.status_code == 200:
-        editions = ed_resp.json().get("entries", [])
+def _edition_author_names(summary):
+    edition_data = summary["first_edition"] or {}
+    return [a["name"] for a in edition_data.get("authors", []) if "name" in a]
 
-    # -------------------------
-    # ⭐ NEW LOGIC: earliest year + ALL ISBNs + latest ISBN
-    # -------------------------
-    earliest_year = None
-    latest_year = None
-    latest_isbn = None
-    all_isbns = []
-
-    for ed in editions:
-        # Collect ALL ISBNs
-        if ed.get("isbn_13"):
-            all_isbns.extend(ed["isbn_13"])
-        if ed.get("isbn_10"):
-            all_isbns.extend(ed["isbn_10"])
-
-        # Extract ANY year from this edition
-        raw = ed.get("publish_date") or ed.get("first_publish_year")
-        if raw:
-            match = re.search(r"\b(\d{4})\b", str(raw))
-            if match:
-                yr = int(match.group(1))
-
-                # Track earliest year
-                if earliest_year is None or yr < earliest_year:
-                    earliest_year = yr
-
-                # Track latest year + ISBN
-                if latest_year is None or yr > latest_year:
-                    latest_year = yr
-                    latest_isbn = (
-                        (ed.get("isbn_13") or [None])[0]
-                        or (ed.get("isbn_10") or [None])[0]
-                    )
+
+def _work_metadata(openlib_work_key, work, summary, author_names):
+    """Normalized metadata from a work, its edition summary and author names."""
+
+    # Normalize description
+    description = extract_description(work)
+
+    # Extract subjects
+    subjects = work.get("subjects", [])
+
+    # Extract cover ID (WORK covers)
+    covers = work.get("covers") or []
+    cover_id = covers[0] if covers else None
 
     # Final normalized values
-    first_publish_year = earliest_year
-    isbn_list = all_isbns
+    first_publish_year = summary["earliest_year"]
+    latest_isbn = summary["latest_isbn"]
+    isbn_list = summary["isbns"]  # ISBN-13, deduped
 
     # -------------------------
-    # 2b. Edition cover fallback (keep your original logic)
+    # Edition cover fallback (keep your original logic)
     # -------------------------
-    edition_data = editions[0] if editions else {}
+    edition_data = summary["first_edition"] or {}
     if not cover_id:
         ed_covers = edition_data.get("covers") or []
         if ed_covers:
             cover_id = ed_covers[0]
 
-    # Extract author names from edition
-    edition_author_names = []
-    if "authors" in edition_data:
-        for a in edition_data["authors"]:
-            if "name" in a:
-                edition_author_names.append(a["name"])
-
-    # -------------------------
-    # 3. Fallback: Fetch author names from Author API
-    # -------------------------
-    if not edition_author_names:
-        edition_author_names = fetch_author_names(author_keys)
-
     # -------------------------
-    # 4. Build cover URL
+    # Build cover URL
     # -------------------------
     cover_url = None
     if cover_id:
         cover_url = f"https://covers.openlibrary.org/b/id/{cover_id}-L.jpg"
 
     # -------------------------
-    # 5. Return normalized metadata
+    # Return normalized metadata
     # -------------------------
     return {
         "title": work.get("title"),
         "description": description,
         "subjects": subjects,
-        "author_names": edition_author_names,
-        "author_keys": author_keys,
-        "isbn_list": isbn_list,              # ⭐ ALL ISBNs
+        "author_names": author_names,
+        "author_keys": _author_keys(work),
+        "isbn_list": isbn_list,              # ⭐ ALL ISBNs (normalized ISBN-13)
         "latest_isbn": latest_isbn,          # ⭐ NEW: LATEST EDITION ISBN
         "first_publish_year": first_publish_year,  # ⭐ EARLIEST YEAR
         "cover_id": cover_id,
@@ -160,17 +152,245 @@ def extract_description(data):
     return None
 
 
+# -------------------------
+# Editions
+# -------------------------
+# Works can have hundreds of editions. They are read page by page and
+# folded into a running summary, so only one page is in memory at a time
+# and the page budget bounds the number of upstream calls.
+
+def iter_editions(openlib_work_key, max_pages=DEFAULT_EDITION_PAGES):
+    """Yield a work's edition entries, fetching one page at a time."""
+    url = BASE_EDITIONS_URL.format(work_key=openlib_work_key)
+    offset = 0
+
+    for _ in range(max(max_pages, 0)):
+        resp = http.get(url, **_edition_page_request(offset))
+        if resp.status_code != 200:
+            return
+
+        page = resp.json()
+        entries = page.get("entries") or []
+        yield from entries
+
+        offset += len(entries)
+        if not entries or not _has_more(page, offset):
+            return
+
+
+def _edition_page_request(offset):
+    return {
+        "params": {"limit": EDITIONS_PAGE_SIZE, "offset": offset},
+        "headers": {"User-Agent": "YourApp/1.0"},
+    }
+
+
+def _has_more(page, offset):
+    links = page.get("links")
+    return "next" in links if links else offset < (page.get("size") or 0)
+
+
+class EditionSummary:
+    """summarize_editions over editions fed in, in order, a page at a time."""
+
+    def __init__(self, max_isbns=MAX_WORK_ISBNS):
+        self.max_isbns = max_isbns
+        self.earliest_year = None
+        self.latest_year = None
+        self.latest_isbn = None
+        self.isbns = {}
+        self.first_edition = None
+
+    def add(self, editions):
+        for ed in editions:
+            if self.first_edition is None:
+                self.first_edition = ed
+
+            # This edition's valid ISBNs; collect them (bounded)
+            edition_isbns = [
+                isbn for isbn in map(to_isbn13, (ed.get("isbn_13") or []) + (ed.get("isbn_10") or []))
+                if isbn
+            ]
+            for isbn in edition_isbns:
+                if len(self.isbns) >= self.max_isbns:
+                    break
+                self.isbns.setdefault(isbn, None)
+
+            # Extract ANY year from this edition
+            raw_year = ed.get("publish_date") or ed.get("first_publish_year")
+            match = re.search(r"\b(\d{4})\b", str(raw_year)) if raw_year else None
+            if not match:
+                continue
+            yr = int(match.group(1))
+
+            # Track earliest year
+            if self.earliest_year is None or yr < self.earliest_year:
+                self.earliest_year = yr
+
+            # Track latest year + ISBN (among editions that have one)
+            if edition_isbns and (self.latest_year is None or yr > self.latest_year):
+                self.latest_year = yr
+                self.latest_isbn = edition_isbns[0]
+
+    def result(self):
+        return {
+            "earliest_year": self.earliest_year,
+            "latest_isbn": self.latest_isbn,
+            "isbns": list(self.isbns),
+            "first_edition": self.first_edition,
+        }
+
+
+def summarize_editions(editions, max_isbns=MAX_WORK_ISBNS):
+    """
+    Earliest publish year, the ISBN of the latest edition, up to max_isbns
+    normalized ISBNs (first seen first) and the first edition entry.
+    """
+    summary = EditionSummary(max_isbns)
+    summary.add(editions)
+    return summary.result()
+
+
 def fetch_author_names(author_keys):
     """Fetch author names from the Author API."""
     names = []
 
     for key in author_keys:
         url = BASE_AUTHOR_URL.format(author_key=key)
-        resp = requests.get(url, headers={"User-Agent": "YourApp/1.0"})
+        name = _author_name(http.get(url, headers={"User-Agent": "YourApp/1.0"}))
+        if name:
+            names.append(name)
 
-        if resp.status_code == 200:
-            data = resp.json()
-            if "name" in data:
-                names.append(data["name"])
+    return names
+
+
+def _author_name(resp):
+    if resp.status_code != 200:
+        return None
+    return resp.json().get("name")
 
-    return names
\ No newline at end of file
+def search_openlibrary(q, limit=20):
+    """
+    Run an Open Library search query. Returns a list of result dicts
+    (only docs with a cover), or None if the request failed.
+    """
+    return _search_results(http.get(SEARCH_URL, params={"q": q, "limit": limit}))
+
+
+def _search_results(resp):
+    if resp.status_code != 200:
+        return None
+
+    results = []
+    for doc in resp.json().get("docs", []):
+        cover_id = doc.get("cover_i")
+
+        # Only keep docs that actually have a real cover
+        if not cover_id:
+            continue
+
+        results.append({
+            "title": doc.get("title", "Unknown Title"),
+            "authors": doc.get("author_name", []) or [],
+            "publish_year": doc.get("first_publish_year"),
+            "cover_id": cover_id,
+            "openlib_id": doc.get("key", "").split("/")[-1],
+        })
+
+    return results
+
+
+# --------------------------------------------------------
+# CONCURRENT VARIANTS
+# --------------------------------------------------------
+# Same results as the functions above, with independent calls in flight
+# at once on http's thread pool: the work and the first editions page, the
+# remaining edition pages (within the page budget, a few at a time, folded
+# into the summary as they arrive) and the author lookups. Drive them with
+# http.fan_out(...) from sync code (it blocks until they are done) or
+# await them from another fan-out coroutine.
+
+async def fetch_openlibrary_work_concurrently(openlib_work_key: str, max_edition_pages=None):
+    """fetch_openlibrary_work, with the work and edition requests in flight together."""
+    openlib_work_key = openlib_work_key.split("/")[-1]
+    max_edition_pages = _edition_page_budget(max_edition_pages)
+
+    work_url = BASE_WORK_URL.format(work_key=openlib_work_key)
+    resp, summary = await asyncio.gather(
+        http.pooled_get(work_url, headers={"User-Agent": "YourApp/1.0"}),
+        summarize_editions_concurrently(openlib_work_key, max_edition_pages),
+    )
+    if resp.status_code != 200:
+        return None
+
+    work = resp.json()
+    author_names = (
+        _edition_author_names(summary)
+        or await fetch_author_names_concurrently(_author_keys(work))
+    )
+    return _work_metadata(openlib_work_key, work, summary, author_names)
+
+
+async def summarize_editions_concurrently(openlib_work_key, max_pages=DEFAULT_EDITION_PAGES, concurrency=None):
+    """
+    summarize_editions(iter_editions(...)), with the pages fetched
+    concurrently. The first page gives the total; the remaining pages are
+    requested `concurrency` at a time (OPENLIBRARY_EDITION_CONCURRENCY) and
+    folded into the summary in order, so no more than that many pages are
+    held at once.
+    """
+    url = BASE_EDITIONS_URL.format(work_key=openlib_work_key)
+    concurrency = max(concurrency or _edition_concurrency(), 1)
+    summary = EditionSummary()
+    offset = 0
+    pages = 0
+
+    while pages < max_pages:
+        resp = await http.pooled_get(url, **_edition_page_request(offset))
+        pages += 1
+        if resp.status_code != 200:
+            break
+
+        page = resp.json()
+        page_entries = page.get("entries") or []
+        summary.add(page_entries)
+        offset += len(page_entries)
+        if not page_entries or not _has_more(page, offset):
+            break
+
+        size = page.get("size")
+        if size:
+            offsets = range(offset, min(size, max_pages * EDITIONS_PAGE_SIZE), EDITIONS_PAGE_SIZE)
+            for start in range(0, len(offsets), concurrency):
+                responses = await asyncio.gather(
+                    *(http.pooled_get(url, **_edition_page_request(o)) for o in offsets[start:start + concurrency])
+                )
+                for resp in responses:
+                    page_entries = resp.json().get("entries") if resp.status_code == 200 else None
+                    if not page_entries:
+                        return summary.result()
+                    summary.add(page_entries)
+            break
+        # no total: follow the pages one at a time
+
+    return summary.result()
+
+
+def _edition_concurrency():
+    if has_app_context():
+        return current_app.config.get("OPENLIBRARY_EDITION_CONCURRENCY", 4)
+    return 4
+
+
+async def fetch_author_names_concurrently(author_keys):
+    """fetch_author_names; authors are looked up together."""
+    responses = await asyncio.gather(*(
+        http.pooled_get(BASE_AUTHOR_URL.format(author_key=key), headers={"User-Agent": "YourApp/1.0"})
+        for key in author_keys
+    ))
+    return [name for name in map(_author_name, responses) if name]
+
+
+async def search_openlibrary_concurrently(q, limit=20):
+    """search_openlibrary, as an awaitable for a fan-out."""
+    return _search_results(await http.pooled_get(SEARCH_URL, params={"q": q, "limit": limit}))
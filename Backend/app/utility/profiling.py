@@ -0,0 +1,369 @@
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from fnmatch import fnmatchcase
+
+import jose
+from flask import current_app, g, request
+from jose import jwt
+
+from app.utility import instrumentation
+from app.utility.auth import ALGORITHM, SECRET_KEY
+
+# ------------------ ON-DEMAND REQUEST PROFILING ------------------ #
+# A request is profiled when it
+#
+#   - carries a signed X-Profile header (an admin gets one from
+#     POST /admin/profiles/token; it expires after ttl seconds), or
+#   - matches one of PROFILE_ROUTES (fnmatch patterns tried against the
+#     path and the URL rule, e.g. "/books/*" or "/playlists/<int:playlist_id>"),
+#     and then only PROFILE_ROUTE_RATE of the time.
+#
+# Two modes:
+#
+#   cprofile  deterministic, every call on the request thread (.prof, open
+#             with pstats / snakeviz); slows the request down noticeably
+#   sample    a side thread records the request thread's stack every
+#             PROFILE_SAMPLE_INTERVAL_MS (.folded, collapsed stacks for
+#             flamegraph.pl / speedscope); cheap enough for production
+#
+# Only the request thread is profiled; work handed to http's executor shows
+# up as the time spent waiting for it. Artifacts go to PROFILE_DIR (default
+# instance/profiles), shared by every worker on the host, with a .json
+# summary each; the oldest are deleted beyond PROFILE_MAX_FILES. The
+# response carries X-Profile-Id, which the /admin/profiles routes take.
+#
+# Unflagged requests pay one header lookup (plus the pattern match when
+# PROFILE_ROUTES is set).
+
+logger = logging.getLogger(__name__)
+
+HEADER = "X-Profile"
+MODES = ("cprofile", "sample")
+ARTIFACT_EXTENSIONS = {"cprofile": ".prof", "sample": ".folded"}
+TOKEN_AUDIENCE = "profile"
+
+_ID_PATTERN = re.compile(r"^[0-9]{8}T[0-9]{12}-[0-9]+-[0-9a-f]{6}$")
+
+
+# --------------------------------------------------------
+# SIGNED HEADER
+# --------------------------------------------------------
+
+def encode_token(user_id, mode, ttl):
+    """Value for the X-Profile header: profile requests for ttl seconds, in mode."""
+    now = datetime.now(tz=timezone.utc)
+    payload = {
+        "exp": now + timedelta(seconds=ttl),
+        "iat": now,
+        "aud": TOKEN_AUDIENCE,   # token_required rejects it as a login token
+        "sub": str(user_id),
+        "mode": mode,
+    }
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def _decode_token(token):
+    """(mode, user_id), or None for a missing, expired or forged token."""
+    try:
+        data = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], audience=TOKEN_AUDIENCE)
+    except jose.exceptions.JWTError:
+        return None
+    # a login token has no aud (which decode lets through) and no mode
+    if data.get("aud") != TOKEN_AUDIENCE or data.get("mode") not in MODES:
+        return None
+    return data["mode"], data.get("sub")
+
+
+# --------------------------------------------------------
+# PROFILERS
+# --------------------------------------------------------
+
+class _Sampler:
+    """Collapsed stacks of one thread, sampled from a side thread."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.target = threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if self._stop.is_set():
+                break   # the target is already in stop(), waiting for this thread
+            self.stacks[";".join(reversed(names))] += 1
+
+    def dump(self, path):
+        with open(path, "w") as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+
+
+def _short_path(filename):
+    """flask/app.py, app/utility/http.py, ... instead of absolute paths."""
+    index = filename.rfind("site-packages" + os.sep)
+    if index != -1:
+        return filename[index + len("site-packages") + 1:]
+    index = filename.rfind(os.sep + "app" + os.sep)
+    if index != -1:
+        return filename[index + 1:]
+    return os.path.basename(filename)
+
+
+class _CProfiler:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+# --------------------------------------------------------
+# STORAGE
+# --------------------------------------------------------
+
+def profile_dir(app=None):
+    app = app or current_app
+    return app.config.get("PROFILE_DIR") or os.path.join(app.instance_path, "profiles")
+
+
+def valid_id(profile_id):
+    return bool(_ID_PATTERN.match(profile_id or ""))
+
+
+def _new_id():
+    now = datetime.now(tz=timezone.utc)
+    return f"{now:%Y%m%dT%H%M%S%f}-{os.getpid()}-{os.urandom(3).hex()}"
+
+
+def _write_atomic(path, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _save(meta, profiler):
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    artifact = os.path.join(directory, meta["id"] + ARTIFACT_EXTENSIONS[meta["mode"]])
+    _write_atomic(artifact, profiler.dump)
+    meta["size"] = os.path.getsize(artifact)
+
+    def write_meta(path):
+        with open(path, "w") as fh:
+            json.dump(meta, fh)
+
+    # the summary last: list_profiles only sees complete artifacts
+    _write_atomic(os.path.join(directory, meta["id"] + ".json"), write_meta)
+    _rotate(directory, current_app.config.get("PROFILE_MAX_FILES", 50))
+
+
+def _rotate(directory, keep):
+    # ids start with the UTC timestamp, so name order is age order
+    ids = sorted(name[:-5] for name in os.listdir(directory) if name.endswith(".json"))
+    for profile_id in ids[:max(len(ids) - keep, 0)]:
+        delete_profile(profile_id, directory)
+
+
+def list_profiles():
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith(".json"):
+            meta = get_profile(name[:-5])
+            if meta is not None:
+                profiles.append(meta)
+    return profiles
+
+
+def get_profile(profile_id):
+    """The summary saved with a profile, or None."""
+    if not valid_id(profile_id):
+        return None
+    try:
+        with open(os.path.join(profile_dir(), profile_id + ".json")) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def artifact_path(meta):
+    return os.path.join(profile_dir(), meta["id"] + ARTIFACT_EXTENSIONS[meta["mode"]])
+
+
+def delete_profile(profile_id, directory=None):
+    """Remove a profile's files; False when there were none."""
+    if not valid_id(profile_id):
+        return False
+    directory = directory or profile_dir()
+    removed = False
+    for extension in (".json", *ARTIFACT_EXTENSIONS.values()):
+        try:
+            os.remove(os.path.join(directory, profile_id + extension))
+            removed = True
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def top_functions(meta, limit=30):
+    """The heaviest functions of a saved profile, by cumulative (cprofile) or inclusive samples (sample)."""
+    path = artifact_path(meta)
+    if meta["mode"] == "cprofile":
+        stats = pstats.Stats(path).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+        return [
+            {
+                "function": f"{func} ({_short_path(filename)}:{line})",
+                "calls": calls,
+                "own_ms": round(own * 1000, 2),
+                "cumulative_ms": round(cumulative * 1000, 2),
+            }
+            for (filename, line, func), (_, calls, own, cumulative, _) in rows
+        ]
+
+    inclusive, own = Counter(), Counter()
+    with open(path) as fh:
+        for line in fh:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            frames = stack.split(";")
+            count = int(count)
+            for frame in set(frames):
+                inclusive[frame] += count
+            own[frames[-1]] += count
+    return [
+        {"function": frame, "samples": samples, "own_samples": own[frame]}
+        for frame, samples in inclusive.most_common(limit)
+    ]
+
+
+# --------------------------------------------------------
+# REQUEST HOOKS
+# --------------------------------------------------------
+
+def _route_matches(patterns):
+    rule = request.url_rule
+    return any(
+        fnmatchcase(request.path, pattern) or (rule is not None and fnmatchcase(rule.rule, pattern))
+        for pattern in patterns
+    )
+
+
+def _flag():
+    """(mode, trigger, user_id) when this request is to be profiled, else None."""
+    token = request.headers.get(HEADER)
+    if token:
+        decoded = _decode_token(token)
+        if decoded is not None:
+            mode, user_id = decoded
+            return mode, "header", user_id
+        logger.info("ignoring invalid %s header on %s %s", HEADER, request.method, request.path)
+
+    config = current_app.config
+    patterns = config.get("PROFILE_ROUTES")
+    if patterns and _route_matches(patterns) and random.random() < config.get("PROFILE_ROUTE_RATE", 1.0):
+        return config.get("PROFILE_ROUTE_MODE", "sample"), "route", None
+    return None
+
+
+def _start_request():
+    flagged = _flag()
+    if flagged is None:
+        return
+    mode, trigger, user_id = flagged
+    if mode == "cprofile":
+        profiler = _CProfiler()
+    else:
+        profiler = _Sampler(current_app.config.get("PROFILE_SAMPLE_INTERVAL_MS", 5) / 1000)
+
+    g._profile = {
+        "id": _new_id(), "mode": mode, "trigger": trigger, "requested_by": user_id,
+        "profiler": profiler, "started": time.perf_counter(),
+    }
+    profiler.start()
+
+
+def _finish_request(response):
+    profile = g.get("_profile")
+    if profile is not None:
+        profile["status"] = response.status_code
+        response.headers["X-Profile-Id"] = profile["id"]
+    return response
+
+
+def _end_request(exc):
+    profile = g.pop("_profile", None)
+    if profile is None:
+        return
+    profiler = profile.pop("profiler")
+    profiler.stop()
+    duration = time.perf_counter() - profile.pop("started")
+
+    stats = instrumentation.current()
+    rule = request.url_rule
+    meta = dict(
+        profile,
+        method=request.method,
+        path=request.path,
+        route=rule.rule if rule is not None else None,
+        endpoint=request.endpoint,
+        status=profile.get("status", 500),
+        duration_ms=round(duration * 1000, 1),
+        sql_count=stats.sql_count if stats is not None else None,
+        created_at=datetime.now(tz=timezone.utc).isoformat(),
+    )
+    try:
+        _save(meta, profiler)
+    except OSError:
+        logger.exception("could not save profile %s", meta["id"])
+        return
+    logger.info(
+        "profiled %s %s (%s, %.1fms) -> %s",
+        request.method, request.path, meta["mode"], meta["duration_ms"], meta["id"],
+    )
+
+
+def init_profiling(app):
+    """Profile flagged requests (PROFILING_ENABLED, default on)."""
+    if not app.config.get("PROFILING_ENABLED", True):
+        return
+    if app.config.get("PROFILE_ROUTE_MODE", "sample") not in MODES:
+        raise ValueError(f"PROFILE_ROUTE_MODE must be one of {', '.join(MODES)}")
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_end_request)
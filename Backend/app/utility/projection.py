@@ -0,0 +1,81 @@
+import threading
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import load_only, selectinload
+from marshmallow import fields
+
+# ------------------ SCHEMA-DRIVEN COLUMN PROJECTION ------------------ #
+# The big columns (Books.description/subjects/isbn_list,
+# Songs.audio_features) are deferred on the models, so ordinary loads and
+# dynamic relationships never fetch them. project() builds loader options
+# for exactly the columns a dump schema reads, which also undefers those
+# columns when the schema needs them:
+#
+#   Books.query.options(*project(Books, book_dump_schema)).filter(...)
+#
+# Relationships dumped through a Nested field are loaded with one
+# selectinload each, projected the same way. For many-to-one that load
+# skips rows already in the identity map (playlist.user is usually the
+# current user), so it only queries for the others, once per list instead
+# of once per row. Dynamic relationships can't be eager loaded, but the
+# query they return takes the same options:
+#
+#   playlist.playlist_songs.options(*project(Playlist_Songs, schema)).all()
+#
+# Column properties
+# (Playlists.song_count) are columns here and load in the same SELECT.
+
+_options = {}
+_options_lock = threading.Lock()
+
+
+def _nested_schema(field):
+    if isinstance(field, fields.List):
+        field = field.inner
+    return field.schema if isinstance(field, fields.Nested) else None
+
+
+def _build(model, schema):
+    mapper = sa_inspect(model)
+    columns = []
+    eager = []
+
+    def add_column(key):
+        attr = getattr(model, key)
+        if attr not in columns:
+            columns.append(attr)
+
+    for name, field in schema.dump_fields.items():
+        key = field.attribute or name
+        if key in mapper.column_attrs:
+            add_column(key)
+            continue
+        if key not in mapper.relationships:
+            continue  # python properties read what they need
+
+        relationship = mapper.relationships[key]
+        # many-to-one needs its foreign key to find the row in the identity map
+        for column in relationship.local_columns:
+            prop = mapper.get_property_by_column(column)
+            if prop.key in mapper.column_attrs:
+                add_column(prop.key)
+
+        nested = _nested_schema(field)
+        if nested is not None and relationship.lazy != "dynamic":
+            target = relationship.mapper.class_
+            eager.append(selectinload(getattr(model, key)).options(*project(target, nested)))
+
+    return (load_only(*columns), *eager) if columns else tuple(eager)
+
+
+def project(model, schema):
+    """Loader options that load only the columns schema dumps from model."""
+    key = (model, id(schema))
+    cached = _options.get(key)
+    if cached is not None and cached[0] is schema:
+        return cached[1]
+
+    options = _build(model, schema)
+    with _options_lock:
+        _options[key] = (schema, options)
+    return options
@@ -0,0 +1,369 @@
+import heapq
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+from flask import current_app
+from sqlalchemy import delete, select, update
+
+from app.extensions import db
+from app.models import Book_Authors, Book_Isbns, Book_Tags, Books, Playlist_Books, Users
+from app.utility import search, suggest
+from app.utility.jobs import job_handler
+from app.utility.normalize import normalize_text
+
+# ------------------ CUSTOM BOOK RECONCILIATION ------------------ #
+# Custom playlists create Books rows with source="custom". This engine
+# matches them to verified Open Library books by title + author and merges
+# confident matches: Playlist_Books / Book_Tags / Book_Authors / Book_Isbns rows and user
+# libraries are repointed to the verified book and the custom row is deleted.
+#
+#   1. normalize title/author strings
+#   2. collapse identical custom duplicates onto one row
+#   3. block candidates through a trigram index over verified titles
+#   4. score candidates with difflib and keep only clear winners
+
+RECONCILE_JOB = "reconcile_books"
+
+_ARTICLES = re.compile(r"^(the|a|an)\s+")
+_SUBTITLE = re.compile(r"\s*[:(\[].*$")
+
+
+# --------------------------------------------------------
+# NORMALIZATION
+# --------------------------------------------------------
+
+def normalize_title(title):
+    """Main title only (no subtitle / edition notes), without a leading article."""
+    main = _SUBTITLE.sub("", str(title or "")) or str(title or "")
+    return _ARTICLES.sub("", normalize_text(main))
+
+
+def normalize_author(name):
+    """'Tolkien, J.R.R.' and 'J. R. R. Tolkien' both become 'j r r tolkien'."""
+    name = str(name or "")
+    if name.count(",") == 1:
+        last, first = name.split(",")
+        name = f"{first} {last}"
+    return normalize_text(name)
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def custom_book_key(title, author_names, publish_year=None):
+    """Identity used to treat two custom books as the same book (editions/years apart stay apart)."""
+    authors = sorted(normalize_author(a) for a in (author_names or []) if a)
+    return normalize_title(title), tuple(authors), _int_or_none(publish_year)
+
+
+# --------------------------------------------------------
+# TRIGRAM INDEX
+# --------------------------------------------------------
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Inverted index from trigram -> keys. candidates() ranks keys by the
+    Dice coefficient of their trigram sets, which is cheap and blocks out
+    almost every non-match before the real similarity is computed.
+    """
+
+    def __init__(self, max_postings=5000):
+        self._postings = defaultdict(list)
+        self._sizes = {}
+        self.max_postings = max_postings
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def add(self, key, text):
+        grams = trigrams(text)
+        self._sizes[key] = len(grams)
+        for gram in grams:
+            self._postings[gram].append(key)
+
+    def candidates(self, text, limit=20, min_dice=0.3):
+        grams = trigrams(text)
+        if not grams:
+            return []
+
+        # very common trigrams add nothing but cost; skip them if we can
+        selective = [g for g in grams if len(self._postings.get(g, ())) <= self.max_postings]
+        counts = Counter()
+        for gram in selective or grams:
+            counts.update(self._postings.get(gram, ()))
+
+        size = len(grams)
+        scored = (
+            (2 * shared / (size + self._sizes[key]), key)
+            for key, shared in counts.items()
+        )
+        return heapq.nlargest(limit, (item for item in scored if item[0] >= min_dice))
+
+
+# --------------------------------------------------------
+# SCORING
+# --------------------------------------------------------
+
+def _similarity(a, b):
+    if not a or not b:
+        return 0.0
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    if matcher.real_quick_ratio() < 0.5 or matcher.quick_ratio() < 0.5:
+        return 0.0
+    return matcher.ratio()
+
+
+def score_match(custom_title, custom_authors, verified_title, verified_authors):
+    """
+    0..1 confidence that two books are the same. Title carries most of the
+    weight; authors confirm it (custom books always carry one author name).
+    """
+    title_score = _similarity(custom_title, verified_title)
+    if not custom_authors or not verified_authors:
+        return title_score * 0.8
+
+    # full names, or surnames alone ("Tolkien" vs "j r r tolkien")
+    author_score = max(
+        max(_similarity(a, b), _similarity(a.split()[-1], b.split()[-1]))
+        for a in custom_authors for b in verified_authors
+        if a and b
+    ) if any(custom_authors) and any(verified_authors) else 0.0
+    return 0.7 * title_score + 0.3 * author_score
+
+
+# --------------------------------------------------------
+# MERGING
+# --------------------------------------------------------
+
+def _repoint(junction, source_ids, target_id):
+    """Move junction rows from source books to target, dropping rows that would collide."""
+    if not source_ids:
+        return
+    other = junction.__table__.c
+    partner = next(c for c in other if c.primary_key and c.name != "book_id")
+
+    db.session.execute(
+        delete(junction)
+        .where(
+            junction.book_id.in_(source_ids),
+            partner.in_(select(partner).where(junction.book_id == target_id)),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    # two sources may share a partner row; keep one per partner
+    rows = db.session.execute(
+        select(partner, junction.book_id).where(junction.book_id.in_(source_ids))
+    ).all()
+    seen = set()
+    for partner_id, book_id in rows:
+        if partner_id in seen:
+            db.session.execute(
+                delete(junction)
+                .where(partner == partner_id, junction.book_id == book_id)
+                .execution_options(synchronize_session=False)
+            )
+        seen.add(partner_id)
+
+    db.session.execute(
+        update(junction)
+        .where(junction.book_id.in_(source_ids))
+        .values(book_id=target_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _library_id(value):
+    number = _int_or_none(value)
+    return value if number is None else number
+
+
+def _rewrite_libraries(mapping):
+    """
+    One pass over user libraries, replacing merged ids and deduping.
+    Ids stored as strings ("123") are matched too; rewritten libraries hold ints.
+    """
+    if not mapping:
+        return 0
+
+    changed = 0
+    rows = db.session.execute(
+        select(Users.id, Users.library).where(Users.library.isnot(None))
+    ).all()
+    for user_id, library in rows:
+        ids = [_library_id(b) for b in library or []]
+        if not any(book_id in mapping for book_id in ids):
+            continue
+        new_library = list(dict.fromkeys(mapping.get(b, b) for b in ids))
+        db.session.execute(
+            update(Users).where(Users.id == user_id).values(library=new_library)
+            .execution_options(synchronize_session=False)
+        )
+        changed += 1
+    return changed
+
+
+def merge_books(mapping):
+    """
+    Apply {source_book_id: target_book_id} merges and delete the sources.
+    Targets must not themselves be sources.
+    """
+    by_target = defaultdict(list)
+    for source_id, target_id in mapping.items():
+        by_target[target_id].append(source_id)
+
+    for target_id, source_ids in by_target.items():
+        for junction in (Playlist_Books, Book_Tags, Book_Authors, Book_Isbns):
+            _repoint(junction, source_ids, target_id)
+
+    libraries = _rewrite_libraries(mapping)
+
+    if mapping:
+        db.session.execute(
+            delete(Books).where(Books.id.in_(list(mapping)))
+            .execution_options(synchronize_session=False)
+        )
+        search.remove(Books, list(mapping))
+        suggest.remove(Books, list(mapping))
+    db.session.expire_all()
+    return libraries
+
+
+# --------------------------------------------------------
+# ENGINE
+# --------------------------------------------------------
+
+def reconcile_custom_books(dry_run=False, min_score=None, min_margin=None):
+    """
+    Match every custom book to a verified book and merge confident matches.
+    Returns a report; with dry_run nothing is written.
+    """
+    config = current_app.config
+    min_score = min_score if min_score is not None else config.get("RECONCILE_MIN_SCORE", 0.9)
+    min_margin = min_margin if min_margin is not None else config.get("RECONCILE_MIN_MARGIN", 0.05)
+
+    # ---------------------------------------------------------
+    # 1. COLLAPSE CUSTOM DUPLICATES
+    # ---------------------------------------------------------
+    custom_rows = db.session.execute(
+        select(Books.id, Books.title, Books.author_names, Books.first_publish_year)
+        .where(Books.source == "custom")
+        .order_by(Books.id)
+    ).all()
+
+    canonical = {}
+    mapping = {}
+    for book_id, title, author_names, publish_year in custom_rows:
+        key = custom_book_key(title, author_names, publish_year)
+        if key in canonical:
+            mapping[book_id] = canonical[key]
+        else:
+            canonical[key] = book_id
+    duplicates = len(mapping)
+
+    # ---------------------------------------------------------
+    # 2. INDEX VERIFIED TITLES
+    # ---------------------------------------------------------
+    index = TrigramIndex()
+    verified = {}
+    rows = db.session.execute(
+        select(Books.id, Books.title, Books.author_names)
+        .where(Books.source == "verified")
+    )
+    for book_id, title, author_names in rows:
+        norm_title = normalize_title(title)
+        if not norm_title:
+            continue
+        verified[book_id] = (norm_title, [normalize_author(a) for a in author_names or []])
+        index.add(book_id, norm_title)
+
+    # ---------------------------------------------------------
+    # 3. MATCH
+    # ---------------------------------------------------------
+    matches = []
+    for (norm_title, authors, _), custom_id in canonical.items():
+        if not norm_title:
+            continue
+
+        scored = sorted(
+            (
+                (score_match(norm_title, list(authors), *verified[candidate]), candidate)
+                for _, candidate in index.candidates(norm_title)
+            ),
+            reverse=True,
+        )
+        if not scored or scored[0][0] < min_score:
+            continue
+        if len(scored) > 1 and scored[0][0] - scored[1][0] < min_margin:
+            continue  # ambiguous (e.g. two editions); leave it for a human
+
+        best_score, verified_id = scored[0]
+        matches.append({
+            "custom_id": custom_id,
+            "verified_id": verified_id,
+            "score": round(best_score, 4),
+        })
+
+    # duplicates follow their canonical row to the verified book
+    targets = {m["custom_id"]: m["verified_id"] for m in matches}
+    mapping = {src: targets.get(dst, dst) for src, dst in mapping.items()}
+    mapping.update(targets)
+
+    report = {
+        "dry_run": dry_run,
+        "custom_books": len(custom_rows),
+        "duplicates_collapsed": duplicates,
+        "matched": len(matches),
+        "matches": matches,
+        "libraries_updated": 0,
+    }
+
+    if dry_run or not mapping:
+        db.session.rollback()
+        return report
+
+    # ---------------------------------------------------------
+    # 4. MERGE
+    # ---------------------------------------------------------
+    report["libraries_updated"] = merge_books(mapping)
+    db.session.commit()
+    return report
+
+
+@job_handler(RECONCILE_JOB)
+def reconcile_books_job(payload):
+    return reconcile_custom_books(
+        dry_run=bool(payload.get("dry_run")),
+        min_score=payload.get("min_score"),
+    )
+
+
+def find_custom_book(title, author_name, publish_year=None):
+    """
+    Existing custom book with the same normalized title/author (and compatible year).
+    publish_year may be an int or a numeric string; anything else raises ValueError.
+    """
+    if publish_year is not None and publish_year != "":
+        publish_year = int(publish_year)
+    key = custom_book_key(title, [author_name])
+    rows = Books.query.filter(
+        Books.source == "custom",
+        db.func.lower(Books.title) == str(title).strip().lower(),
+    ).all()
+    for book in rows:
+        if custom_book_key(book.title, book.author_names) != key:
+            continue
+        if publish_year and book.first_publish_year and book.first_publish_year != publish_year:
+            continue
+        return book
+    return None
@@ -0,0 +1,315 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, func, or_, select, update
+
+from app.extensions import db
+from app.models import Books, Jobs, Songs
+from app.utility import http, isbn, search, suggest
+from app.utility.catalog import openlibrary_columns, spotify_columns
+from app.utility.jobs import enqueue, periodic_job
+from app.utility.openlibrary import fetch_openlibrary_work
+from app.utility.spotify import fetch_track_details_batch
+
+# ------------------ METADATA REFRESH ------------------ #
+# Re-fetches upstream metadata for Books/Songs whose updated_at is older
+# than REFRESH_MAX_AGE_DAYS. Runs as a periodic background job, one batch
+# per job (see refresh_metadata_job); every
+# upstream call is made in background priority (see http.background), so
+# it only uses rate budget left over by interactive traffic.
+#
+# Only columns whose value actually changed are written, with one bulk
+# UPDATE per batch. Rows that were checked but unchanged just get their
+# updated_at bumped so they leave the stale set.
+
+REFRESH_JOB = "refresh_metadata"
+
+# columns compared/written by the refresher
+_BOOK_COLUMNS = (
+    "title", "description", "subjects", "author_names", "author_keys",
+    "cover_url", "cover_id", "isbn_list", "first_publish_year",
+)
+_SONG_COLUMNS = (
+    "title", "artists", "album", "preview_url", "audio_features", "genres",
+)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _stale_filter(model, cutoff):
+    # two index-friendly branches instead of coalesce(updated_at, created_at)
+    return or_(
+        model.updated_at < cutoff,
+        and_(model.updated_at.is_(None), model.created_at < cutoff),
+    )
+
+
+def _changed_columns(row, new_values):
+    return {
+        column: value
+        for column, value in new_values.items()
+        if getattr(row, column) != value
+    }
+
+
+def _write_batch(model, rows, new_values_by_id, now):
+    """One bulk UPDATE: changed columns for changed rows, updated_at for all checked rows."""
+    changes = []
+    updated = 0
+    for row in rows:
+        new_values = new_values_by_id.get(row.id)
+        if new_values is None:
+            continue  # upstream failed; leave the row stale so it is retried
+
+        changed = _changed_columns(row, new_values)
+        if changed:
+            updated += 1
+        changes.append({"id": row.id, **changed, "updated_at": now})
+
+    if changes:
+        db.session.execute(update(model), changes)
+        # bulk UPDATE skips flush events, so refresh search documents here
+        changed_ids = [c["id"] for c in changes if len(c) > 2]
+        search.reindex(model, changed_ids)
+        suggest.reindex(model, changed_ids)
+        if model is Books:
+            isbn.sync(db.session.connection(), {
+                c["id"]: c["isbn_list"] for c in changes if "isbn_list" in c
+            })
+    db.session.commit()
+    return len(changes), updated
+
+
+# --------------------------------------------------------
+# BOOKS
+# --------------------------------------------------------
+
+def _fetch_book(app, openlib_id):
+    with app.app_context(), http.background():
+        try:
+            return fetch_openlibrary_work(openlib_id)
+        except Exception:
+            return None
+
+
+def refresh_books_batch(cutoff, batch_size, concurrency, skip_ids=None):
+    """
+    Refresh one batch of stale verified books. Returns (selected, checked, updated).
+    Ids whose upstream fetch failed are added to skip_ids.
+    """
+    app = current_app._get_current_object()
+    skip_ids = skip_ids if skip_ids is not None else set()
+
+    rows = db.session.execute(
+        select(Books.id, Books.openlib_id, *[getattr(Books, c) for c in _BOOK_COLUMNS])
+        .where(
+            Books.source == "verified",
+            Books.openlib_id.isnot(None),
+            _stale_filter(Books, cutoff),
+            Books.id.notin_(skip_ids),
+        )
+        .order_by(Books.updated_at, Books.id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0, 0, 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = pool.map(lambda row: _fetch_book(app, row.openlib_id), rows)
+        new_values = {
+            row.id: openlibrary_columns(ol_data)
+            for row, ol_data in zip(rows, results)
+            if ol_data
+        }
+
+    skip_ids.update(row.id for row in rows if row.id not in new_values)
+    checked, updated = _write_batch(Books, rows, new_values, _now())
+    return len(rows), checked, updated
+
+
+# --------------------------------------------------------
+# SONGS
+# --------------------------------------------------------
+
+def refresh_songs_batch(cutoff, batch_size, skip_ids=None):
+    """
+    Refresh one batch of stale Spotify songs. Returns (selected, checked, updated).
+    Ids whose upstream fetch failed are added to skip_ids.
+    """
+    skip_ids = skip_ids if skip_ids is not None else set()
+
+    rows = db.session.execute(
+        select(Songs.id, Songs.spotify_id, *[getattr(Songs, c) for c in _SONG_COLUMNS])
+        .where(
+            func.lower(Songs.source) == "spotify",
+            _stale_filter(Songs, cutoff),
+            Songs.id.notin_(skip_ids),
+        )
+        .order_by(Songs.updated_at, Songs.id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0, 0, 0
+
+    with http.background():
+        try:
+            tracks, features, genres = fetch_track_details_batch([r.spotify_id for r in rows])
+        except Exception:
+            tracks, features, genres = {}, {}, {}
+
+    new_values = {
+        row.id: spotify_columns(
+            tracks[row.spotify_id],
+            features.get(row.spotify_id),
+            genres.get(row.spotify_id, []),
+        )
+        for row in rows
+        if row.spotify_id in tracks
+    }
+
+    skip_ids.update(row.id for row in rows if row.id not in new_values)
+    checked, updated = _write_batch(Songs, rows, new_values, _now())
+    return len(rows), checked, updated
+
+
+# --------------------------------------------------------
+# RUN + METRICS
+# --------------------------------------------------------
+
+def _new_run(max_age_days=None, batch_size=None, max_batches=None):
+    """State of one refresh run; JSON-safe, so it can ride in a job payload."""
+    config = current_app.config
+    max_age_days = max_age_days or config.get("REFRESH_MAX_AGE_DAYS", 30)
+    return {
+        "max_age_days": max_age_days,
+        "batch_size": batch_size or config.get("REFRESH_BATCH_SIZE", 100),
+        "max_batches": max_batches or config.get("REFRESH_MAX_BATCHES", 10),
+        "cutoff": (_now() - timedelta(days=max_age_days)).isoformat(),
+        "kind": "books",
+        "skip_ids": {"books": [], "songs": []},
+        "stats": {},
+    }
+
+
+def refresh_step(run):
+    """
+    Refresh one batch of run["kind"] and advance run in place.
+    Returns False once books and songs are both done.
+    """
+    kind = run["kind"]
+    cutoff = datetime.fromisoformat(run["cutoff"])
+    batch_size = run["batch_size"]
+    skip_ids = set(run["skip_ids"][kind])
+    stats = run["stats"].setdefault(kind, {"batches": 0, "selected": 0, "checked": 0, "updated": 0, "seconds": 0.0})
+
+    started = time.monotonic()
+    if kind == "books":
+        concurrency = current_app.config.get("REFRESH_CONCURRENCY", 2)
+        selected, checked, updated = refresh_books_batch(cutoff, batch_size, concurrency, skip_ids)
+    else:
+        selected, checked, updated = refresh_songs_batch(cutoff, batch_size, skip_ids)
+    stats["seconds"] += time.monotonic() - started
+    run["skip_ids"][kind] = sorted(skip_ids)
+
+    if selected:
+        stats["batches"] += 1
+        stats["selected"] += selected
+        stats["checked"] += checked
+        stats["updated"] += updated
+
+    done = (
+        not selected
+        or not checked             # upstream is failing; don't spin on the same rows
+        or selected < batch_size
+        or stats["batches"] >= run["max_batches"]
+    )
+    if done:
+        run["kind"] = "songs" if kind == "books" else None
+    return run["kind"] is not None
+
+
+def _run_stats(run):
+    result = {"max_age_days": run["max_age_days"]}
+    if run["kind"] is None:
+        result["finished_at"] = _now().isoformat()
+    for kind, stats in run["stats"].items():
+        seconds = stats["seconds"]
+        result[kind] = {
+            **stats,
+            "failed": stats["selected"] - stats["checked"],
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(stats["checked"] / seconds, 2) if seconds > 0 else None,
+        }
+    return result
+
+
+def refresh_stale_metadata(max_age_days=None, batch_size=None, max_batches=None):
+    """
+    Refresh up to max_batches batches of books and of songs, in the foreground.
+    Returns throughput stats for the run.
+    """
+    run = _new_run(max_age_days, batch_size, max_batches)
+    while refresh_step(run):
+        pass
+    return _run_stats(run)
+
+
+def freshness_report(max_age_days=None):
+    """Stale counts and oldest refresh time per table."""
+    max_age_days = max_age_days or current_app.config.get("REFRESH_MAX_AGE_DAYS", 30)
+    cutoff = _now() - timedelta(days=max_age_days)
+
+    report = {"max_age_days": max_age_days}
+    for kind, model, scope in (
+        ("books", Books, and_(Books.source == "verified", Books.openlib_id.isnot(None))),
+        ("songs", Songs, func.lower(Songs.source) == "spotify"),
+    ):
+        total, stale, oldest = db.session.execute(
+            select(
+                func.count(model.id),
+                func.count(model.id).filter(_stale_filter(model, cutoff)),
+                func.min(func.coalesce(model.updated_at, model.created_at)),
+            ).where(scope)
+        ).one()
+
+        report[kind] = {
+            "total": total,
+            "stale": stale,
+            "fresh_ratio": round((total - stale) / total, 4) if total else None,
+            "oldest_refresh": oldest.isoformat() if hasattr(oldest, "isoformat") else oldest,
+        }
+
+    last_run = db.session.execute(
+        select(Jobs.result)
+        .where(Jobs.kind == REFRESH_JOB, Jobs.status == "succeeded")
+        .order_by(Jobs.id.desc())
+        .limit(1)
+    ).scalar()
+    report["last_run"] = last_run
+    return report
+
+
+@periodic_job(REFRESH_JOB, "REFRESH_INTERVAL", 3600)
+def refresh_metadata_job(payload):
+    """
+    Periodic job entry point. Each job refreshes one batch and enqueues the
+    next batch as a new job, so no job outlives JOB_LOCK_TIMEOUT (and gets
+    claimed twice) and jobs queued meanwhile, like enrichment, run in
+    between. The last job's result holds the stats of the whole run.
+    """
+    run = payload.get("run") or _new_run(
+        max_age_days=payload.get("max_age_days"),
+        batch_size=payload.get("batch_size"),
+        max_batches=payload.get("max_batches"),
+    )
+    if not refresh_step(run):
+        return _run_stats(run)
+
+    # committed together with this job's success; while it is queued,
+    # the periodic reschedule sees a pending run and waits for the last batch
+    job = enqueue(REFRESH_JOB, {"run": run})
+    return {"continued_by": job.id, **_run_stats(run)}
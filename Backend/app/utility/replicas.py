@@ -0,0 +1,87 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.sql.selectable import CompoundSelect, Select
+
+# ------------------ READ-REPLICA ROUTING ------------------ #
+# db.session is a RoutingSession. With SQLALCHEMY_REPLICA_URIS set, SELECTs
+# made while serving a GET/HEAD request go to one replica (picked per
+# request); everything else goes to the primary bound to db:
+#
+#   - writes, flushes, SELECT ... FOR UPDATE, text() and session.connection()
+#   - anything outside a request (job workers, CLI, startup)
+#   - the rest of the request once it has flushed or executed a write
+#     (INSERT/UPDATE/DELETE, FOR UPDATE, text()), so a handler reads its
+#     own writes even after commit
+#
+# Per-route or per-block overrides:
+#
+#   @read_from("primary")        # must see the latest committed data
+#   def checkout(...): ...
+#
+#   with read_from("replica"):   # e.g. a report inside a POST handler
+#       rows = ...
+#
+# Without replicas configured every query uses the primary, as before.
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+_READ_METHODS = {"GET", "HEAD"}
+_override = ContextVar("db_read_override", default=None)
+
+
+@contextmanager
+def read_from(target):
+    """Send reads in this block (or decorated view) to "primary" or "replica"."""
+    if target not in (PRIMARY, REPLICA):
+        raise ValueError(f"read_from target must be {PRIMARY!r} or {REPLICA!r}, not {target!r}")
+    token = _override.set(target)
+    try:
+        yield
+    finally:
+        _override.reset(token)
+
+
+def _replicas():
+    return current_app.extensions.get("db_replicas") if has_app_context() else None
+
+
+def _is_plain_select(clause):
+    if isinstance(clause, Select):
+        return clause._for_update_arg is None
+    return isinstance(clause, CompoundSelect)
+
+
+def _may_write(clause):
+    return isinstance(clause, (UpdateBase, TextClause, Select))
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that reads from replicas where it is safe to."""
+
+    def _reads_from_replica(self):
+        if self.info.get("sticky_primary"):
+            return False
+        target = _override.get()
+        if target is not None:
+            return target == REPLICA
+        return has_request_context() and request.method in _READ_METHODS
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _is_plain_select(clause):
+            replicas = _replicas()
+            if replicas and self._reads_from_replica():
+                replica = self.info.get("replica")
+                if replica is None:
+                    replica = self.info["replica"] = random.choice(replicas)
+                return replica
+        elif bind is None and (self._flushing or _may_write(clause)) and _replicas():
+            # read-your-writes: once this request writes, it stays on the primary
+            self.info["sticky_primary"] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,380 @@
+import re
+
+from sqlalchemy import event, or_, select, text
+from sqlalchemy.orm import Session, undefer
+
+from app.extensions import db
+from app.models import Books, Playlists, Songs
+
+# ------------------ LOCAL FULL-TEXT SEARCH ------------------ #
+# One search index over imported Books, Songs and public Playlists.
+#
+#   SQLite   -> FTS5 virtual table `search_index` (bm25 ranking)
+#   Postgres -> `search_documents` table, tsvector + GIN (ts_rank_cd)
+#   other    -> ILIKE scan (no index; keeps /search working anywhere)
+#
+# Each row is split into weighted fields: title > people (authors/artists)
+# > body (subjects, description, album, genres). Every query term is a
+# prefix match, and all terms must match.
+#
+# The index is updated in the same transaction as the rows it describes:
+# an after_flush listener rewrites the documents of every flushed
+# Books/Songs/Playlists instance. Bulk UPDATE/DELETE statements bypass the
+# ORM, so code that uses them calls reindex()/remove() itself.
+
+KINDS = {
+    "books": (Books, 1),
+    "songs": (Songs, 2),
+    "playlists": (Playlists, 3),
+}
+_KIND_BY_MODEL = {model: kind for kind, (model, _) in KINDS.items()}
+
+# deferred columns build_document() reads
+_DOCUMENT_OPTIONS = {Books: (undefer(Books.subjects), undefer(Books.description))}
+
+MAX_TERMS = 8
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+# --------------------------------------------------------
+# DOCUMENTS
+# --------------------------------------------------------
+
+def _join(*parts):
+    words = []
+    for part in parts:
+        if not part:
+            continue
+        if isinstance(part, (list, tuple)):
+            words.extend(str(p) for p in part if p)
+        else:
+            words.append(str(part))
+    return " ".join(words)
+
+
+def build_document(obj):
+    """(kind, id, fields) for an instance, or (kind, id, None) if it should not be indexed."""
+    kind = _KIND_BY_MODEL[type(obj)]
+
+    if kind == "books":
+        fields = {
+            "title": obj.title or "",
+            "people": _join(obj.author_names),
+            "body": _join(obj.subjects, obj.description),
+        }
+    elif kind == "songs":
+        fields = {
+            "title": obj.title or "",
+            "people": _join(obj.artists),
+            "body": _join(obj.album, obj.genres),
+        }
+    else:
+        if not obj.is_public:
+            return kind, obj.id, None
+        fields = {
+            "title": obj.title or "",
+            "people": "",
+            "body": obj.description or "",
+        }
+    return kind, obj.id, fields
+
+
+def query_terms(query):
+    return _TERM.findall((query or "").casefold())[:MAX_TERMS]
+
+
+# --------------------------------------------------------
+# BACKENDS
+# --------------------------------------------------------
+
+class SqliteFtsBackend:
+    name = "sqlite-fts5"
+
+    # rowid packs kind + id so a document can be replaced by rowid alone
+    @staticmethod
+    def _rowid(kind, ref_id):
+        return ref_id * 4 + KINDS[kind][1]
+
+    def ensure(self, connection):
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+        )).first()
+        if exists:
+            return False
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE search_index USING fts5("
+            "title, people, body, kind UNINDEXED, ref_id UNINDEXED, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        ))
+        return True
+
+    def clear(self, connection):
+        connection.execute(text("DELETE FROM search_index"))
+
+    def remove(self, connection, kind, ids):
+        rowids = [{"rowid": self._rowid(kind, i)} for i in ids]
+        if rowids:
+            connection.execute(text("DELETE FROM search_index WHERE rowid = :rowid"), rowids)
+
+    def upsert(self, connection, kind, docs):
+        if not docs:
+            return
+        self.remove(connection, kind, [ref_id for ref_id, _ in docs])
+        connection.execute(
+            text(
+                "INSERT INTO search_index (rowid, title, people, body, kind, ref_id) "
+                "VALUES (:rowid, :title, :people, :body, :kind, :ref_id)"
+            ),
+            [
+                {"rowid": self._rowid(kind, ref_id), "kind": KINDS[kind][1], "ref_id": ref_id, **fields}
+                for ref_id, fields in docs
+            ],
+        )
+
+    def search(self, connection, kind, terms, limit):
+        match = " ".join(f'"{term}"*' for term in terms)
+        rows = connection.execute(
+            text(
+                "SELECT ref_id FROM search_index "
+                "WHERE search_index MATCH :match AND kind = :kind "
+                "ORDER BY bm25(search_index, 10.0, 5.0, 1.0) LIMIT :limit"
+            ),
+            {"match": match, "kind": KINDS[kind][1], "limit": limit},
+        )
+        return [row[0] for row in rows]
+
+
+class PostgresTsvectorBackend:
+    name = "postgres-tsvector"
+
+    _DOCUMENT = (
+        "setweight(to_tsvector('simple', :title), 'A') || "
+        "setweight(to_tsvector('simple', :people), 'B') || "
+        "setweight(to_tsvector('simple', :body), 'C')"
+    )
+
+    def ensure(self, connection):
+        exists = connection.execute(text("SELECT to_regclass('search_documents')")).scalar()
+        if exists:
+            return False
+        connection.execute(text(
+            "CREATE TABLE search_documents ("
+            "kind SMALLINT NOT NULL, ref_id INTEGER NOT NULL, "
+            "document TSVECTOR NOT NULL, PRIMARY KEY (kind, ref_id))"
+        ))
+        connection.execute(text(
+            "CREATE INDEX ix_search_documents_document "
+            "ON search_documents USING GIN (document)"
+        ))
+        return True
+
+    def clear(self, connection):
+        connection.execute(text("TRUNCATE search_documents"))
+
+    def remove(self, connection, kind, ids):
+        if ids:
+            connection.execute(
+                text("DELETE FROM search_documents WHERE kind = :kind AND ref_id = ANY(:ids)"),
+                {"kind": KINDS[kind][1], "ids": list(ids)},
+            )
+
+    def upsert(self, connection, kind, docs):
+        if not docs:
+            return
+        connection.execute(
+            text(
+                "INSERT INTO search_documents (kind, ref_id, document) "
+                f"VALUES (:kind, :ref_id, {self._DOCUMENT}) "
+                "ON CONFLICT (kind, ref_id) DO UPDATE SET document = EXCLUDED.document"
+            ),
+            [{"kind": KINDS[kind][1], "ref_id": ref_id, **fields} for ref_id, fields in docs],
+        )
+
+    def search(self, connection, kind, terms, limit):
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        rows = connection.execute(
+            text(
+                "SELECT ref_id FROM search_documents "
+                "WHERE kind = :kind AND document @@ to_tsquery('simple', :q) "
+                "ORDER BY ts_rank_cd(document, to_tsquery('simple', :q)) DESC, ref_id "
+                "LIMIT :limit"
+            ),
+            {"kind": KINDS[kind][1], "q": tsquery, "limit": limit},
+        )
+        return [row[0] for row in rows]
+
+
+class ScanBackend:
+    """Fallback for databases without a supported full-text index."""
+
+    name = "scan"
+
+    _COLUMNS = {
+        "books": (Books.title, Books.description),
+        "songs": (Songs.title, Songs.album),
+        "playlists": (Playlists.title, Playlists.description),
+    }
+
+    def ensure(self, connection):
+        return False
+
+    def clear(self, connection):
+        pass
+
+    def remove(self, connection, kind, ids):
+        pass
+
+    def upsert(self, connection, kind, docs):
+        pass
+
+    def search(self, connection, kind, terms, limit):
+        model = KINDS[kind][0]
+        stmt = select(model.id)
+        for term in terms:
+            stmt = stmt.where(or_(*(column.ilike(f"%{term}%") for column in self._COLUMNS[kind])))
+        if kind == "playlists":
+            stmt = stmt.where(Playlists.is_public.is_(True))
+        return list(connection.execute(stmt.order_by(model.id).limit(limit)).scalars())
+
+
+_BACKENDS = {
+    "sqlite": SqliteFtsBackend,
+    "postgresql": PostgresTsvectorBackend,
+}
+
+_backend = None
+
+
+def backend_for(dialect_name):
+    return _BACKENDS.get(dialect_name, ScanBackend)()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = backend_for(db.engine.dialect.name)
+    return _backend
+
+
+# --------------------------------------------------------
+# WRITE PATH
+# --------------------------------------------------------
+
+def index_objects(connection, objects, deleted=()):
+    backend = get_backend()
+
+    docs, removals = {}, {}
+    for obj in objects:
+        kind, ref_id, fields = build_document(obj)
+        if fields is None:
+            removals.setdefault(kind, []).append(ref_id)
+        else:
+            docs.setdefault(kind, []).append((ref_id, fields))
+    for obj in deleted:
+        removals.setdefault(_KIND_BY_MODEL[type(obj)], []).append(obj.id)
+
+    for kind, ids in removals.items():
+        backend.remove(connection, kind, ids)
+    for kind, kind_docs in docs.items():
+        backend.upsert(connection, kind, kind_docs)
+
+
+def reindex(model, ids):
+    """Re-read rows by id (e.g. after a bulk UPDATE) and rewrite their documents."""
+    ids = list(ids)
+    if not ids:
+        return
+    rows = db.session.execute(
+        select(model).options(*_DOCUMENT_OPTIONS.get(model, ())).where(model.id.in_(ids))
+    ).scalars().all()
+    index_objects(db.session.connection(), rows)
+
+
+def remove(model, ids):
+    """Drop documents for rows removed with a bulk DELETE."""
+    if ids:
+        get_backend().remove(db.session.connection(), _KIND_BY_MODEL[model], list(ids))
+
+
+def rebuild_index(batch_size=500):
+    """Rebuild the whole index from the tables. Returns documents written per kind."""
+    backend = get_backend()
+    connection = db.session.connection()
+    backend.clear(connection)
+
+    counts = {}
+    for kind, (model, _) in KINDS.items():
+        counts[kind] = 0
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(model)
+                .options(*_DOCUMENT_OPTIONS.get(model, ()))
+                .where(model.id > last_id)
+                .order_by(model.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not rows:
+                break
+            index_objects(connection, rows)
+            counts[kind] += len(rows)
+            last_id = rows[-1].id
+            db.session.expunge_all()
+
+    db.session.commit()
+    return counts
+
+
+def _indexed(objects):
+    return [obj for obj in objects if type(obj) in _KIND_BY_MODEL]
+
+
+def _after_flush(session, flush_context):
+    if _backend is None or isinstance(_backend, ScanBackend):
+        return
+
+    changed = _indexed(session.new) + [
+        obj for obj in _indexed(session.dirty) if session.is_modified(obj, include_collections=False)
+    ]
+    deleted = _indexed(session.deleted)
+    if changed or deleted:
+        index_objects(session.connection(), changed, deleted)
+
+
+# --------------------------------------------------------
+# READ PATH
+# --------------------------------------------------------
+
+def search(query, kinds=None, limit=20):
+    """
+    {kind: [ids ranked best first]} for the requested kinds.
+    Empty lists when the query has no searchable terms.
+    """
+    terms = query_terms(query)
+    kinds = [k for k in (kinds or KINDS) if k in KINDS]
+    if not terms:
+        return {kind: [] for kind in kinds}
+
+    backend = get_backend()
+    connection = db.session.connection()
+    return {kind: backend.search(connection, kind, terms, limit) for kind in kinds}
+
+
+# --------------------------------------------------------
+# SETUP
+# --------------------------------------------------------
+
+def init_search(app):
+    """
+    Pick the backend for the app's dialect and start syncing. The index
+    table itself comes from the migrations (flask db upgrade); this never
+    connects to the database.
+    """
+    global _backend
+
+    with app.app_context():
+        _backend = backend_for(db.engine.dialect.name)
+
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
@@ -0,0 +1,337 @@
+import inspect
+import json
+import threading
+
+from flask import current_app, jsonify
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import Schema, fields, missing
+from marshmallow.utils import get_value
+from sqlalchemy.orm.attributes import (
+    CollectionAttributeImpl,
+    QueryableAttribute,
+    ScalarAttributeImpl,
+    ScalarObjectAttributeImpl,
+)
+
+from app.utility.instrumentation import serializing
+
+# ------------------ COMPILED SERIALIZERS ------------------ #
+# marshmallow's Schema.dump walks every field through several layers of
+# method calls per value. compile_schema() turns a schema instance into a
+# flat list of (key, getter, converter) steps once, with direct converters
+# for the field types this app uses (Int, Str, Bool, DateTime, List,
+# Nested, Dict, Raw), and runs that instead:
+#
+#   dump(playlist_detail_schema, playlist)        # == schema.dump(playlist)
+#   return fast_jsonify(dump(books_schema, rows)), 200
+#
+# The output is the same dict marshmallow would build. Anything the
+# compiler doesn't recognise (Method/Function/Pluck fields, schemas with
+# pre/post_dump hooks) goes through marshmallow itself, so it stays exact.
+# benchmarks/bench_serializers.py checks the bytes and measures the gain.
+
+_NO_VALUES = {}
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+# --------------------------------------------------------
+# FIELD CONVERTERS
+# --------------------------------------------------------
+# Each converter mirrors field._serialize for an already-fetched value.
+
+def _identity(value):
+    return value
+
+
+def _number(field):
+    num_type = field.num_type
+    if field.as_string:
+        return None  # rare; let marshmallow handle it
+
+    def convert(value):
+        return None if value is None else num_type(value)
+    return convert
+
+
+def _string(value):
+    return None if value is None else (value if type(value) is str else str(value))
+
+
+def _boolean(field):
+    truthy, falsy = field.truthy, field.falsy
+
+    def convert(value):
+        if value is None:
+            return None
+        if value is True or value is False:
+            return value
+        try:
+            if value in truthy:
+                return True
+            if value in falsy:
+                return False
+        except TypeError:
+            pass
+        return bool(value)
+    return convert
+
+
+def _datetime(field):
+    fmt = field.format or field.DEFAULT_FORMAT
+    format_func = field.SERIALIZATION_FUNCS.get(fmt)
+
+    def convert(value):
+        if value is None:
+            return None
+        return format_func(value) if format_func else value.strftime(fmt)
+    return convert
+
+
+def _list(field):
+    inner = _converter(field.inner)
+    if inner is None:
+        return None
+    if inner is _identity:
+        return lambda value: None if value is None else list(value)
+
+    def convert(value):
+        return None if value is None else [inner(each) for each in value]
+    return convert
+
+
+def _nested(field):
+    schema = field.schema
+    many = schema.many or field.many
+    build = compile_schema(schema)
+
+    if many:
+        def convert(value):
+            return None if value is None else [build(each) for each in value]
+    else:
+        def convert(value):
+            return None if value is None else build(value)
+    return convert
+
+
+def _mapping(field):
+    if field.key_field or field.value_field:
+        return None
+    mapping_type = field.mapping_type
+
+    def convert(value):
+        return None if value is None else mapping_type(value)
+    return convert
+
+
+def _converter(field):
+    """Fast converter for a field type, or None to use field._serialize."""
+    cls = type(field)
+    if cls in (fields.Raw,):
+        return _identity
+    if cls in (fields.String, fields.Str):
+        return _string
+    if cls in (fields.Integer, fields.Int, fields.Float):
+        return _number(field)
+    if cls in (fields.Boolean, fields.Bool):
+        return _boolean(field)
+    if cls is fields.DateTime:
+        return _datetime(field)
+    if cls is fields.List:
+        return _list(field)
+    if cls is fields.Nested:
+        return _nested(field)
+    if cls in (fields.Dict, fields.Mapping):
+        return _mapping(field)
+    return None
+
+
+# --------------------------------------------------------
+# SCHEMA COMPILER
+# --------------------------------------------------------
+
+def _getter(attr, schema):
+    """Same lookup as Field.get_value with the schema's default accessor."""
+    if "." in attr or type(schema).get_attribute is not Schema.get_attribute:
+        return lambda obj: schema.get_attribute(obj, attr, missing)
+
+    def get(obj):
+        if hasattr(obj, "__getitem__"):
+            return get_value(obj, attr, missing)
+        return getattr(obj, attr, missing)
+    return get
+
+
+def _step(name, field, schema):
+    """
+    (kind, key, attr, get, convert) for one field:
+      "value"    convert(value)               fast path
+      "fallback" field._serialize(value, ...) unknown field type
+      "computed" field.serialize(...)         Method/Function fields
+    attr is set when the value may be read straight from obj.__dict__.
+    """
+    key = field.data_key if field.data_key is not None else name
+
+    if not field._CHECK_ATTRIBUTE:
+        serialize = lambda obj: field.serialize(name, obj, accessor=schema.get_attribute)  # noqa: E731
+        return "computed", key, None, None, serialize
+
+    attr = field.attribute if field.attribute is not None else name
+    get = _getter(attr, schema)
+    if "." in attr or type(schema).get_attribute is not Schema.get_attribute:
+        attr = None
+
+    default = field.dump_default
+    if default is not missing:
+        raw_get = get
+
+        def get(obj):
+            value = raw_get(obj)
+            if value is missing:
+                return default() if callable(default) else default
+            return value
+
+    convert = _converter(field)
+    if convert is None:
+        return "fallback", key, attr, get, lambda value, obj: field._serialize(value, name, obj)
+    return "value", key, attr, get, (None if convert is _identity else convert)
+
+
+# Loaded ORM attributes live in obj.__dict__ and these descriptors return
+# them unchanged, so reading the dict skips SQLAlchemy's __get__ machinery.
+# Anything not in the dict (unloaded, expired, dynamic) goes through getattr.
+_PLAIN_IMPLS = (ScalarAttributeImpl, ScalarObjectAttributeImpl, CollectionAttributeImpl)
+
+
+def _reads_dict(cls, attr):
+    if attr is None or hasattr(cls, "__getitem__"):
+        return False
+    descriptor = inspect.getattr_static(cls, attr, None)
+    if descriptor is None:
+        return True  # plain instance attribute
+    if isinstance(descriptor, QueryableAttribute):
+        return type(getattr(descriptor, "impl", None)) in _PLAIN_IMPLS
+    return False
+
+
+def _has_dump_hooks(schema):
+    hooks = getattr(schema, "_hooks", {})
+    return bool(hooks.get("pre_dump") or hooks.get("post_dump"))
+
+
+def compile_schema(schema):
+    """
+    Builder function equivalent to schema.dump(obj) for one object
+    (schema.many is ignored; dump() handles lists).
+    """
+    cached = _compiled.get(id(schema))
+    if cached is not None and cached[0] is schema:
+        return cached[1]
+
+    if _has_dump_hooks(schema):
+        def build(obj):
+            return schema.dump(obj, many=False)
+    else:
+        simple, with_obj, computed, order = [], [], [], []
+        for name, field in schema.dump_fields.items():
+            kind, key, attr, get, convert = _step(name, field, schema)
+            order.append(key)
+            if kind == "value":
+                simple.append((key, attr, get, convert))
+            elif kind == "fallback":
+                with_obj.append((key, get, convert))
+            else:
+                computed.append((key, convert))
+
+        dict_class = schema.dict_class
+        needs_order = bool(with_obj or computed)
+        plans = {}  # object class -> simple steps with dict reads resolved
+
+        def plan_for(cls):
+            plan = [
+                (key, attr if _reads_dict(cls, attr) else None, get, convert)
+                for key, attr, get, convert in simple
+            ]
+            plans[cls] = plan
+            return plan
+
+        def build(obj):
+            plan = plans.get(type(obj)) or plan_for(type(obj))
+            values = getattr(obj, "__dict__", _NO_VALUES)
+            ret = dict_class()
+            for key, attr, get, convert in plan:
+                value = values.get(attr, missing) if attr is not None else missing
+                if value is missing:
+                    value = get(obj)
+                    if value is missing:
+                        continue
+                ret[key] = value if convert is None else convert(value)
+            for key, get, convert in with_obj:
+                value = get(obj)
+                if value is missing:
+                    continue
+                ret[key] = convert(value, obj)
+            for key, serialize in computed:
+                value = serialize(obj)
+                if value is not missing:
+                    ret[key] = value
+            if needs_order:
+                ret = dict_class((k, ret[k]) for k in order if k in ret)
+            return ret
+
+    with _compiled_lock:
+        _compiled[id(schema)] = (schema, build)
+    return build
+
+
+def dump(schema, obj, many=None):
+    """Drop-in for schema.dump(obj, many=many) using the compiled builder."""
+    build = compile_schema(schema)
+    if many is None:
+        many = schema.many
+    with serializing():
+        if many:
+            return [build(each) for each in obj]
+        return build(obj)
+
+
+# --------------------------------------------------------
+# JSON
+# --------------------------------------------------------
+
+_encoders = {}
+
+
+def _encoder(provider):
+    key = (provider.sort_keys, provider.ensure_ascii, provider.default)
+    encoder = _encoders.get(key)
+    if encoder is None:
+        # one reusable encoder -> the C encoder, no per-call setup
+        encoder = json.JSONEncoder(
+            separators=(",", ":"),
+            sort_keys=provider.sort_keys,
+            ensure_ascii=provider.ensure_ascii,
+            default=provider.default,
+        )
+        _encoders[key] = encoder
+    return encoder
+
+
+def fast_jsonify(data):
+    """
+    Same bytes as flask.jsonify(data) for the compact (non-debug) output,
+    with less per-call overhead. Falls back to jsonify when the app uses a
+    custom JSON provider or pretty-printing.
+    """
+    app = current_app
+    provider = app.json
+    if type(provider) is not DefaultJSONProvider or provider.compact is False or (
+        provider.compact is None and app.debug
+    ):
+        with serializing():
+            return jsonify(data)
+
+    with serializing():
+        body = _encoder(provider).encode(data)
+    return app.response_class(f"{body}\n", mimetype=provider.mimetype)
@@ -0,0 +1,291 @@
+import hashlib
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ------------------ SLOW-QUERY LOG ------------------ #
+# Every statement slower than SLOW_QUERY_THRESHOLD_MS, on any engine (primary
+# and replicas, requests and job workers alike), is
+#
+#   - logged as a warning (fingerprint, duration, route, caller; parameters
+#     too when SLOW_QUERY_LOG_PARAMETERS is on, which only development is,
+#     and never for statements on the users table: emails, password hashes)
+#   - aggregated by fingerprint: the statement with literals, placeholders
+#     and IN / VALUES lists collapsed, so "id IN (?, ?, ?)" and
+#     "id IN (?, ?)" are one entry with a count, total / max time, the
+#     routes and app functions it came from, and the slowest occurrence
+#   - explained: EXPLAIN QUERY PLAN (SQLite) or EXPLAIN (Postgres), never
+#     ANALYZE, run on a background thread with a connection of its own, for
+#     the first occurrence and again whenever one is more than twice as slow
+#     as the one explained
+#
+# GET /admin/slow-queries lists the entries of the worker that answers
+# (the aggregate is per process; the log lines cover every worker).
+# Statements that are not slow cost two perf_counter() calls.
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE = ("select", "with", "update", "delete")
+MAX_PARAMETERS_LENGTH = 500
+MAX_EXAMPLE_LENGTH = 4000
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_THIS_FILE = os.path.abspath(__file__)
+
+_settings = {"threshold": 0.2, "explain": True, "log_parameters": False, "max_entries": 500}
+
+
+# --------------------------------------------------------
+# FINGERPRINTS
+# --------------------------------------------------------
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+|\?")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\?\.\.\.\)(?:\s*,\s*\(\?\.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+_SENSITIVE_TABLES = re.compile(r"\busers\b", re.I)
+
+
+def normalize(statement):
+    """The statement with every value and list length replaced, for grouping."""
+    text = _COMMENTS.sub(" ", statement)
+    text = _STRINGS.sub("?", text)
+    text = _PLACEHOLDERS.sub("?", text)
+    text = _NUMBERS.sub("?", text)
+    text = _LISTS.sub("(?...)", text)
+    text = _ROWS.sub("(?...)...", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+# --------------------------------------------------------
+# AGGREGATE
+# --------------------------------------------------------
+
+class SlowQueryLog:
+    """Slow statements by fingerprint, least recently seen evicted beyond max_entries."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, key, normalized, statement, parameters, seconds, route, caller, dialect):
+        """Add one occurrence; True when its plan should be (re)captured."""
+        now = datetime.now(tz=timezone.utc).isoformat()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {
+                    "fingerprint": key, "statement": normalized, "dialect": dialect,
+                    "count": 0, "total_s": 0.0, "max_s": 0.0, "first_seen": now,
+                    "routes": Counter(), "callers": Counter(),
+                    "example": None, "parameters": None,
+                    "plan": None, "plan_error": None, "explained_s": None,
+                }
+                while len(self._entries) > _settings["max_entries"]:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+
+            entry["count"] += 1
+            entry["total_s"] += seconds
+            entry["last_seen"] = now
+            if route:
+                entry["routes"][route] += 1
+            if caller:
+                entry["callers"][caller] += 1
+            if seconds > entry["max_s"]:
+                entry["max_s"] = seconds
+                entry["example"] = statement[:MAX_EXAMPLE_LENGTH]
+                entry["parameters"] = parameters
+
+            explained = entry["explained_s"]
+            if explained is None or seconds > 2 * explained:
+                entry["explained_s"] = seconds
+                return True
+        return False
+
+    def set_plan(self, key, plan=None, error=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["plan"], entry["plan_error"] = plan, error
+
+    def snapshot(self, sort="total", limit=50):
+        keys = {"total": "total_s", "max": "max_s", "count": "count"}
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+        entries.sort(key=lambda entry: entry[keys.get(sort, "total_s")], reverse=True)
+        return [_public(entry) for entry in entries[:limit]]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _public(entry):
+    return {
+        "fingerprint": entry["fingerprint"],
+        "statement": entry["statement"],
+        "dialect": entry["dialect"],
+        "count": entry["count"],
+        "total_ms": round(entry["total_s"] * 1000, 1),
+        "mean_ms": round(entry["total_s"] * 1000 / entry["count"], 1),
+        "max_ms": round(entry["max_s"] * 1000, 1),
+        "first_seen": entry["first_seen"],
+        "last_seen": entry["last_seen"],
+        "routes": dict(entry["routes"].most_common(5)),
+        "callers": dict(entry["callers"].most_common(5)),
+        "slowest": {"statement": entry["example"], "parameters": entry["parameters"]},
+        "plan": entry["plan"],
+        "plan_error": entry["plan_error"],
+    }
+
+
+slow_queries = SlowQueryLog()
+
+
+# --------------------------------------------------------
+# EXPLAIN
+# --------------------------------------------------------
+
+# (engine, fingerprint, statement, parameters); full means a plan is skipped
+_explain_queue = queue.Queue(maxsize=100)
+_explain_thread = None
+_explain_lock = threading.Lock()
+
+
+def _explain(engine, statement, parameters):
+    """Plan lines of statement, without running it."""
+    sqlite = engine.dialect.name == "sqlite"
+    prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+    with engine.connect() as conn:
+        try:
+            rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+        finally:
+            conn.rollback()
+
+    if not sqlite:
+        return [row[0] for row in rows]
+    # (id, parent, notused, detail) -> indented tree
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def _explain_worker():
+    while True:
+        engine, key, statement, parameters = _explain_queue.get()
+        try:
+            slow_queries.set_plan(key, plan=_explain(engine, statement, parameters))
+        except Exception as exc:  # noqa: BLE001 - a plan is best effort
+            slow_queries.set_plan(key, error=f"{type(exc).__name__}: {exc}"[:500])
+
+
+def _queue_explain(engine, key, statement, parameters):
+    global _explain_thread
+    if _explain_thread is None:
+        with _explain_lock:
+            if _explain_thread is None:
+                _explain_thread = threading.Thread(target=_explain_worker, name="slow-query-explain", daemon=True)
+                _explain_thread.start()
+    try:
+        _explain_queue.put_nowait((engine, key, statement, parameters))
+    except queue.Full:
+        slow_queries.set_plan(key, error="explain queue full")
+
+
+# --------------------------------------------------------
+# ENGINE EVENTS
+# --------------------------------------------------------
+
+def _origin():
+    """(route, caller): "GET /books/<openlib_id>", "app/blueprints/books/routes.py:412 get_similar_books"."""
+    route = None
+    if has_request_context() and request.url_rule is not None:
+        route = f"{request.method} {request.url_rule.rule}"
+
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_DIR) and filename != _THIS_FILE:
+            relative = os.path.relpath(filename, os.path.dirname(_APP_DIR.rstrip(os.sep)))
+            return route, f"{relative}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return route, None
+
+
+def _format_parameters(statement, parameters):
+    if not _settings["log_parameters"]:
+        return None
+    if _SENSITIVE_TABLES.search(statement):
+        return "<masked: users>"
+    text = repr(parameters)
+    return text if len(text) <= MAX_PARAMETERS_LENGTH else text[:MAX_PARAMETERS_LENGTH] + "..."
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._slow_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_slow_query_started", None)
+    if started is None:
+        return
+    seconds = time.perf_counter() - started
+    if seconds < _settings["threshold"] or statement.lstrip()[:7].upper() == "EXPLAIN":
+        return
+
+    normalized = normalize(statement)
+    key = fingerprint(normalized)
+    route, caller = _origin()
+    shown = _format_parameters(statement, parameters)
+    stale_plan = slow_queries.record(key, normalized, statement, shown, seconds, route, caller, conn.dialect.name)
+    logger.warning(
+        "slow query %.1fms [%s] %s (%s)",
+        seconds * 1000, key, normalized[:200], caller or route or "no caller",
+        extra={
+            "fingerprint": key, "duration_ms": round(seconds * 1000, 1),
+            "route": route, "caller": caller, "parameters": shown,
+        },
+    )
+
+    explainable = normalized.split(" ", 1)[0].lower() in EXPLAINABLE
+    if stale_plan and _settings["explain"] and explainable and not executemany:
+        _queue_explain(conn.engine, key, statement, parameters)
+
+
+def init_slow_queries(app):
+    """Log, aggregate and explain statements over SLOW_QUERY_THRESHOLD_MS (SLOW_QUERY_LOG, default on)."""
+    if not app.config.get("SLOW_QUERY_LOG", True):
+        return
+
+    _settings.update(
+        threshold=app.config.get("SLOW_QUERY_THRESHOLD_MS", 200) / 1000,
+        explain=app.config.get("SLOW_QUERY_EXPLAIN", True),
+        log_parameters=app.config.get("SLOW_QUERY_LOG_PARAMETERS", False),
+        max_entries=app.config.get("SLOW_QUERY_MAX_FINGERPRINTS", 500),
+    )
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
@@ -1,14 +1,40 @@
+import asyncio
 import base64
-import requests
+import os
+import threading
+import time
+
 from flask import current_app
 
+from app.utility import http
+from app.utility.metrics import record_cache
+
 # ------------------ SPOTIFY ENDPOINTS ------------------ #
 
-SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
-SPOTIFY_TRACK_URL = "https://api.spotify.com/v1/tracks/{id}"
-SPOTIFY_AUDIO_FEATURES_URL = "https://api.spotify.com/v1/audio-features/{id}"
-SPOTIFY_ARTIST_URL = "https://api.spotify.com/v1/artists/{id}"
-SPOTIFY_SEARCH_URL = "https://api.spotify.com/v1/search"
+# SPOTIFY_ACCOUNTS_BASE_URL / SPOTIFY_API_BASE_URL point the client somewhere
+# else (benchmarks/fake_upstreams.py)
+SPOTIFY_ACCOUNTS_BASE_URL = os.getenv("SPOTIFY_ACCOUNTS_BASE_URL", "https://accounts.spotify.com").rstrip("/")
+SPOTIFY_API_BASE_URL = os.getenv("SPOTIFY_API_BASE_URL", "https://api.spotify.com").rstrip("/")
+
+SPOTIFY_TOKEN_URL = SPOTIFY_ACCOUNTS_BASE_URL + "/api/token"
+SPOTIFY_TRACK_URL = SPOTIFY_API_BASE_URL + "/v1/tracks/{id}"
+SPOTIFY_AUDIO_FEATURES_URL = SPOTIFY_API_BASE_URL + "/v1/audio-features/{id}"
+SPOTIFY_ARTIST_URL = SPOTIFY_API_BASE_URL + "/v1/artists/{id}"
+SPOTIFY_SEARCH_URL = SPOTIFY_API_BASE_URL + "/v1/search"
+SPOTIFY_TRACKS_URL = SPOTIFY_API_BASE_URL + "/v1/tracks"
+SPOTIFY_AUDIO_FEATURES_BATCH_URL = SPOTIFY_API_BASE_URL + "/v1/audio-features"
+SPOTIFY_ARTISTS_URL = SPOTIFY_API_BASE_URL + "/v1/artists"
+
+# Max ids per call on Spotify's batch endpoints
+TRACKS_BATCH_SIZE = 50
+AUDIO_FEATURES_BATCH_SIZE = 100
+ARTISTS_BATCH_SIZE = 50
+
+# Refresh the cached token this many seconds before Spotify expires it
+TOKEN_EXPIRY_MARGIN = 60
+
+_token_cache = {"token": None, "expires_at": 0.0}
+_token_lock = threading.Lock()
 
 
 # --------------------------------------------------------
@@ -19,7 +45,24 @@ def get_spotify_token():
     """
     Client Credentials Flow.
     Returns a valid access token or None.
+
+    Tokens are cached until shortly before they expire, so batches of
+    calls share one token instead of fetching a new one per request.
     """
+    with _token_lock:
+        if _token_cache["token"] and time.monotonic() < _token_cache["expires_at"]:
+            record_cache("spotify_token", True)
+            return _token_cache["token"]
+        record_cache("spotify_token", False)
+
+        token, expires_in = _request_spotify_token()
+        if token:
+            _token_cache["token"] = token
+            _token_cache["expires_at"] = time.monotonic() + max(expires_in - TOKEN_EXPIRY_MARGIN, 0)
+        return token
+
+
+def _request_spotify_token():
     client_id = current_app.config["SPOTIFY_CLIENT_ID"]
     client_secret = current_app.config["SPOTIFY_CLIENT_SECRET"]
 
@@ -34,11 +77,12 @@ def get_spotify_token():
 
     data = {"grant_type": "client_credentials"}
 
-    resp = requests.post(SPOTIFY_TOKEN_URL, headers=headers, data=data)
+    resp = http.post(SPOTIFY_TOKEN_URL, headers=headers, data=data)
     if resp.status_code != 200:
-        return None
+        return None, 0
 
-    return resp.json().get("access_token")
+    body = resp.json()
+    return body.get("access_token"), body.get("expires_in", 3600)
 
 
 # --------------------------------------------------------
@@ -56,12 +100,14 @@ def fetch_spotify_track(spotify_id):
 
     headers = {"Authorization": f"Bearer {token}", "User-Agent": "SoundBound/1.0"}
 
-    resp = requests.get(SPOTIFY_TRACK_URL.format(id=spotify_id), headers=headers)
+    resp = http.get(SPOTIFY_TRACK_URL.format(id=spotify_id), headers=headers)
     if resp.status_code != 200:
         return None
 
-    data = resp.json()
+    return _normalize_track(resp.json(), spotify_id)
+
 
+def _normalize_track(data, spotify_id):
     return {
         "title": data.get("name"),
         "artists": [a["name"] for a in data.get("artists", [])],
@@ -87,10 +133,13 @@ def fetch_audio_features(spotify_id):
 
     headers = {"Authorization": f"Bearer {token}", "User-Agent": "SoundBound/1.0"}
 
-    resp = requests.get(SPOTIFY_AUDIO_FEATURES_URL.format(id=spotify_id), headers=headers)
+    resp = http.get(SPOTIFY_AUDIO_FEATURES_URL.format(id=spotify_id), headers=headers)
+    return _audio_features(resp)
+
+
+def _audio_features(resp):
     if resp.status_code != 200:
         return None
-
     return resp.json()
 
 
@@ -109,10 +158,13 @@ def fetch_artist_genres(artist_id):
 
     headers = {"Authorization": f"Bearer {token}", "User-Agent": "SoundBound/1.0"}
 
-    resp = requests.get(SPOTIFY_ARTIST_URL.format(id=artist_id), headers=headers)
+    resp = http.get(SPOTIFY_ARTIST_URL.format(id=artist_id), headers=headers)
+    return _artist_genres(resp)
+
+
+def _artist_genres(resp):
     if resp.status_code != 200:
         return []
-
     return resp.json().get("genres", [])
 
 
@@ -148,13 +200,19 @@ def search_spotify_tracks(query):
         "User-Agent": "SoundBound/1.0"
     }
 
-    params = {
+    resp = http.get(SPOTIFY_SEARCH_URL, headers=headers, params=_search_params(query))
+    return _search_results(resp)
+
+
+def _search_params(query):
+    return {
         "q": query,
         "type": "track",
         "limit": 10
     }
 
-    resp = requests.get(SPOTIFY_SEARCH_URL, headers=headers, params=params)
+
+def _search_results(resp):
     if resp.status_code != 200:
         return []
 
@@ -170,4 +228,186 @@ def search_spotify_tracks(query):
             "preview_url": item.get("preview_url")
         })
 
-    return results
\ No newline at end of file
+    return results
+
+
+# --------------------------------------------------------
+# CONCURRENT VARIANTS
+# --------------------------------------------------------
+# Same results as the functions above, over http.pooled_get (blocking
+# requests on http's thread pool), so independent lookups (a track's audio
+# features and its artists' genres, one call per artist) are in flight at
+# once. Drive them with http.fan_out(...) from sync code (it blocks until
+# they are done) or await them from another fan-out coroutine.
+
+async def get_spotify_token_concurrently():
+    """get_spotify_token; a cached token is returned without a thread hop."""
+    if _token_cache["token"] and time.monotonic() < _token_cache["expires_at"]:
+        return _token_cache["token"]
+    return await http.in_pool(get_spotify_token)
+
+
+async def _get_concurrently(url, token, **kwargs):
+    headers = {"Authorization": f"Bearer {token}", "User-Agent": "SoundBound/1.0"}
+    return await http.pooled_get(url, headers=headers, **kwargs)
+
+
+async def fetch_spotify_track_concurrently(spotify_id):
+    """fetch_spotify_track, as an awaitable for a fan-out."""
+    token = await get_spotify_token_concurrently()
+    if not token:
+        return None
+
+    resp = await _get_concurrently(SPOTIFY_TRACK_URL.format(id=spotify_id), token)
+    if resp.status_code != 200:
+        return None
+
+    return _normalize_track(resp.json(), spotify_id)
+
+
+async def fetch_audio_features_concurrently(spotify_id):
+    """fetch_audio_features, as an awaitable for a fan-out."""
+    token = await get_spotify_token_concurrently()
+    if not token:
+        return None
+
+    return _audio_features(await _get_concurrently(SPOTIFY_AUDIO_FEATURES_URL.format(id=spotify_id), token))
+
+
+async def fetch_genres_for_artists_concurrently(artist_ids):
+    """fetch_genres_for_artists; the artists are looked up together."""
+    token = await get_spotify_token_concurrently()
+    if not token:
+        return []
+
+    responses = await asyncio.gather(
+        *(_get_concurrently(SPOTIFY_ARTIST_URL.format(id=artist_id), token) for artist_id in artist_ids)
+    )
+    return list({g for resp in responses for g in _artist_genres(resp)})
+
+
+async def search_spotify_tracks_concurrently(query):
+    """search_spotify_tracks, as an awaitable for a fan-out."""
+    token = await get_spotify_token_concurrently()
+    if not token:
+        return []
+
+    return _search_results(await _get_concurrently(SPOTIFY_SEARCH_URL, token, params=_search_params(query)))
+
+
+async def fetch_track_with_details_concurrently(spotify_id):
+    """
+    A track plus its audio features and merged artist genres.
+    Returns (track, features, genres), or (None, None, []) if the track
+    lookup failed. Features and genres are fetched together.
+    """
+    track = await fetch_spotify_track_concurrently(spotify_id)
+    if not track:
+        return None, None, []
+
+    features, genres = await asyncio.gather(
+        fetch_audio_features_concurrently(spotify_id),
+        fetch_genres_for_artists_concurrently(track["artist_ids"]),
+    )
+    return track, features, genres
+
+
+# --------------------------------------------------------
+# BATCH LOOKUPS (bulk import / refresh)
+# --------------------------------------------------------
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def fetch_spotify_tracks(spotify_ids):
+    """
+    Fetch many tracks using the multi-id endpoint (50 ids per call).
+    Returns {spotify_id: normalized track dict}; unknown ids are omitted.
+    """
+    token = get_spotify_token()
+    if not token:
+        return {}
+
+    headers = {"Authorization": f"Bearer {token}", "User-Agent": "SoundBound/1.0"}
+
+    tracks = {}
+    for batch in _chunks(list(spotify_ids), TRACKS_BATCH_SIZE):
+        resp = http.get(SPOTIFY_TRACKS_URL, headers=headers, params={"ids": ",".join(batch)})
+        if resp.status_code != 200:
+            continue
+
+        for item in resp.json().get("tracks", []):
+            if item:
+                tracks[item["id"]] = _normalize_track(item, item["id"])
+
+    return tracks
+
+
+def fetch_audio_features_batch(spotify_ids):
+    """
+    Fetch audio features for many tracks (100 ids per call).
+    Returns {spotify_id: features dict}.
+    """
+    token = get_spotify_token()
+    if not token:
+        return {}
+
+    headers = {"Authorization": f"Bearer {token}", "User-Agent": "SoundBound/1.0"}
+
+    features = {}
+    for batch in _chunks(list(spotify_ids), AUDIO_FEATURES_BATCH_SIZE):
+        resp = http.get(SPOTIFY_AUDIO_FEATURES_BATCH_URL, headers=headers, params={"ids": ",".join(batch)})
+        if resp.status_code != 200:
+            continue
+
+        for item in resp.json().get("audio_features", []):
+            if item:
+                features[item["id"]] = item
+
+    return features
+
+
+def fetch_genres_by_artist(artist_ids):
+    """
+    Fetch genres for many artists (50 ids per call).
+    Returns {artist_id: [genres]}.
+    """
+    token = get_spotify_token()
+    if not token:
+        return {}
+
+    headers = {"Authorization": f"Bearer {token}", "User-Agent": "SoundBound/1.0"}
+
+    genres = {}
+    for batch in _chunks(list(artist_ids), ARTISTS_BATCH_SIZE):
+        resp = http.get(SPOTIFY_ARTISTS_URL, headers=headers, params={"ids": ",".join(batch)})
+        if resp.status_code != 200:
+            continue
+
+        for item in resp.json().get("artists", []):
+            if item:
+                genres[item["id"]] = item.get("genres", [])
+
+    return genres
+
+
+def fetch_track_details_batch(spotify_ids):
+    """
+    Tracks, audio features and artist genres for a batch of ids.
+    Returns (tracks, features, genres_by_track), each keyed by spotify id.
+    """
+    tracks = fetch_spotify_tracks(spotify_ids)
+    features = fetch_audio_features_batch(list(tracks))
+
+    artist_ids = list(dict.fromkeys(aid for t in tracks.values() for aid in t["artist_ids"]))
+    genres_by_artist = fetch_genres_by_artist(artist_ids)
+
+    genres = {
+        sid: list(dict.fromkeys(
+            g for aid in track["artist_ids"] for g in genres_by_artist.get(aid, [])
+        ))
+        for sid, track in tracks.items()
+    }
+    return tracks, features, genres
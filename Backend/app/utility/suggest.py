@@ -0,0 +1,419 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import timedelta
+from itertools import islice
+
+from sqlalchemy import event, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Books, Songs, Tags
+from app.utility.normalize import normalize_text
+
+# ------------------ TYPEAHEAD PREFIX INDEX ------------------ #
+# In-memory index for /search/suggest. Every suggestion (book title,
+# author, song title, artist, tag) is stored under its normalized text
+# starting at each of its first few words, in one sorted list of
+# (key, entry) tuples. A lookup is a bisect to the first key >= prefix and
+# a short forward scan, so it stays well under a millisecond.
+#
+# Memory is bounded by SUGGEST_MAX_ENTRIES: the warm-up loads only the
+# newest rows that fit and, once full, each insert evicts the oldest entry.
+# Batches (warm-up, a commit's rows, a sync) are merged into the key list
+# with one sort instead of one insort per key.
+#
+# The index is per process. Changes committed by this process are applied
+# on commit, so rolled-back imports never show up. Changes committed by
+# other workers and job processes are picked up by a background loop
+# (start_warmup) that every SUGGEST_SYNC_INTERVAL seconds re-reads the rows
+# inserted (id) or updated (updated_at) since its last pass, and every
+# SUGGEST_REBUILD_INTERVAL seconds rebuilds the index, which also drops
+# rows deleted elsewhere.
+
+KINDS = ("book", "author", "song", "artist", "tag")
+
+WORD_STARTS = 6      # "the lord of the rings" is found by "lor", "of t", "rin", ...
+SCAN_FACTOR = 8      # keys scanned per requested result before giving up
+INSORT_LIMIT = 64    # batches with fewer keys are inserted one by one
+
+# a sync re-reads this much before its watermarks, for rows committed late
+# (a transaction stamped or numbered before another one that committed first)
+SYNC_ID_OVERLAP = 200
+SYNC_TIME_OVERLAP = timedelta(seconds=60)
+
+
+class PrefixIndex:
+    def __init__(self, max_entries=200_000):
+        self.max_entries = max_entries
+        self._keys = []                # sorted [(normalized text, entry id)]
+        self._entries = OrderedDict()  # entry id -> (kind, ref_id, label, keys), oldest first
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _keys_for(label):
+        words = normalize_text(label).split()
+        return {" ".join(words[i:]) for i in range(min(len(words), WORD_STARTS))}
+
+    def add(self, entry_id, kind, ref_id, label):
+        self.add_many([(entry_id, kind, ref_id, label)])
+
+    def add_many(self, items):
+        """Add or replace (entry_id, kind, ref_id, label) items, merged in one pass."""
+        prepared = OrderedDict()
+        for entry_id, kind, ref_id, label in items:
+            keys = self._keys_for(label)
+            if keys:
+                prepared.pop(entry_id, None)
+                prepared[entry_id] = (kind, ref_id, label, keys)
+        if not prepared:
+            return
+
+        with self._lock:
+            for entry_id in [e for e, entry in prepared.items() if self._entries.get(e) == entry]:
+                del prepared[entry_id]  # unchanged (a sync re-reading rows it has seen)
+            if not prepared:
+                return
+            self._discard_many(prepared)
+            new_keys = []
+            for entry_id, entry in prepared.items():
+                self._entries[entry_id] = entry
+                new_keys.extend((key, entry_id) for key in entry[3])
+
+            if len(new_keys) < INSORT_LIMIT:
+                for key in new_keys:
+                    insort(self._keys, key)
+            else:
+                self._keys.extend(new_keys)
+                self._keys.sort()  # two sorted runs: timsort merges them in linear time
+
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                self._discard_many(list(islice(self._entries, overflow)))
+
+    def discard(self, entry_id):
+        self.discard_many([entry_id])
+
+    def discard_many(self, entry_ids):
+        with self._lock:
+            self._discard_many(entry_ids)
+
+    def _discard_many(self, entry_ids):
+        pairs = set()
+        for entry_id in entry_ids:
+            entry = self._entries.pop(entry_id, None)
+            if entry is not None:
+                pairs.update((key, entry_id) for key in entry[3])
+        if not pairs:
+            return
+
+        if len(pairs) < INSORT_LIMIT:
+            for pair in pairs:
+                i = bisect_left(self._keys, pair)
+                if i < len(self._keys) and self._keys[i] == pair:
+                    del self._keys[i]
+        else:
+            self._keys = [pair for pair in self._keys if pair not in pairs]
+
+    def load(self, items):
+        """Replace the contents with items (oldest first); lookups see the old index until the swap."""
+        entries = OrderedDict()
+        for entry_id, kind, ref_id, label in items:
+            keys = self._keys_for(label)
+            if keys:
+                entries.pop(entry_id, None)
+                entries[entry_id] = (kind, ref_id, label, keys)
+        for entry_id in list(islice(entries, max(len(entries) - self.max_entries, 0))):
+            del entries[entry_id]
+        keys = sorted((key, entry_id) for entry_id, entry in entries.items() for key in entry[3])
+
+        with self._lock:
+            self._entries = entries
+            self._keys = keys
+
+    def clear(self):
+        with self._lock:
+            self._keys = []
+            self._entries = OrderedDict()
+
+    def lookup(self, prefix, kinds=None, limit=10):
+        """Best matches for a prefix: whole-label matches first, then shorter labels."""
+        prefix = normalize_text(prefix)
+        if not prefix:
+            return []
+
+        found = {}
+        budget = limit * SCAN_FACTOR
+        with self._lock:
+            i = bisect_left(self._keys, (prefix,))
+            end = min(len(self._keys), i + budget * len(KINDS))
+            while i < end and budget > 0:
+                key, entry_id = self._keys[i]
+                if not key.startswith(prefix):
+                    break
+                i += 1
+                kind, ref_id, label, _ = self._entries[entry_id]
+                if kinds and kind not in kinds:
+                    continue
+                budget -= 1
+                starts_label = normalize_text(label).startswith(prefix)
+                rank = (not starts_label, len(label))
+                if entry_id not in found or rank < found[entry_id][0]:
+                    found[entry_id] = (rank, kind, ref_id, label)
+
+        ranked = sorted(found.values(), key=lambda item: item[0])[:limit]
+        return [
+            {"type": kind, "id": ref_id, "label": label}
+            for _, kind, ref_id, label in ranked
+        ]
+
+
+_index = PrefixIndex()
+_ready = threading.Event()
+
+
+def get_index():
+    return _index
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+# --------------------------------------------------------
+# ENTRIES
+# --------------------------------------------------------
+# Books/songs are keyed by row id; authors, artists and tags by their
+# normalized name, so a name shared by many rows is suggested once.
+
+def _book_entries(book_id, title, author_names, openlib_id):
+    if title and title != openlib_id:  # placeholders use the id as title
+        yield ("book", book_id), "book", book_id, title
+    for name in author_names or []:
+        if name:
+            yield ("author", normalize_text(name)), "author", None, name
+
+
+def _song_entries(song_id, title, artists, spotify_id):
+    if title and title != spotify_id:
+        yield ("song", song_id), "song", song_id, title
+    for name in artists or []:
+        if name:
+            yield ("artist", normalize_text(name)), "artist", None, name
+
+
+def _tag_entries(tag_id, mood_name):
+    if mood_name:
+        yield ("tag", tag_id), "tag", tag_id, mood_name
+
+
+_SOURCES = (
+    (Books, (Books.id, Books.title, Books.author_names, Books.openlib_id), _book_entries),
+    (Songs, (Songs.id, Songs.title, Songs.artists, Songs.spotify_id), _song_entries),
+    (Tags, (Tags.id, Tags.mood_name), _tag_entries),
+)
+_ENTRIES_BY_MODEL = {model: (columns, entries) for model, columns, entries in _SOURCES}
+
+
+def _row_entries(model, row):
+    return list(_ENTRIES_BY_MODEL[model][1](*row))
+
+
+def _object_entries(obj):
+    columns, entries = _ENTRIES_BY_MODEL[type(obj)]
+    return list(entries(*(getattr(obj, c.key) for c in columns)))
+
+
+# --------------------------------------------------------
+# BUILD
+# --------------------------------------------------------
+
+def rebuild(batch_size=1000):
+    """
+    Reload suggestions from the tables. Only the newest rows that fit in
+    the index are read; they are added oldest first so eviction stays by age.
+    """
+    budget = _index.max_entries
+    watermarks = _read_watermarks()  # before reading: later changes are left to sync()
+    items = []
+
+    for model, columns, entries in _SOURCES:
+        rows = []
+        last_id = None
+        while len(rows) < budget:
+            stmt = select(*columns).order_by(model.id.desc()).limit(batch_size)
+            if last_id is not None:
+                stmt = stmt.where(model.id < last_id)
+            batch = db.session.execute(stmt).all()
+            if not batch:
+                break
+            rows.extend(batch)
+            last_id = batch[-1][0]
+        items.extend(item for row in reversed(rows[:budget]) for item in entries(*row))
+
+    _index.load(items)
+    _watermarks.update(watermarks)
+    _ready.set()
+    return len(_index)
+
+
+# --------------------------------------------------------
+# SYNC (changes committed by other processes)
+# --------------------------------------------------------
+
+_watermarks = {}  # model -> (max id, max updated_at) seen by the last rebuild/sync
+
+
+def _read_watermarks():
+    return {
+        model: tuple(db.session.execute(select(func.max(model.id), func.max(model.updated_at))).one())
+        for model, _, _ in _SOURCES
+    }
+
+
+def sync():
+    """Apply rows inserted or updated since the last rebuild/sync. Returns how many rows were read."""
+    if not _watermarks:
+        return 0
+    watermarks = _read_watermarks()
+    read = 0
+
+    for model, columns, entries in _SOURCES:
+        max_id, max_updated = _watermarks.get(model, (None, None))
+        criteria = [model.id > (max_id or 0) - SYNC_ID_OVERLAP]
+        if max_updated is not None:
+            criteria.append(model.updated_at > max_updated - SYNC_TIME_OVERLAP)
+        rows = db.session.execute(select(*columns).where(or_(*criteria)).order_by(model.id)).all()
+        _index.add_many(item for row in rows for item in entries(*row))
+        read += len(rows)
+
+    _watermarks.update(watermarks)
+    return read
+
+
+# --------------------------------------------------------
+# INCREMENTAL UPDATES
+# --------------------------------------------------------
+
+def _pending(session):
+    return session.info.setdefault("suggest_pending", [])
+
+
+def _after_flush(session, flush_context):
+    pending = _pending(session)
+    added = [
+        entry
+        for obj in list(session.new) + list(session.dirty)
+        if type(obj) in _ENTRIES_BY_MODEL
+        for entry in _object_entries(obj)
+    ]
+    if added:
+        pending.append(("add", added))
+
+    # shared author/artist names may still be used elsewhere; keep them
+    kinds = {Books: "book", Songs: "song", Tags: "tag"}
+    removed = [
+        ((kinds[type(obj)], obj.id), None, None, None)
+        for obj in session.deleted
+        if type(obj) in kinds
+    ]
+    if removed:
+        pending.append(("discard", removed))
+
+
+def _after_commit(session):
+    pending = session.info.pop("suggest_pending", None)
+    for op, entries in pending or ():
+        if op == "add":
+            _index.add_many(entries)
+        else:
+            _index.discard_many([entry[0] for entry in entries])
+
+
+def _after_rollback(session):
+    session.info.pop("suggest_pending", None)
+
+
+def reindex(model, ids):
+    """Queue suggestions for rows changed by a bulk UPDATE (applied on commit)."""
+    ids = list(ids)
+    if not ids or model not in _ENTRIES_BY_MODEL:
+        return
+    columns = _ENTRIES_BY_MODEL[model][0]
+    rows = db.session.execute(select(*columns).where(model.id.in_(ids))).all()
+    _pending(db.session()).extend(("add", _row_entries(model, row)) for row in rows)
+
+
+def remove(model, ids):
+    """Queue removal of rows deleted by a bulk DELETE (applied on commit)."""
+    kind = {Books: "book", Songs: "song", Tags: "tag"}.get(model)
+    if kind and ids:
+        _pending(db.session()).append(
+            ("discard", [((kind, ref_id), None, None, None) for ref_id in ids])
+        )
+
+
+# --------------------------------------------------------
+# SETUP
+# --------------------------------------------------------
+
+def init_suggest(app):
+    """Start incremental updates; the index is warmed by start_warmup()."""
+    _index.max_entries = app.config.get("SUGGEST_MAX_ENTRIES", 200_000)
+
+    for name, listener in (
+        ("after_flush", _after_flush),
+        ("after_commit", _after_commit),
+        ("after_rollback", _after_rollback),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+_warmup_started = False
+_warmup_lock = threading.Lock()
+
+
+def start_warmup(app):
+    """
+    Build the index in a background thread, once per process (first request),
+    then keep it in step with the database (SUGGEST_SYNC_INTERVAL; 0 = build only).
+    """
+    global _warmup_started
+    if _warmup_started:
+        return
+    with _warmup_lock:
+        if _warmup_started:
+            return
+        _warmup_started = True
+
+    sync_interval = app.config.get("SUGGEST_SYNC_INTERVAL", 10)
+    rebuild_interval = app.config.get("SUGGEST_REBUILD_INTERVAL", 900)
+
+    def run(step, what):
+        with app.app_context():
+            try:
+                step()
+                return True
+            except Exception:
+                app.logger.exception("Could not %s the suggest index", what)
+                return False
+            finally:
+                db.session.remove()
+
+    def warm():
+        built = run(rebuild, "build")
+        built_at = time.monotonic()
+        while sync_interval > 0:
+            time.sleep(sync_interval)
+            if not built or time.monotonic() - built_at >= rebuild_interval:
+                built = run(rebuild, "rebuild")
+                built_at = time.monotonic()
+            else:
+                run(sync, "sync")
+
+    threading.Thread(target=warm, name="suggest-warmup", daemon=True).start()
@@ -0,0 +1,362 @@
+"""
+Per-endpoint latency, throughput and SQL query counts.
+
+    python benchmarks/bench_endpoints.py [--scale small] [--requests 50] [--concurrency 4]
+                                         [--database-uri URI] [--upstream-latency-ms 20]
+                                         [--only books] [--save out.json]
+                                         [--baseline out.json] [--max-regression 0.25]
+
+Seeds a fresh database (seed.py; a temporary SQLite file unless
+--database-uri points at an empty SQLite or Postgres database), starts the
+fake Open Library / Spotify server (fake_upstreams.py) and points the app at
+it, then drives every blueprint's endpoints through the Flask test client,
+--concurrency threads at a time. For each endpoint it reports p50 / p95 /
+p99 latency, requests per second and the SQL statements per request (from
+the Server-Timing header, app/utility/instrumentation.py).
+
+--save writes the numbers as JSON; --baseline compares against such a file
+and exits 1 when an endpoint's p95 grew by more than --max-regression (a
+fraction) or it runs more queries per request than before, so a slower
+change shows up before it is deployed. In-process job workers are off, so
+background enrichment doesn't compete with the requests being timed.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_upstreams import FakeUpstreams  # noqa: E402
+
+QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+# --------------------------------------------------------
+# ENDPOINTS
+# --------------------------------------------------------
+# path / body / user are functions of (i, ctx): i counts requests to the
+# endpoint, so reads walk through different rows and writes never collide.
+
+@dataclass
+class Endpoint:
+    blueprint: str
+    method: str
+    path: Callable
+    user: Optional[Callable] = None      # -> user id to authenticate as, or None
+    body: Optional[Callable] = None      # -> JSON body
+    dialects: tuple = ()                 # only run on these backends (empty = all)
+
+    @property
+    def name(self):
+        return f"{self.method} {self.path.__doc__}"
+
+
+def _p(template, doc=None):
+    """path function with a readable name for the report"""
+    fn = template if callable(template) else (lambda i, ctx: template)
+    fn.__doc__ = doc or template
+    return fn
+
+
+def reader(i, ctx):
+    return ctx.readers[i % len(ctx.readers)]
+
+
+def author(i, ctx):
+    return ctx.authors[i % len(ctx.authors)]
+
+
+def admin(i, ctx):
+    return 1
+
+
+def owner(i, ctx):
+    return ctx.playlists[i % len(ctx.playlists)][1]
+
+
+def _book(i, ctx):
+    return 1 + (i * 7) % ctx.scale["books"]
+
+
+def _playlist(i, ctx):
+    return ctx.playlists[i % len(ctx.playlists)][0]
+
+
+def _new_playlist(i, ctx):
+    # a library book the reader has no playlist for yet (one playlist per user and book)
+    user_id = reader(i, ctx)
+    books = ctx.playlist_free_books[user_id]
+    return {"title": f"Bench playlist {i}", "book_id": books[(i // len(ctx.readers)) % len(books)]}
+
+
+def _word(i, ctx):
+    from seed import WORDS
+
+    return WORDS[i % len(WORDS)]
+
+
+ENDPOINTS = (
+    Endpoint("app", "GET", _p("/")),
+    Endpoint("auth", "POST", _p("/auth/login"),
+             body=lambda i, ctx: {"email": f"bench{reader(i, ctx)}@example.com", "password": "benchmark"}),
+    Endpoint("auth", "GET", _p("/auth/me"), reader),
+
+    Endpoint("books", "GET", _p(lambda i, ctx: f"/books/id/{_book(i, ctx)}", "/books/id/<book_id>"), reader),
+    Endpoint("books", "GET", _p(lambda i, ctx: f"/books/isbn/{ctx.isbn(_book(i, ctx))}", "/books/isbn/<isbn>"),
+             reader),
+    Endpoint("books", "GET", _p(lambda i, ctx: f"/books/OL{_book(i, ctx)}W", "/books/<openlib_id> (local)"),
+             reader),
+    Endpoint("books", "GET", _p(lambda i, ctx: f"/books/OL{800_000 + i}W", "/books/<openlib_id> (upstream)"),
+             reader),
+    Endpoint("books", "GET", _p(lambda i, ctx: f"/books/OL{_book(i, ctx)}W/similar",
+                                "/books/<openlib_id>/similar"), reader, dialects=("postgresql",)),   # ARRAY &&
+    Endpoint("books", "GET", _p(lambda i, ctx: f"/books/search?title={_word(i, ctx)}", "/books/search"), reader),
+    Endpoint("books", "GET", _p("/books/author-reco"), reader),
+    Endpoint("books", "GET", _p("/books/popular"), reader, dialects=("postgresql",)),   # unnest()
+    Endpoint("books", "POST", _p("/books/add-book"), reader,
+             body=lambda i, ctx: {"openlib_id": f"OL{700_000 + ctx.run * 10_000 + i}W"}),
+
+    Endpoint("playlists", "GET", _p(lambda i, ctx: f"/playlists/{_playlist(i, ctx)}", "/playlists/<playlist_id>"),
+             owner),
+    Endpoint("playlists", "GET", _p("/playlists/me"), reader),
+    Endpoint("playlists", "GET", _p("/playlists/author-reco"), reader),
+    Endpoint("playlists", "POST", _p("/playlists"), reader,
+             body=_new_playlist),
+    Endpoint("playlists", "PUT", _p(lambda i, ctx: f"/playlists/{_playlist(i, ctx)}", "/playlists/<playlist_id>"),
+             owner, body=lambda i, ctx: {"title": f"Renamed {i}"}),
+
+    Endpoint("songs", "GET", _p(lambda i, ctx: f"/songs/spotify/search?q={_word(i, ctx)}", "/songs/spotify/search"),
+             reader),
+    Endpoint("songs", "POST", _p("/songs/import"), reader,
+             body=lambda i, ctx: {"spotify_id": f"new{ctx.run}x{i}"}),
+
+    Endpoint("tags", "GET", _p("/tags"), reader),
+    Endpoint("tags", "POST", _p("/tags"), admin,
+             body=lambda i, ctx: {"mood_name": f"bench mood {ctx.run}-{i}", "category": "mood"}),
+
+    Endpoint("users", "GET", _p("/users/me"), reader),
+    Endpoint("users", "GET", _p("/users/me/library"), reader),
+    Endpoint("users", "GET", _p("/users/authors"), reader),
+    Endpoint("users", "GET", _p("/users/author-applications"), admin),
+    Endpoint("users", "GET", _p("/users/author-applications/pending"), admin),
+    Endpoint("users", "GET", _p("/users/me/export"), reader),
+
+    Endpoint("jobs", "GET", _p("/jobs/metadata-refresh"), admin),
+
+    Endpoint("search", "GET", _p(lambda i, ctx: f"/search?q={_word(i, ctx)}", "/search (local)"), reader),
+    Endpoint("search", "GET", _p(lambda i, ctx: f"/search?q=zz{i}", "/search (upstream fallback)"), reader),
+    Endpoint("search", "GET", _p(lambda i, ctx: f"/search/suggest?q={_word(i, ctx)[:3]}", "/search/suggest"),
+             reader),
+)
+
+
+# --------------------------------------------------------
+# RUN
+# --------------------------------------------------------
+
+def _context(app, scale):
+    from sqlalchemy import select
+
+    from app.extensions import db
+    from app.models import Books, Playlist_Books, Playlists, Users
+    from app.utility.auth import encode_token
+
+    with app.app_context():
+        users = db.session.execute(select(Users.id, Users.role)).all()
+        libraries = dict(db.session.execute(select(Users.id, Users.library)).all())
+        with_playlist = set(db.session.execute(
+            select(Playlists.user_id, Playlist_Books.book_id).join(Playlist_Books)
+        ).all())
+        playlists = db.session.execute(select(Playlists.id, Playlists.user_id).order_by(Playlists.id)).all()
+        isbns = dict(db.session.execute(select(Books.id, Books.isbn_list)).all())
+        tokens = {user_id: "Bearer " + encode_token(user_id, role) for user_id, role in users}
+        db.session.remove()
+
+    return SimpleNamespace(
+        scale=scale,
+        run=int(time.time()) % 100_000,
+        readers=[user_id for user_id, role in users if role == "reader"],
+        authors=[user_id for user_id, role in users if role == "author"] or [1],
+        playlists=[tuple(row) for row in playlists],
+        isbn=lambda book_id: (isbns.get(book_id) or ["0"])[0],
+        tokens=tokens,
+        playlist_free_books={
+            user_id: [b for b in libraries[user_id] or [] if (user_id, b) not in with_playlist] or [1]
+            for user_id, _ in users
+        },
+    )
+
+
+def _request(client, endpoint, i, ctx):
+    path = endpoint.path(i, ctx)
+    headers = {}
+    if endpoint.user is not None:
+        headers["Authorization"] = ctx.tokens[endpoint.user(i, ctx)]
+    body = endpoint.body(i, ctx) if endpoint.body else None
+
+    started = time.perf_counter()
+    response = client.open(path, method=endpoint.method, headers=headers, json=body)
+    response.get_data()   # drain streamed bodies
+    elapsed = time.perf_counter() - started
+
+    match = QUERIES.search(response.headers.get("Server-Timing", ""))
+    status = response.status_code
+    response.close()
+    return elapsed, status, int(match.group(1)) if match else None
+
+
+def run_endpoint(app, endpoint, ctx, requests, concurrency, warmup):
+    client = app.test_client()
+    for i in range(warmup):
+        _request(client, endpoint, requests + i, ctx)
+
+    samples = []
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            sample = _request(client, endpoint, i, ctx)
+            with lock:
+                samples.append(sample)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies = sorted(s[0] for s in samples)
+    queries = [s[2] for s in samples if s[2] is not None]
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "endpoint": endpoint.name,
+        "blueprint": endpoint.blueprint,
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if s[1] >= 400),
+        "statuses": sorted({s[1] for s in samples}),
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "rps": len(samples) / wall if wall else 0.0,
+        "queries_mean": statistics.fmean(queries) if queries else None,
+        "queries_max": max(queries) if queries else None,
+    }
+
+
+def report(results):
+    print(f"{'endpoint':<48}{'n':>5}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>9}{'sql':>7}{'max':>5}")
+    for r in results:
+        queries = "-" if r["queries_mean"] is None else f"{r['queries_mean']:.1f}"
+        print(f"{r['endpoint'][:47]:<48}{r['requests']:>5}{r['errors']:>5}"
+              f"{r['p50_ms']:>7.1f}ms{r['p95_ms']:>7.1f}ms{r['p99_ms']:>7.1f}ms"
+              f"{r['rps']:>9.1f}{queries:>7}{r['queries_max'] if r['queries_max'] is not None else '-':>5}")
+
+
+def compare(results, baseline, max_regression):
+    """Endpoints slower (p95) or chattier (queries) than the baseline run."""
+    before = {r["endpoint"]: r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = before.get(r["endpoint"])
+        if old is None:
+            continue
+        if r["p95_ms"] > old["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{r['endpoint']}: p95 {old['p95_ms']:.1f}ms -> {r['p95_ms']:.1f}ms")
+        if (r["queries_mean"] or 0) > (old["queries_mean"] or 0) + 0.5:
+            regressions.append(f"{r['endpoint']}: {old['queries_mean']:.1f} -> {r['queries_mean']:.1f} queries")
+    return regressions
+
+
+def main(args):
+    upstreams = FakeUpstreams(args.upstream_latency_ms).start()
+    os.environ.update(upstreams.environ())
+    os.environ.setdefault("LOG_LEVEL", "ERROR")   # no per-request log lines
+
+    tmp = None
+    uri = args.database_uri
+    if uri is None:
+        tmp = tempfile.TemporaryDirectory()
+        uri = "sqlite:///" + os.path.join(tmp.name, "bench.db")
+
+    from seed import create_seeded_app, resolve_scale
+
+    scale = resolve_scale(args.scale)
+    app, counts = create_seeded_app(uri, scale)
+    app.config["JOB_WORKER_THREADS"] = 0
+    app.config["PROPAGATE_EXCEPTIONS"] = False   # a failing endpoint is a row of 500s, not a crash
+    dialect = uri.split(":", 1)[0].split("+", 1)[0]
+    ctx = _context(app, scale)
+    print(f"seeded {uri.split('@')[-1]}: " + ", ".join(f"{count} {table}" for table, count in counts.items()))
+    print(f"upstream latency {args.upstream_latency_ms:.0f}ms, {args.requests} requests per endpoint, "
+          f"concurrency {args.concurrency}\n")
+
+    results = []
+    try:
+        for endpoint in ENDPOINTS:
+            if args.only and args.only not in f"{endpoint.blueprint} {endpoint.name}":
+                continue
+            if endpoint.dialects and dialect not in endpoint.dialects:
+                continue
+            results.append(run_endpoint(app, endpoint, ctx, args.requests, args.concurrency, args.warmup))
+    finally:
+        upstreams.stop()
+        if tmp is not None:
+            from app.extensions import db
+
+            with app.app_context():
+                db.engine.dispose()
+            tmp.cleanup()
+
+    report(results)
+    print(f"\nfake upstream requests: {upstreams.requests}")
+
+    meta = {"scale": scale, "requests": args.requests, "concurrency": args.concurrency,
+            "upstream_latency_ms": args.upstream_latency_ms, "dialect": dialect}
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+
+    failed = [f"{r['endpoint']}: status {r['statuses']}" for r in results if r["errors"]]
+    for failure in failed:
+        print("ERRORS:", failure)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for regression in regressions:
+            print("REGRESSION:", regression)
+        failed += regressions
+    return not failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-uri", default=None, help="empty SQLite/Postgres database (default: temp SQLite)")
+    parser.add_argument("--scale", choices=("small", "medium", "large"), default="small")
+    parser.add_argument("--requests", type=int, default=50, help="timed requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed requests per endpoint first")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads")
+    parser.add_argument("--upstream-latency-ms", type=float, default=20)
+    parser.add_argument("--only", default=None, help="substring of blueprint or endpoint name")
+    parser.add_argument("--save", default=None, help="write results as JSON")
+    parser.add_argument("--baseline", default=None, help="compare against a --save file")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed p95 growth (fraction)")
+    sys.exit(0 if main(parser.parse_args()) else 1)
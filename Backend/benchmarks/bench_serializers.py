@@ -0,0 +1,154 @@
+"""
+Compiled serializers vs marshmallow.
+
+    python benchmarks/bench_serializers.py [--sizes 1,100,10000] [--repeat 5]
+
+For each schema and size, builds N in-memory objects, checks that
+fast_jsonify(dump(schema, objs)) returns exactly the bytes of
+jsonify(schema.dump(objs)), then reports the best-of-N time for both
+paths (serialize + encode). No database or network is used: books and
+users are transient model instances, playlists are plain objects with the
+shape of an eagerly loaded Playlists row (their relationships are dynamic,
+which would otherwise time the queries instead of the serializer).
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify  # noqa: E402
+
+from app.blueprints.books.schemas import book_dump_schema  # noqa: E402
+from app.blueprints.playlists.schemas import playlist_detail_schema  # noqa: E402
+from app.blueprints.users.schemas import user_schema  # noqa: E402
+from app.models import Books, Users  # noqa: E402
+from app.utility.serializers import dump, fast_jsonify  # noqa: E402
+
+BASE_TIME = datetime(2024, 1, 1, 12, 0, 0)
+
+
+# --------------------------------------------------------
+# FIXTURES
+# --------------------------------------------------------
+
+def make_book(i):
+    return Books(
+        id=i,
+        title=f"The Book of Things, Volume {i} — “naïve” edition",
+        openlib_id=f"OL{i}W",
+        author_names=[f"Author {i}", "Ann Author"],
+        author_keys=[f"OL{i}A"],
+        first_publish_year=1950 + i % 70,
+        subjects=["fantasy", "magic", f"subject {i % 13}"],
+        description="A long description. " * 8,
+        cover_id=1000 + i,
+        cover_url=f"https://covers.openlibrary.org/b/id/{1000 + i}-L.jpg",
+        isbn_list=[f"97803064061{i % 10}7"],
+        source="verified",
+        created_at=BASE_TIME + timedelta(seconds=i),
+        updated_at=BASE_TIME + timedelta(seconds=i, microseconds=123),
+    )
+
+
+def make_user(i):
+    return Users(
+        id=i,
+        first_name="Ann",
+        last_name=f"Author {i}",
+        username=f"author{i}",
+        email=f"author{i}@example.com",
+        role="author",
+        author_keys=[f"OL{i}A"],
+        library=list(range(i, i + 20)),
+        created_at=BASE_TIME + timedelta(seconds=i),
+        updated_at=BASE_TIME + timedelta(seconds=i),
+    )
+
+
+def make_playlist(i):
+    def song(j):
+        return SimpleNamespace(
+            id=j, spotify_id=f"sp{j}", title=f"Song {j}", artists=["Artist", f"Band {j % 7}"],
+            album="Album", album_art=None, preview_url=None, popularity=j % 100, duration_ms=200_000,
+            genres=["rock"], created_at=BASE_TIME, updated_at=BASE_TIME,
+        )
+
+    return SimpleNamespace(
+        id=i,
+        title=f"Playlist {i}",
+        description="Songs for reading",
+        is_public=True,
+        is_author_reco=bool(i % 2),
+        created_at=BASE_TIME,
+        updated_at=BASE_TIME + timedelta(minutes=i),
+        books=[make_book(i)],
+        user=SimpleNamespace(id=i % 50, username=f"user{i % 50}"),
+        song_count=10,
+        playlist_songs=[
+            SimpleNamespace(id=j, playlist_id=i, song_id=j, song=song(j))
+            for j in range(10)
+        ],
+        tags=[SimpleNamespace(id=t, mood_name=f"mood {t}") for t in range(3)],
+    )
+
+
+CASES = (
+    ("BookDumpSchema", book_dump_schema, make_book),
+    ("UserSchema", user_schema, make_user),
+    ("PlaylistDetailSchema", playlist_detail_schema, make_playlist),
+)
+
+
+# --------------------------------------------------------
+# RUN
+# --------------------------------------------------------
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, repeat):
+    app = Flask(__name__)
+    rows = []
+
+    with app.app_context():
+        for name, schema, factory in CASES:
+            for size in sizes:
+                objs = [factory(i) for i in range(1, size + 1)]
+                data = objs if size > 1 else objs[0]
+                many = size > 1
+
+                def baseline():
+                    return jsonify(schema.dump(data, many=many)).get_data()
+
+                def compiled():
+                    return fast_jsonify(dump(schema, data, many=many)).get_data()
+
+                expected, actual = baseline(), compiled()
+                if expected != actual:
+                    raise SystemExit(f"{name} x{size}: output differs from marshmallow")
+
+                slow = best_of(baseline, repeat)
+                fast = best_of(compiled, repeat)
+                rows.append((name, size, len(expected), slow, fast))
+
+    print(f"{'schema':<22}{'n':>7}{'bytes':>11}{'marshmallow':>14}{'compiled':>12}{'speedup':>9}")
+    for name, size, nbytes, slow, fast in rows:
+        print(f"{name:<22}{size:>7}{nbytes:>11}{slow * 1000:>12.2f}ms{fast * 1000:>10.2f}ms{slow / fast:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1,100,10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(",")], args.repeat)
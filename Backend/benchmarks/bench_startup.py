@@ -0,0 +1,85 @@
+"""
+Worker cold-start budget.
+
+    python benchmarks/bench_startup.py [--runs 5] [--budget 2.0]
+
+Starts a fresh interpreter per run (like a new gunicorn worker) and times
+`import app` and `create_app()` separately, counting database connections
+opened while doing so. Fails (exit 1) when the median import + create_app
+time exceeds --budget seconds, or when startup connects to the database at
+all: the schema comes from `flask db upgrade` and everything that reads
+tables starts with the first request. The database URI points at a file
+that does not exist, so a stray create_all or query would also show up as
+that file appearing.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, time
+t0 = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+connects = []
+event.listen(Pool, "connect", lambda *args: connects.append(1))
+t1 = time.perf_counter()
+from app import create_app
+t2 = time.perf_counter()
+app = create_app()
+t3 = time.perf_counter()
+print(json.dumps({"import": t2 - t1, "create_app": t3 - t2, "connects": len(connects)}))
+"""
+
+
+def run_once(db_path):
+    env = dict(os.environ)
+    env["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + db_path
+    env.setdefault("APP_CONFIG", "production")
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run(runs, budget):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "never-created.db")
+        samples = [run_once(db_path) for _ in range(runs)]
+        db_created = os.path.exists(db_path)
+
+    imports = [s["import"] for s in samples]
+    creates = [s["create_app"] for s in samples]
+    totals = [s["import"] + s["create_app"] for s in samples]
+    connects = max(s["connects"] for s in samples)
+
+    print(f"{'phase':<14}{'median':>10}{'min':>10}{'max':>10}")
+    for name, values in (("import app", imports), ("create_app()", creates), ("total", totals)):
+        print(f"{name:<14}{statistics.median(values) * 1000:>8.0f}ms"
+              f"{min(values) * 1000:>8.0f}ms{max(values) * 1000:>8.0f}ms")
+    print(f"db connections during startup: {connects}; db file created: {db_created}")
+
+    failures = []
+    if statistics.median(totals) > budget:
+        failures.append(f"median startup {statistics.median(totals):.2f}s exceeds the {budget:.2f}s budget")
+    if connects or db_created:
+        failures.append("startup touched the database")
+    for failure in failures:
+        print("FAIL:", failure)
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds, median import + create_app")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.runs, args.budget) else 1)
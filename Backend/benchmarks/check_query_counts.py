@@ -0,0 +1,170 @@
+"""
+Query-count regression check: SQL statements per request must not grow with the data.
+
+    python benchmarks/check_query_counts.py [--growth 4] [--samples 5] [--only playlists]
+
+Seeds two databases (seed.py), each in its own process: the "small" scale
+and one with --growth times the users, books, songs, playlists, library
+and playlist sizes. Every endpoint in bench_endpoints.py is requested
+--samples times on each (one client, different rows each time, the fake
+upstreams answering instantly) and the most statements any request ran is
+kept; the first requests miss the caches, so that is the uncached path.
+
+Fails (exit 1) when an endpoint
+  - runs more statements on the bigger dataset: its cost grows with rows
+    (an N+1 such as a lazy load or COUNT per playlist), or
+  - runs more than its ceiling in QUERY_BUDGETS (DEFAULT_BUDGET otherwise).
+
+Lower a ceiling when a change makes an endpoint cheaper; raising one
+should come with a reason in the commit.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+DEFAULT_BUDGET = 10
+
+# most SQL statements one request may run, by endpoint name (bench_endpoints.py);
+# token_required's user lookup counts as one
+QUERY_BUDGETS = {
+    "GET /": 0,
+    "POST /auth/login": 1,
+    "GET /auth/me": 1,
+    "GET /books/id/<book_id>": 4,
+    "GET /books/isbn/<isbn>": 3,
+    "GET /books/<openlib_id> (local)": 3,
+    "GET /books/<openlib_id> (upstream)": 2,
+    "GET /books/search": 1,
+    "GET /books/author-reco": 2,
+    "POST /books/add-book": 9,
+    "GET /playlists/<playlist_id>": 9,
+    "GET /playlists/me": 4,
+    "GET /playlists/author-reco": 4,
+    "POST /playlists": 10,
+    "PUT /playlists/<playlist_id>": 9,
+    "GET /songs/spotify/search": 1,
+    "POST /songs/import": 8,
+    "GET /tags": 2,
+    "POST /tags": 4,
+    "GET /users/me": 1,
+    "GET /users/me/library": 3,
+    "GET /users/authors": 2,
+    "GET /users/author-applications": 2,
+    "GET /users/author-applications/pending": 2,
+    "GET /users/me/export": 1,          # streamed: counted up to the first byte
+    "GET /jobs/metadata-refresh": 4,
+    "GET /search (local)": 8,
+    "GET /search (upstream fallback)": 4,
+    "GET /search/suggest": 1,
+}
+
+GROWN_KEYS = ("users", "books", "songs", "playlists", "library_size", "songs_per_playlist")
+
+
+def scales(growth):
+    from seed import resolve_scale
+
+    small = resolve_scale("small")
+    grown = resolve_scale("small", **{key: small[key] * growth for key in GROWN_KEYS})
+    return {"small": small, f"{growth}x": grown}
+
+
+# --------------------------------------------------------
+# CHILD: one dataset
+# --------------------------------------------------------
+
+def measure(scale, samples, only):
+    """{endpoint: (most statements, statuses)} on a fresh database seeded at scale."""
+    from fake_upstreams import FakeUpstreams
+
+    upstreams = FakeUpstreams(latency_ms=0).start()
+    os.environ.update(upstreams.environ())
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+    from bench_endpoints import ENDPOINTS, _context, _request
+    from seed import create_seeded_app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app, _ = create_seeded_app("sqlite:///" + os.path.join(tmp, "queries.db"), scale)
+        app.config.update(JOB_WORKER_THREADS=0, PROPAGATE_EXCEPTIONS=False)
+        ctx = _context(app, scale)
+        client = app.test_client()
+
+        counts = {}
+        for endpoint in ENDPOINTS:
+            if endpoint.dialects or (only and only not in f"{endpoint.blueprint} {endpoint.name}"):
+                continue
+            results = [_request(client, endpoint, i, ctx) for i in range(samples)]
+            queries = [q for _, _, q in results if q is not None]
+            counts[endpoint.name] = (max(queries) if queries else None, sorted({s for _, s, _ in results}))
+
+        from app.extensions import db
+
+        with app.app_context():
+            db.engine.dispose()
+    upstreams.stop()
+    return counts
+
+
+# --------------------------------------------------------
+# PARENT: compare
+# --------------------------------------------------------
+
+def run_child(scale, samples, only):
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(BENCH_DIR) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", json.dumps(scale),
+         "--samples", str(samples)] + (["--only", only] if only else []),
+        env=env, capture_output=True, text=True,
+    )
+    if out.returncode:
+        sys.stderr.write(out.stderr)
+        raise SystemExit(f"measuring {scale} failed")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def check(growth, samples, only):
+    runs = {name: run_child(scale, samples, only) for name, scale in scales(growth).items()}
+    (small_name, small), (big_name, big) = runs.items()
+
+    print(f"{'endpoint':<48}{small_name:>8}{big_name:>8}{'budget':>8}")
+    failures = []
+    for name, (base, statuses) in small.items():
+        grown, grown_statuses = big.get(name, (None, []))
+        budget = QUERY_BUDGETS.get(name, DEFAULT_BUDGET)
+        print(f"{name[:47]:<48}{base if base is not None else '-':>8}"
+              f"{grown if grown is not None else '-':>8}{budget:>8}")
+
+        if any(s >= 500 for s in statuses + grown_statuses):
+            failures.append(f"{name}: server error ({sorted(set(statuses + grown_statuses))})")
+        if base is None or grown is None:
+            continue
+        if grown > base:
+            failures.append(f"{name}: {base} -> {grown} statements as the data grew {growth}x")
+        if max(base, grown) > budget:
+            failures.append(f"{name}: {max(base, grown)} statements, budget {budget}")
+
+    for failure in failures:
+        print("FAIL:", failure)
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--growth", type=int, default=4, help="size factor of the second dataset")
+    parser.add_argument("--samples", type=int, default=5, help="requests per endpoint")
+    parser.add_argument("--only", default=None, help="substring of blueprint or endpoint name")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(json.loads(args.child), args.samples, args.only)))
+        sys.exit(0)
+    sys.exit(0 if check(args.growth, args.samples, args.only) else 1)
@@ -0,0 +1,231 @@
+"""
+Local stand-ins for Open Library and Spotify.
+
+    python benchmarks/fake_upstreams.py [--latency-ms 50] [--port 8765]
+
+Serves the endpoints app/utility/openlibrary.py and spotify.py call, with
+deterministic payloads derived from the ids in the URL and a fixed delay
+per request (the time a real upstream would take). Point the app at it with
+
+    OPENLIBRARY_BASE_URL=http://127.0.0.1:8765/openlibrary
+    SPOTIFY_API_BASE_URL=http://127.0.0.1:8765/spotify
+    SPOTIFY_ACCOUNTS_BASE_URL=http://127.0.0.1:8765/spotify-accounts
+
+(FakeUpstreams.environ() returns exactly that). bench_endpoints.py starts
+one in-process; run this file to use it with a real server instead.
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+EDITIONS_PER_WORK = 120
+EDITIONS_PAGE_SIZE = 50
+
+
+# --------------------------------------------------------
+# PAYLOADS
+# --------------------------------------------------------
+
+def _number(key):
+    digits = re.sub(r"\D", "", key)
+    return int(digits) if digits else 0
+
+
+def _isbn13(n):
+    first12 = f"978{n % 10**9:09d}"
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(first12))
+    return first12 + str((10 - total % 10) % 10)
+
+
+def ol_work(key):
+    n = _number(key)
+    return {
+        "key": f"/works/{key}",
+        "title": f"Synthetic Work {n}",
+        "description": {"value": f"Description of synthetic work {n}. " * 4},
+        "subjects": ["fiction", f"subject {n % 17}", f"subject {n % 5}"],
+        "covers": [100_000 + n],
+        "authors": [{"author": {"key": f"/authors/OL{n % 500}A"}}],
+    }
+
+
+def ol_editions(key, offset, limit):
+    n = _number(key)
+    end = min(offset + limit, EDITIONS_PER_WORK)
+    entries = [
+        {
+            "isbn_13": [_isbn13(n * 1000 + i)],
+            "publish_date": str(1950 + (n + i) % 70),
+            "authors": [{"name": f"Author {n % 500}"}],
+        }
+        for i in range(offset, end)
+    ]
+    page = {"entries": entries, "size": EDITIONS_PER_WORK, "links": {}}
+    if end < EDITIONS_PER_WORK:
+        page["links"]["next"] = f"/works/{key}/editions.json?limit={limit}&offset={end}"
+    return page
+
+
+def ol_author(key):
+    return {"key": f"/authors/{key}", "name": f"Author {_number(key)}"}
+
+
+def ol_search(q, limit):
+    return {
+        "numFound": limit,
+        "docs": [
+            {
+                "key": f"/works/OL{900_000 + i}W",
+                "title": f"{q.title()} {i}",
+                "author_name": [f"Author {i}"],
+                "first_publish_year": 1950 + i,
+                "cover_i": 200_000 + i,
+            }
+            for i in range(limit)
+        ],
+    }
+
+
+def sp_track(track_id):
+    n = _number(track_id)
+    return {
+        "id": track_id,
+        "name": f"Synthetic Song {n}",
+        "artists": [{"id": f"ar{n % 300}", "name": f"Artist {n % 300}"}],
+        "album": {"name": f"Album {n % 1000}"},
+        "preview_url": None,
+    }
+
+
+def sp_audio_features(track_id):
+    n = _number(track_id)
+    return {"id": track_id, "energy": (n % 100) / 100, "valence": (n % 37) / 37, "tempo": 80 + n % 80}
+
+
+def sp_artist(artist_id):
+    return {"id": artist_id, "genres": ["pop", f"genre {_number(artist_id) % 12}"]}
+
+
+def sp_search(q, limit):
+    return {"tracks": {"items": [sp_track(f"sr{i}") | {"name": f"{q} {i}"} for i in range(limit)]}}
+
+
+# --------------------------------------------------------
+# SERVER
+# --------------------------------------------------------
+
+ROUTES = (
+    (r"/openlibrary/works/(\w+)\.json", lambda m, q: ol_work(m[1])),
+    (r"/openlibrary/works/(\w+)/editions\.json",
+     lambda m, q: ol_editions(m[1], int(q.get("offset", 0)), int(q.get("limit", EDITIONS_PAGE_SIZE)))),
+    (r"/openlibrary/authors/(\w+)\.json", lambda m, q: ol_author(m[1])),
+    (r"/openlibrary/search\.json", lambda m, q: ol_search(q.get("q", ""), min(int(q.get("limit", 20)), 100))),
+    (r"/spotify-accounts/api/token", lambda m, q: {"access_token": "fake-token", "expires_in": 3600}),
+    (r"/spotify/v1/tracks/(\w+)", lambda m, q: sp_track(m[1])),
+    (r"/spotify/v1/tracks", lambda m, q: {"tracks": [sp_track(i) for i in q.get("ids", "").split(",") if i]}),
+    (r"/spotify/v1/audio-features/(\w+)", lambda m, q: sp_audio_features(m[1])),
+    (r"/spotify/v1/audio-features",
+     lambda m, q: {"audio_features": [sp_audio_features(i) for i in q.get("ids", "").split(",") if i]}),
+    (r"/spotify/v1/artists/(\w+)", lambda m, q: sp_artist(m[1])),
+    (r"/spotify/v1/artists", lambda m, q: {"artists": [sp_artist(i) for i in q.get("ids", "").split(",") if i]}),
+    (r"/spotify/v1/search", lambda m, q: sp_search(q.get("q", ""), min(int(q.get("limit", 10)), 50))),
+)
+ROUTES = tuple((re.compile(pattern + r"$"), handler) for pattern, handler in ROUTES)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real upstreams
+
+    def _respond(self):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        time.sleep(self.server.latency)
+        self.server.count()
+        for pattern, handler in ROUTES:
+            match = pattern.match(url.path)
+            if match:
+                status, payload = 200, handler(match, query)
+                break
+        else:
+            status, payload = 404, {"error": "not found"}
+
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _respond
+    do_POST = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeUpstreams:
+    """Threaded fake upstream server; use as a context manager."""
+
+    def __init__(self, latency_ms=50, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.latency = latency_ms / 1000
+        self.server.count = self._count
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _count(self):
+        with self._lock:
+            self.requests += 1
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def environ(self):
+        return {
+            "OPENLIBRARY_BASE_URL": self.base_url + "/openlibrary",
+            "SPOTIFY_API_BASE_URL": self.base_url + "/spotify",
+            "SPOTIFY_ACCOUNTS_BASE_URL": self.base_url + "/spotify-accounts",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-upstreams", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(args.latency_ms, args.host, args.port)
+    for name, value in upstreams.environ().items():
+        print(f"{name}={value}")
+    try:
+        upstreams.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,249 @@
+"""
+Synthetic dataset for benchmarks.
+
+    python benchmarks/seed.py --database-uri sqlite:///bench.db [--scale small]
+
+Upgrades the database to the current migration and fills it with users,
+author applications, books, songs, tags, playlists and every junction
+table, deterministically
+(the same --scale and --seed always give the same rows). Works on SQLite and
+Postgres. The database must be empty: ids are assigned in insertion order,
+and bench_endpoints.py relies on them starting at 1.
+
+Rows go in with bulk INSERTs, which skip the ORM flush listeners, so the
+full-text index and book_isbns are rebuilt afterwards the way their CLI
+commands do.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app.extensions import db  # noqa: E402
+from app.models import (  # noqa: E402
+    Author_verification_requests,
+    Book_Authors,
+    Book_Tags,
+    Books,
+    Playlist_Books,
+    Playlist_Songs,
+    Playlist_Tags,
+    Playlists,
+    Songs,
+    Tags,
+    Users,
+)
+
+# users / books / songs / tags / playlists, songs and books per playlist,
+# books per library
+SCALES = {
+    "small": dict(users=50, books=500, songs=1_000, tags=20, playlists=200,
+                  songs_per_playlist=15, books_per_playlist=2, library_size=20),
+    "medium": dict(users=500, books=5_000, songs=10_000, tags=50, playlists=2_000,
+                   songs_per_playlist=25, books_per_playlist=3, library_size=50),
+    "large": dict(users=5_000, books=50_000, songs=100_000, tags=100, playlists=20_000,
+                  songs_per_playlist=40, books_per_playlist=3, library_size=100),
+}
+
+PASSWORD = "benchmark"
+CHUNK = 1_000
+AUTHOR_EVERY = 10   # every 10th user is an author, user 1 is the admin
+APPLICANT_EVERY = 3  # every 3rd reader has applied to become an author
+SUBJECTS = ["fantasy", "science fiction", "mystery", "romance", "history", "poetry",
+            "horror", "biography", "adventure", "philosophy", "magic", "space"]
+MOODS = ["calm", "dark", "epic", "cozy", "tense", "dreamy", "upbeat", "melancholy",
+         "mysterious", "romantic", "triumphant", "eerie", "nostalgic", "playful"]
+WORDS = ["river", "shadow", "glass", "winter", "crown", "garden", "storm", "lantern",
+         "ember", "harbor", "silver", "forest", "letter", "echo", "orchard", "tide"]
+
+
+def resolve_scale(name, **overrides):
+    scale = dict(SCALES[name])
+    scale.update({key: value for key, value in overrides.items() if value is not None})
+    return scale
+
+
+def _title(rng, n, words=3):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).title() + f" {n}"
+
+
+def _isbn13(n):
+    first12 = f"978{n % 10**9:09d}"
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(first12))
+    return first12 + str((10 - total % 10) % 10)
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), CHUNK):
+        db.session.execute(insert(model), rows[start:start + CHUNK])
+
+
+# --------------------------------------------------------
+# ROWS
+# --------------------------------------------------------
+
+def _users(rng, scale, password_hash):
+    rows = []
+    for i in range(1, scale["users"] + 1):
+        role = "admin" if i == 1 else "author" if i % AUTHOR_EVERY == 0 else "reader"
+        library = rng.sample(range(1, scale["books"] + 1), min(scale["library_size"], scale["books"]))
+        rows.append({
+            "first_name": "Bench", "last_name": f"User {i}",
+            "username": f"bench{i}", "email": f"bench{i}@example.com",
+            "password": password_hash, "role": role,
+            "author_keys": [f"OL{i}A"] if role == "author" else [],
+            "author_bio": "Writes synthetic books." if role == "author" else None,
+            "library": library,
+        })
+    return rows
+
+
+def _applications(scale):
+    rows = []
+    for i in range(APPLICANT_EVERY, scale["users"] + 1, APPLICANT_EVERY):
+        if i % AUTHOR_EVERY == 0:
+            continue
+        rows.append({
+            "user_id": i, "author_bio": f"Applicant {i} writes synthetic books.",
+            "author_keys": [f"OL{i}A"], "proof_links": [f"https://example.com/{i}"],
+            "status": "pending" if i % 2 else "rejected", "reviewed_by": None if i % 2 else 1,
+        })
+    return rows
+
+
+def _books(rng, scale):
+    rows = []
+    for i in range(1, scale["books"] + 1):
+        author = rng.randrange(scale["users"]) + 1
+        rows.append({
+            "title": _title(rng, i),
+            "author_names": [f"Author {author}"],
+            "author_keys": [f"OL{author}A"],
+            "api_source": "openlibrary", "api_id": f"OL{i}W", "openlib_id": f"OL{i}W",
+            "cover_id": 100_000 + i,
+            "cover_url": f"https://covers.openlibrary.org/b/id/{100_000 + i}-L.jpg",
+            "description": f"Synthetic book {i}. " * 5,
+            "isbn_list": [_isbn13(i * 1000), _isbn13(i * 1000 + 1)],
+            "first_publish_year": 1900 + rng.randrange(125),
+            "subjects": rng.sample(SUBJECTS, 3),
+            "source": "verified",
+        })
+    return rows
+
+
+def _songs(rng, scale):
+    rows = []
+    for i in range(1, scale["songs"] + 1):
+        artist = rng.randrange(300)
+        rows.append({
+            "spotify_id": f"sp{i}",
+            "title": _title(rng, i, 2),
+            "artists": [f"Artist {artist}"],
+            "album": f"Album {rng.randrange(1000)}",
+            "genres": ["pop", f"genre {artist % 12}"],
+            "audio_features": {"energy": rng.random(), "valence": rng.random(), "tempo": 80 + rng.randrange(80)},
+            "source": "Spotify",
+        })
+    return rows
+
+
+def _playlists(rng, scale):
+    playlists, songs, books, tags = [], [], [], []
+    for i in range(1, scale["playlists"] + 1):
+        owner = rng.randrange(scale["users"]) + 1
+        playlists.append({
+            "user_id": owner,
+            "title": f"Playlist {i}: " + _title(rng, i, 2),
+            "description": "Songs to read by",
+            "is_public": rng.random() < 0.8,
+            "is_author_reco": owner % AUTHOR_EVERY == 0 and rng.random() < 0.5,
+        })
+        for order, song_id in enumerate(rng.sample(range(1, scale["songs"] + 1), scale["songs_per_playlist"])):
+            songs.append({"playlist_id": i, "song_id": song_id, "order_index": order})
+        for book_id in rng.sample(range(1, scale["books"] + 1), scale["books_per_playlist"]):
+            books.append({"playlist_id": i, "book_id": book_id})
+        for tag_id in rng.sample(range(1, scale["tags"] + 1), min(3, scale["tags"])):
+            tags.append({"playlist_id": i, "tag_id": tag_id})
+    return playlists, songs, books, tags
+
+
+# --------------------------------------------------------
+# SEED
+# --------------------------------------------------------
+
+def seed(scale, seed=42):
+    """Fill the (empty) database of the current app context. Returns row counts per table."""
+    from werkzeug.security import generate_password_hash
+
+    from app.utility import isbn, search
+
+    if db.session.scalar(select(func.count()).select_from(Users)):
+        raise SystemExit("Database is not empty; seed a fresh one (ids must start at 1).")
+
+    rng = random.Random(seed)
+    users = _users(rng, scale, generate_password_hash(PASSWORD))
+    books = _books(rng, scale)
+    songs = _songs(rng, scale)
+    tags = [{"mood_name": f"{MOODS[i % len(MOODS)]} {i}", "category": "mood"} for i in range(1, scale["tags"] + 1)]
+    playlists, playlist_songs, playlist_books, playlist_tags = _playlists(rng, scale)
+    authors = range(AUTHOR_EVERY, scale["users"] + 1, AUTHOR_EVERY)
+    book_authors = [
+        {"book_id": i, "user_id": authors[i % len(authors)]}
+        for i in range(4, scale["books"] + 1, 4)
+    ] if authors else []
+    book_tags = [{"book_id": i, "tag_id": i % scale["tags"] + 1} for i in range(1, scale["books"] + 1, 3)]
+
+    tables = (
+        (Users, users), (Books, books), (Songs, songs), (Tags, tags),
+        (Playlists, playlists), (Playlist_Songs, playlist_songs), (Playlist_Books, playlist_books),
+        (Playlist_Tags, playlist_tags), (Book_Authors, book_authors), (Book_Tags, book_tags),
+        (Author_verification_requests, _applications(scale)),
+    )
+    for model, rows in tables:
+        _insert(model, rows)
+    db.session.commit()
+
+    search.rebuild_index()
+    isbn.backfill()
+    return {model.__tablename__: len(rows) for model, rows in tables}
+
+
+def create_seeded_app(database_uri, scale, seed_value=42):
+    """create_app("testing") on database_uri, upgraded and seeded."""
+    os.environ["SQLALCHEMY_DATABASE_URI"] = database_uri
+    from flask_migrate import upgrade
+
+    from app import create_app
+    from app.utility.database import init_migrations
+
+    app = create_app("testing")
+    if app.config["SQLALCHEMY_DATABASE_URI"] != database_uri:
+        raise SystemExit("config was imported before SQLALCHEMY_DATABASE_URI was set")
+    init_migrations(app)
+    with app.app_context():
+        upgrade()
+        counts = seed(scale, seed_value)
+        db.session.remove()
+    return app, counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-uri", required=True, help="sqlite:///path.db or postgresql://...")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    for key in SCALES["small"]:
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, default=None)
+    args = parser.parse_args()
+
+    scale = resolve_scale(args.scale, **{key: getattr(args, key) for key in SCALES["small"]})
+    started = time.perf_counter()
+    _, counts = create_seeded_app(args.database_uri, scale, args.seed)
+    for table, count in counts.items():
+        print(f"{table:<16}{count:>10}")
+    print(f"seeded in {time.perf_counter() - started:.1f}s")
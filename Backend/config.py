@@ -1,19 +1,153 @@
 import os
 
-from flask_migrate import Config
 
-class DevelopmentConfig:
-    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
-    DEBUG = True
+class BaseConfig:
+    """Settings shared by every environment; subclasses override what differs."""
+    DEBUG = False
+    TESTING = False
+
+    SQLALCHEMY_DATABASE_URI = os.environ.get('SQLALCHEMY_DATABASE_URI') or 'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # logging (app/utility/logs.py): queued, written to stderr by a background thread
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text")     # "text" or "json"
 
-class TestingConfig:
-    pass
+    # per-request SQL / upstream / serialization timing (app/utility/instrumentation.py)
+    REQUEST_INSTRUMENTATION = True
+    SERVER_TIMING_HEADER = True        # expose the numbers to clients (browser dev tools)
+    REQUEST_QUERY_WARN_THRESHOLD = 25  # log a warning above this many SQL statements
 
+    # Prometheus metrics at GET /metrics (app/utility/metrics.py); under gunicorn also
+    # set PROMETHEUS_MULTIPROC_DIR so every worker's numbers are summed
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+    # on-demand request profiling (app/utility/profiling.py): admins get a signed
+    # X-Profile header from POST /admin/profiles/token, or name routes here
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "1") != "0"
+    PROFILE_DIR = os.getenv("PROFILE_DIR")             # default: instance/profiles
+    PROFILE_MAX_FILES = 50                             # oldest profiles deleted beyond this
+    PROFILE_ROUTES = [p.strip() for p in os.getenv("PROFILE_ROUTES", "").split(",") if p.strip()]
+    PROFILE_ROUTE_RATE = float(os.getenv("PROFILE_ROUTE_RATE", 0.01))  # share of matching requests
+    PROFILE_ROUTE_MODE = os.getenv("PROFILE_ROUTE_MODE", "sample")     # "sample" or "cprofile"
+    PROFILE_SAMPLE_INTERVAL_MS = 5
+    PROFILE_TOKEN_MAX_TTL = 3600                       # seconds
+
+    # slow-query log (app/utility/slow_queries.py); per worker at GET /admin/slow-queries
+    SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "1") != "0"
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+    SLOW_QUERY_EXPLAIN = True                          # capture plans on a background thread
+    SLOW_QUERY_LOG_PARAMETERS = False                  # bound values in logs (never for users rows)
+    SLOW_QUERY_MAX_FINGERPRINTS = 500
+
+    # engine / connection pool (app/utility/database.py builds SQLALCHEMY_ENGINE_OPTIONS
+    # from these unless a config sets SQLALCHEMY_ENGINE_OPTIONS itself)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))          # seconds waiting for a pooled connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))        # seconds; server-side idle timeouts
+    DB_POOL_PRE_PING = True
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30_000))  # Postgres only; 0 = off
+
+    # read replicas for GET traffic (app/utility/replicas.py); comma separated URIs
+    SQLALCHEMY_REPLICA_URIS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+
+    # applied to every new SQLite connection; WAL lets readers run alongside
+    # the single writer, busy_timeout makes writers queue instead of failing
+    # with "database is locked" under several gunicorn workers
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,          # ms
+        "mmap_size": 268_435_456,      # 256 MiB
+    }
+
+    # rows per keyset batch when streaming /users/me/export
+    EXPORT_BATCH_SIZE = 500
+
+    # bulk import (/users/me/import)
+    IMPORT_MAX_ITEMS = 5000
+    IMPORT_COMMIT_CHUNK = 100
+    IMPORT_MAX_WORKERS = 8
+
+    # background job queue (app/utility/jobs.py)
+    JOB_WORKER_THREADS = 1        # in-process workers; 0 = use `flask jobs work`
+    JOB_POLL_INTERVAL = 1.0       # seconds between polls when idle
+    JOB_MAX_ATTEMPTS = 5
+    JOB_RETRY_BASE_DELAY = 5      # seconds, doubled per attempt
+    JOB_LOCK_TIMEOUT = 300        # seconds before a 'running' job is retried
+
+    # upstream requests/second per host; background jobs only use the spare share
+    UPSTREAM_RATE_BUDGETS = {
+        "openlibrary.org": 5,
+        "api.spotify.com": 10,
+    }
+    BACKGROUND_BUDGET_SHARE = 0.5
+
+    # Open Library editions are read 50 per page (app/utility/openlibrary.py)
+    OPENLIBRARY_EDITION_PAGES = 20          # background enrichment / refresh
+    OPENLIBRARY_PREVIEW_EDITION_PAGES = 2   # interactive /books/<openlib_id> previews
+    OPENLIBRARY_EDITION_CONCURRENCY = 4     # edition pages requested at once (concurrent paths)
+
+    # periodic metadata refresh (app/utility/refresh.py)
+    REFRESH_INTERVAL = 3600       # seconds between runs
+    REFRESH_MAX_AGE_DAYS = 30
+    REFRESH_BATCH_SIZE = 100
+    REFRESH_MAX_BATCHES = 10      # per table, per run
+    REFRESH_CONCURRENCY = 2
+
+    # custom -> verified book reconciliation (app/utility/reconcile.py)
+    RECONCILE_MIN_SCORE = 0.9     # 0..1 confidence needed to merge
+    RECONCILE_MIN_MARGIN = 0.05   # best match must beat the runner-up by this
+
+    # local full-text search (/search)
+    SEARCH_RESULT_LIMIT = 20           # per type
+    SEARCH_UPSTREAM_FALLBACK = True    # ask Open Library / Spotify when local hits are few
+    SEARCH_FALLBACK_MIN_RESULTS = 1
+
+    # typeahead (/search/suggest)
+    SUGGEST_MAX_ENTRIES = 200_000      # bounds the in-memory prefix index
+    SUGGEST_MIN_PREFIX = 2
+    SUGGEST_RESULT_LIMIT = 10
+    SUGGEST_SYNC_INTERVAL = 10         # seconds; picks up other workers' commits (0 = off)
+    SUGGEST_REBUILD_INTERVAL = 900     # seconds; full reload, also drops rows deleted elsewhere
+
+    # ETag / Cache-Control for read routes (app/utility/http_cache.py)
+    HTTP_CACHE_ENABLED = True
+    HTTP_SHARED_CACHE_SIZE = 128       # public responses kept in memory
+
+    # read-through payload cache (app/utility/cache.py)
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")   # "memory" or "sqlite" (shared per host)
+    CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH")     # default: instance/cache.sqlite3
+    CACHE_MAX_ENTRIES = 10_000
+    CACHE_DEFAULT_TTL = 3600                                # seconds; tags do the real invalidation
+
+
+class DevelopmentConfig(BaseConfig):
+    DEBUG = True
+    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL") or BaseConfig.SQLALCHEMY_DATABASE_URI
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
+
+    DB_POOL_SIZE = 2
+    DB_MAX_OVERFLOW = 5
+    SLOW_QUERY_LOG_PARAMETERS = True
+
+
+class TestingConfig(BaseConfig):
+    TESTING = True
+
+    DB_POOL_SIZE = 2
+    DB_MAX_OVERFLOW = 5
+    CACHE_BACKEND = "memory"
+
+
+class ProductionConfig(BaseConfig):
+    pass
 
-class ProductionConfig:
-    DEBUG = False
-    TESTING = False
 
-    SQLALCHEMY_DATABASE_URI = os.environ.get('SQLALCHEMY_DATABASE_URI') or 'sqlite:///app.db'
\ No newline at end of file
+# APP_CONFIG picks one of these (default: production)
+CONFIGS = {
+    "development": DevelopmentConfig,
+    "testing": TestingConfig,
+    "production": ProductionConfig,
+}
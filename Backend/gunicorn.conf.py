@@ -0,0 +1,17 @@
+# gunicorn picks this file up from the working directory.
+#
+# With PROMETHEUS_MULTIPROC_DIR set, every worker keeps its metrics in files
+# in that directory and /metrics sums them (app/utility/metrics.py). The
+# directory must exist and be emptied before the server starts, e.g.
+#
+#   rm -rf /tmp/soundbound-metrics && mkdir /tmp/soundbound-metrics
+#   PROMETHEUS_MULTIPROC_DIR=/tmp/soundbound-metrics gunicorn SoundBound_app:app
+import os
+
+
+def child_exit(server, worker):
+    # drop a dead worker's live gauges (checked-out connections, pool capacity)
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,36 @@
+"""normalized ISBN-13 lookup table
+
+Existing books get their rows from `flask books backfill-isbns`.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 11:53:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('book_isbns',
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('isbn13', sa.String(length=13), nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('book_id', 'isbn13')
+    )
+    with op.batch_alter_table('book_isbns', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_book_isbns_isbn13'), ['isbn13'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('book_isbns', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_book_isbns_isbn13'))
+
+    op.drop_table('book_isbns')
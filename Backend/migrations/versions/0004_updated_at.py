@@ -0,0 +1,42 @@
+"""song timestamps, updated_at indexes
+
+songs gets created_at / updated_at like the other tables; books and songs
+get an index on updated_at (ETags, metadata refresh, suggest sync).
+SQLite cannot ADD COLUMN with a CURRENT_TIMESTAMP default, so songs is
+rebuilt there; existing rows get the time of the upgrade as created_at.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 11:54:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    recreate = 'always' if op.get_bind().dialect.name == 'sqlite' else 'auto'
+    with op.batch_alter_table('songs', schema=None, recreate=recreate) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_index(batch_op.f('ix_songs_updated_at'), ['updated_at'], unique=False)
+
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_books_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_books_updated_at'))
+
+    with op.batch_alter_table('songs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_songs_updated_at'))
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('created_at')
@@ -0,0 +1,48 @@
+"""local full-text search index
+
+FTS5 virtual table on SQLite, tsvector table + GIN index on Postgres
+(see app/utility/search.py). Other databases use the scan fallback and
+get nothing. Databases that already have rows: run `flask search rebuild`
+after upgrading.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 12:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+            "title, people, body, kind UNINDEXED, ref_id UNINDEXED, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    elif dialect == "postgresql":
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS search_documents ("
+            "kind SMALLINT NOT NULL, ref_id INTEGER NOT NULL, "
+            "document TSVECTOR NOT NULL, PRIMARY KEY (kind, ref_id))"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_search_documents_document "
+            "ON search_documents USING GIN (document)"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute("DROP TABLE IF EXISTS search_index")
+    elif dialect == "postgresql":
+        op.execute("DROP TABLE IF EXISTS search_documents")
@@ -0,0 +1,63 @@
+"""
+Shared fixtures: every test gets its own migrated SQLite database.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import Users  # noqa: E402
+from app.utility.auth import encode_token  # noqa: E402
+from config import TestingConfig  # noqa: E402
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'test.db'}")
+    # no background threads: tests run jobs themselves with run_pending()
+    monkeypatch.setattr(TestingConfig, "JOB_WORKER_THREADS", 0, raising=False)
+    monkeypatch.setattr(TestingConfig, "SUGGEST_SYNC_INTERVAL", 0, raising=False)
+    app = create_app("testing")
+
+    from flask_migrate import upgrade
+    from app.utility.database import init_migrations
+    init_migrations(app)
+    with app.app_context():
+        upgrade(directory=MIGRATIONS)
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """make_user(role="reader", **columns) -> (user, Authorization headers)"""
+    count = 0
+
+    def make(role="reader", **columns):
+        nonlocal count
+        count += 1
+        user = Users(
+            first_name="Test", last_name=f"User{count}", username=f"user{count}",
+            email=f"user{count}@example.com", password=generate_password_hash("password"),
+            role=role, **columns,
+        )
+        db.session.add(user)
+        db.session.commit()
+        return user, {"Authorization": f"Bearer {encode_token(user.id, role)}"}
+
+    return make
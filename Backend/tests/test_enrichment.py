@@ -0,0 +1,32 @@
+from app.extensions import db
+from app.models import Books, Jobs, Users
+from app.utility import http
+from app.utility.jobs import run_pending
+
+
+class _Response:
+    status_code = 404
+
+    def json(self):
+        return {"error": "notfound"}
+
+
+def test_unknown_book_is_removed_once_enrichment_gives_up(app, client, make_user, monkeypatch):
+    app.config["JOB_RETRY_BASE_DELAY"] = 0   # retries are due at once
+    monkeypatch.setattr(http, "_send", lambda method, url, kwargs: _Response())
+    user, headers = make_user()
+
+    resp = client.post("/books/add-book", json={"openlib_id": "OL0000000W"}, headers=headers)
+    assert resp.status_code == 202
+    book_id = resp.get_json()["book_id"]
+    assert db.session.get(Users, user.id).library == [book_id]
+
+    run_pending()
+
+    job = db.session.get(Jobs, resp.get_json()["job_id"])
+    assert job.status == "failed"
+    assert job.attempts == job.max_attempts
+    db.session.expire_all()
+    assert db.session.get(Books, book_id) is None
+    assert db.session.get(Users, user.id).library == []
+    assert client.get("/users/me/library", headers=headers).get_json()["library"] == []
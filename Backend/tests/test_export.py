@@ -0,0 +1,42 @@
+import pytest
+
+from app.utility.export import parse_cursor
+
+
+@pytest.mark.parametrize("cursor", [
+    "playlist_books:1",        # two-column key, one value
+    "users:1.2",               # one-column key, two values
+    "playlist_books:1.x",
+    "users:",
+    "users:-1",
+    "nonsense:1",
+    "users",
+])
+def test_parse_cursor_rejects_malformed_keys(cursor):
+    with pytest.raises(ValueError):
+        parse_cursor(cursor)
+
+
+def test_parse_cursor_accepts_section_keys():
+    assert parse_cursor("users:7") == ("users", (7,))
+    assert parse_cursor("playlist_books:3.12") == ("playlist_books", (3, 12))
+
+
+@pytest.mark.parametrize("export_format", ["ndjson", "zip"])
+@pytest.mark.parametrize("cursor", ["playlist_books:1", "playlist_books:abc", "users:1.2"])
+def test_export_rejects_invalid_cursor_before_streaming(client, make_user, cursor, export_format):
+    _, headers = make_user()
+
+    resp = client.get(f"/users/me/export?format={export_format}&cursor={cursor}", headers=headers)
+
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "invalid cursor"}
+
+
+def test_export_resumes_after_valid_cursor(client, make_user):
+    user, headers = make_user()
+
+    resp = client.get("/users/me/export?cursor=users:0", headers=headers)
+
+    assert resp.status_code == 200
+    assert f'"cursor":"users:{user.id}"' in resp.get_data(as_text=True)
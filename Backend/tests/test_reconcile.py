@@ -0,0 +1,44 @@
+from app.extensions import db
+from app.models import Books, Users
+from app.utility.reconcile import custom_book_key, reconcile_custom_books
+
+
+def _custom(title, author, year=None):
+    book = Books(title=title, author_names=[author], author_keys=[], isbn_list=[],
+                 subjects=[], first_publish_year=year, source="custom")
+    db.session.add(book)
+    db.session.flush()
+    return book
+
+
+def test_custom_book_key_includes_year():
+    assert custom_book_key("Dune", ["Frank Herbert"], 1965) == custom_book_key("dune", ["Herbert, Frank"], "1965")
+    assert custom_book_key("Dune", ["Frank Herbert"], 1965) != custom_book_key("Dune", ["Frank Herbert"], 2021)
+
+
+def test_collapse_keeps_different_years_apart(app):
+    first = _custom("Dune", "Frank Herbert", 1965)
+    same = _custom("DUNE", "Herbert, Frank", 1965)
+    other_year = _custom("Dune", "Frank Herbert", 2021)
+    db.session.commit()
+    first_id, same_id, other_id = first.id, same.id, other_year.id
+
+    report = reconcile_custom_books()
+
+    assert report["duplicates_collapsed"] == 1
+    assert db.session.get(Books, same_id) is None
+    assert db.session.get(Books, first_id) is not None
+    assert db.session.get(Books, other_id) is not None
+
+
+def test_collapse_repoints_library_ids_stored_as_strings(app, make_user):
+    first = _custom("Dune", "Frank Herbert", 1965)
+    duplicate = _custom("Dune", "Frank Herbert", 1965)
+    db.session.commit()
+    first_id, duplicate_id = first.id, duplicate.id
+    user, _ = make_user(library=[str(duplicate_id), "not-a-book"])
+
+    report = reconcile_custom_books()
+
+    assert report["libraries_updated"] == 1
+    assert db.session.get(Users, user.id).library == [first_id, "not-a-book"]